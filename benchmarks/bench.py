@@ -0,0 +1,298 @@
+#
+# -*- coding: utf-8 -*-
+"""Micro-benchmarks for ksc
+
+Times parsing, rendering, listing the keys, and importing ksc, and reports the
+best time for one operation of each workload. Results can be saved as JSON, and
+compared to a previously saved run:
+
+    $ python benchmarks/bench.py --output before.json
+    $ # make things faster
+    $ python benchmarks/bench.py --compare before.json --threshold 0.1
+
+When comparing, the exit code is 1 if any workload got slower by more than the
+threshold, so it can be used as a gate. Usually run with 'invoke bench'.
+"""
+
+import argparse
+import contextlib
+import itertools
+import json
+import platform
+import subprocess
+import sys
+import timeit
+
+import ksc
+
+# representative inputs for the parser, by kind
+CORPUS = {
+    "names": [
+        "command shift f",
+        "option command h",
+        "control option command space",
+        "cmd-shift-p",
+        "ctrl x",
+        "shift command pgup",
+        "fn delete",
+        "option left",
+    ],
+    "symbols": ["⇧⌘F", "⌥⌘H", "⌃⌥⌘␣", "⌘⎋", "⌃⇧→"],
+    "ascii": ["$@F", "~@H", "^~@5", "@$@", "*^Q"],
+    "hyper": ["hyper space", "hyper t", "Hyper-R", "hyper ."],
+    "function_keys": ["f1", "command f12", "shift option f5", "fn f35"],
+    "sequences": [
+        "control x / control c",
+        "command k / command s",
+        "ctrl x | ctrl f | ctrl s",
+    ],
+    "errors": ["fred", "command Q99", "shift control", "option fn f36", ""],
+}
+
+# seconds each timing should take, long enough to be above timer noise
+TARGET = 0.02
+# how many timings to take of each workload, the best one is reported
+REPEAT = 7
+# how many times to import ksc in a fresh interpreter
+IMPORT_REPEAT = 20
+# the metric which measures the speed of the machine, see compare()
+REFERENCE = "reference"
+
+
+def _parse_corpus(texts):
+    parse = ksc.MacOS.parse_shortcut
+    for text in texts:
+        with contextlib.suppress(ValueError):
+            parse(text)
+
+
+def _parse_sequences(texts):
+    parse = ksc.MacOS.parse_shortcuts
+    for text in texts:
+        parse(text)
+
+
+class Timings:
+    """collect workloads, then time them all, interleaved
+
+    Each workload is timed REPEAT times, and the best time is kept. The timings
+    go round robin through all the workloads, instead of timing each one REPEAT
+    times in a row, so if the machine is busy for part of the run, it doesn't
+    slow down just a few of the workloads.
+    """
+
+    def __init__(self):
+        self.workloads = []
+
+    def add(self, name, func, ops):
+        """add a workload: func does ops operations each time it's called"""
+        timer = timeit.Timer(func)
+        # warm up, then use one call to figure out how many make a timing
+        timer.timeit(number=1)
+        once = timer.timeit(number=1)
+        number = max(1, int(TARGET / max(once, 1e-7)))
+        self.workloads.append((name, timer, number, ops))
+
+    def run(self):
+        """return a dictionary of the best seconds per operation of each workload"""
+        best = {}
+        for _ in range(REPEAT):
+            for name, timer, number, ops in self.workloads:
+                seconds = timer.timeit(number=number) / number / ops
+                best[name] = min(seconds, best.get(name, seconds))
+        return best
+
+
+def _reference_workload():
+    """plain python which does the same kinds of things ksc does"""
+    words = {}
+    for word in ("the", "quick", "brown", "fox", "jumps", "over", "the", "lazy"):
+        words[word.upper()] = words.get(word.upper(), 0) + len(word)
+    return "-".join(sorted(words))
+
+
+def bench_reference(timings):
+    """a workload that doesn't use ksc, to measure the speed of the machine"""
+    timings.add(REFERENCE, _reference_workload, 1)
+
+
+def bench_parse(timings):
+    """parse_shortcut() on each kind of input in the corpus"""
+    for kind, texts in CORPUS.items():
+        func = _parse_sequences if kind == "sequences" else _parse_corpus
+        timings.add(f"parse.{kind}", lambda f=func, t=texts: f(t), len(texts))
+
+
+def bench_render(timings):
+    """render() with every combination of the boolean render options"""
+    # copies, not the interned shortcuts from the parser, which would make
+    # parsing faster when this runs because they would always be interned
+    combos = [
+        ksc.MacOSKeyboardShortcut(combo.modmask, combo.key)
+        for combo in map(
+            ksc.MacOS.parse_shortcut,
+            itertools.chain(*(CORPUS[kind] for kind in ("names", "hyper"))),
+        )
+    ]
+    flags = ksc.RenderOptions.OPTIONS[:-1]
+    for values in itertools.product([False, True], repeat=len(flags)):
+        options = dict(zip(flags, values, strict=True))
+        name = "+".join(flag for flag, value in options.items() if value)
+
+        def render(options=options):
+            for combo in combos:
+                combo.render(**options)
+
+        timings.add(f"render.{name or 'default'}", render, len(combos))
+
+
+def bench_named_keys(timings):
+    """building the table of keys"""
+    timings.add("named_keys", ksc.MacOS.named_keys, 1)
+
+
+def bench_import():
+    """a cold import of ksc.macos in a new interpreter, timed with -X importtime
+
+    The ksc package imports ksc.macos lazily, so this imports it explicitly to
+    include building the key tables, and adds up the time of the package and
+    the module. Importing can't be repeated in the same interpreter, so this
+    isn't one of the Timings workloads
+    """
+    best = None
+    for _ in range(IMPORT_REPEAT):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", "import ksc.macos"],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        micros = 0
+        for line in result.stderr.splitlines():
+            if line.endswith(("| ksc", "| ksc.macos")):
+                micros += int(line.split("|")[1])
+        best = micros if best is None else min(best, micros)
+    return {"import": best / 1e6}
+
+
+BENCHMARKS = {
+    "parse": bench_parse,
+    "render": bench_render,
+    "named_keys": bench_named_keys,
+    "import": bench_import,
+}
+
+
+def run(names):
+    """run the named benchmarks, and return the results as a dictionary"""
+    timings = Timings()
+    bench_reference(timings)
+    for name in names:
+        if name != "import":
+            BENCHMARKS[name](timings)
+    metrics = timings.run()
+    if "import" in names:
+        metrics.update(bench_import())
+    return {
+        "ksc": ksc.__version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "unit": "seconds per operation",
+        "metrics": metrics,
+    }
+
+
+def compare(baseline, current, threshold):
+    """compare two sets of results
+
+    returns a list of (metric, baseline, current, change) for the metrics in
+    both, and a list of the metrics which got slower by more than threshold
+
+    The change is adjusted by how much the reference workload changed, so a
+    machine which is busier or slower than it was for the baseline doesn't look
+    like a regression
+    """
+    rows = []
+    regressions = []
+    speed = 1
+    if baseline["metrics"].get(REFERENCE) and current["metrics"].get(REFERENCE):
+        speed = current["metrics"][REFERENCE] / baseline["metrics"][REFERENCE]
+    for metric, now in current["metrics"].items():
+        before = baseline["metrics"].get(metric)
+        if not before or metric == REFERENCE:
+            continue
+        change = now / before / speed - 1
+        rows.append((metric, before, now, change))
+        if change > threshold:
+            regressions.append(metric)
+    return rows, regressions
+
+
+def _format_time(seconds):
+    for unit, scale in (("s", 1), ("ms", 1e3), ("µs", 1e6)):
+        if seconds * scale >= 1:
+            return f"{seconds * scale:.3g}{unit}"
+    return f"{seconds * 1e9:.3g}ns"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark ksc.")
+    parser.add_argument(
+        "benchmarks",
+        nargs="*",
+        help=f"benchmarks to run, default is all of them: {', '.join(BENCHMARKS)}",
+    )
+    parser.add_argument("-o", "--output", help="save the results to this JSON file")
+    parser.add_argument(
+        "-c", "--compare", help="compare the results to those saved in this JSON file"
+    )
+    parser.add_argument(
+        "-t",
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="fraction a metric can get slower before it's a regression, default 0.1",
+    )
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.benchmarks if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(unknown)}")
+
+    results = run(args.benchmarks or list(BENCHMARKS))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fobj:
+            json.dump(results, fobj, indent=2, sort_keys=True)
+            fobj.write("\n")
+
+    if not args.compare:
+        for metric, seconds in results["metrics"].items():
+            print(f"{metric:<50} {_format_time(seconds):>10}")
+        return 0
+
+    with open(args.compare, encoding="utf-8") as fobj:
+        baseline = json.load(fobj)
+    rows, regressions = compare(baseline, results, args.threshold)
+    before = baseline["metrics"].get(REFERENCE)
+    now = results["metrics"][REFERENCE]
+    if before:
+        print(
+            f"{'machine speed (reference workload)':<50} {_format_time(before):>10}"
+            f" {_format_time(now):>10} {now / before - 1:+8.1%}"
+        )
+    for metric, before, now, change in rows:
+        flag = "  REGRESSION" if metric in regressions else ""
+        print(
+            f"{metric:<50} {_format_time(before):>10} {_format_time(now):>10}"
+            f" {change:+8.1%}{flag}"
+        )
+    if regressions:
+        print(
+            f"{len(regressions)} of {len(rows)} metrics slower by more than"
+            f" {args.threshold:.0%}"
+        )
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
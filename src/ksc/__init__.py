@@ -26,17 +26,47 @@ ksc is a library and command line program for parsing and standardizing
 keyboard shortcuts
 """
 
-import importlib.metadata as importlib_metadata
+import time
 
-from .macos import (
-    MacOS,
-    MacOSKey,
-    MacOSKeyboardShortcut,
-)
+_import_started = time.perf_counter()
+"""when ksc started being imported, reported by --profile"""
 
-try:
-    __version__ = importlib_metadata.version(__name__)
-except importlib_metadata.PackageNotFoundError:  # pragma: nocover
-    __version__ = "unknown"
+# public names and the modules they live in, they are imported the first time
+# they are used, so importing ksc.client doesn't build the key tables
+_LAZY_ATTRIBUTES = {
+    "CacheInfo": ".cache",
+    "LRUCache": ".cache",
+    "MacOS": ".macos",
+    "MacOSKey": ".macos",
+    "MacOSKeyboardShortcut": ".macos",
+    "Metrics": ".metrics",
+    "ParseFailure": ".macos",
+    "RenderOptions": ".macos",
+    "ShortcutCache": ".cache",
+}
 
-VERSION_STRING = __version__
+
+def __getattr__(name):
+    """import things only when someone asks for them
+
+    importlib.metadata is expensive to import, and most invocations of ksc never
+    need the version. ksc-client only needs the socket, not the key tables.
+    """
+    # pylint: disable=import-outside-toplevel
+    if name in ("__version__", "VERSION_STRING"):
+        import importlib.metadata as importlib_metadata
+
+        try:
+            version = importlib_metadata.version(__name__)
+        except importlib_metadata.PackageNotFoundError:  # pragma: nocover
+            version = "unknown"
+        globals()["__version__"] = version
+        globals()["VERSION_STRING"] = version
+        return version
+    if name in _LAZY_ATTRIBUTES:
+        import importlib
+
+        value = getattr(importlib.import_module(_LAZY_ATTRIBUTES[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
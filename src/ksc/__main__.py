@@ -26,50 +26,48 @@ Entry point for 'ksc' command line program.
 """
 
 import argparse
+import collections
+import contextlib
+import itertools
+import os
 import sys
 import textwrap
 
-from rich.console import Console
-
 import ksc
 
+# almost every invocation needs the key tables, so build them while importing,
+# which is where --profile expects them to be
+import ksc.macos  # noqa: F401 pylint: disable=unused-import
+
 
 EXIT_SUCCESS = 0
 EXIT_ERROR = 1
 EXIT_USAGE = 2
 
 
-def _build_parser():
-    """build an arg parser with all the proper parameters"""
-    desc = "Create a standardized representation of a MacOS keyboard shortcut."
-    epilog = """\
-        Keyboard shortcuts can be entered in many ways:
+class _VersionAction(argparse.Action):
+    """show the version and exit
 
-            command shift F
-            option command h
-            command control option space
-            hyper space
+    Like the "version" action built in to argparse, except we don't look up
+    the version unless it's asked for.
+    """
 
-        Separate multiple shortcuts with ' / ' or ' | ':
+    def __init__(self, option_strings, dest=argparse.SUPPRESS, **kwargs):
+        super().__init__(
+            option_strings, dest, nargs=0, default=argparse.SUPPRESS, **kwargs
+        )
 
-            control x / control c
+    def __call__(self, parser, namespace, values, option_string=None):
+        print(ksc.VERSION_STRING)
+        parser.exit()
 
-        See https://github.com/kotfu/ksc for more info
-        """
-    parser = argparse.ArgumentParser(
-        formatter_class=argparse.RawDescriptionHelpFormatter,
-        description=desc,
-        epilog=textwrap.dedent(epilog),
-    )
-    parser.add_argument("shortcuts", nargs="*", help="keyboard shortcuts")
 
-    parser.add_argument(
-        "-v",
-        "--version",
-        action="version",
-        version=ksc.VERSION_STRING,
-        help="show the version information and exit",
-    )
+def _add_render_arguments(parser):
+    """add the arguments which control how shortcuts are rendered
+
+    The destinations of these arguments match the keyword arguments of
+    MacOSKeyboardShortcut.render() and RenderOptions
+    """
     mod_group = parser.add_mutually_exclusive_group()
     mod_group.add_argument(
         "-ma",
@@ -108,6 +106,66 @@ def _build_parser():
         action="store_true",
         help="clarify hard to read keys by spelling out their name, ignored if -k",
     )
+    parser.add_argument(
+        "-s",
+        "--style",
+        choices=ksc.RenderOptions.STYLES,
+        default="mac",
+        help=(
+            "style of shortcut based on operating system, -ma, -ms, -p, and -k"
+            " only apply to mac"
+        ),
+    )
+
+
+def _build_parser(prog=None):
+    """build an arg parser with all the proper parameters"""
+    desc = "Create a standardized representation of a MacOS keyboard shortcut."
+    epilog = """\
+        Keyboard shortcuts can be entered in many ways:
+
+            command shift F
+            option command h
+            command control option space
+            hyper space
+
+        Separate multiple shortcuts with ' / ' or ' | ':
+
+            control x / control c
+
+        Convert a file with one keyboard shortcut on each line:
+
+            ksc --batch shortcuts.txt
+
+        Rewrite the shortcut markup in a Markdown or HTML document:
+
+            ksc rewrite README.md
+
+        Render shortcuts for other programs over HTTP:
+
+            ksc serve --http
+
+        See https://github.com/kotfu/ksc for more info
+        """
+    parser = argparse.ArgumentParser(
+        prog=prog,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        description=desc,
+        epilog=textwrap.dedent(epilog),
+    )
+    parser.add_argument(
+        "shortcuts",
+        nargs="*",
+        help="keyboard shortcuts, or with --batch files containing keyboard shortcuts",
+    )
+
+    parser.add_argument(
+        "-v",
+        "--version",
+        action=_VersionAction,
+        help="show the version information and exit",
+    )
+    _add_render_arguments(parser)
 
     parser.add_argument(
         "-l",
@@ -115,24 +173,74 @@ def _build_parser():
         action="store_true",
         help="list all modifier and key names",
     )
+    parser.add_argument(
+        "--plain",
+        action="store_true",
+        help="with --list, output tab separated rows instead of a table",
+    )
+
+    parser.add_argument(
+        "--complete",
+        action="store_true",
+        help="list the key and modifier names which complete the last word given",
+    )
+    parser.add_argument(
+        "--shell-completion",
+        choices=["bash", "zsh"],
+        help="output a script which completes key and modifier names in a shell",
+    )
+
+    parser.add_argument(
+        "-b",
+        "--batch",
+        action="store_true",
+        help=(
+            "read keyboard shortcuts one per line from files or standard input"
+            " and output one line for each"
+        ),
+    )
+
+    parser.add_argument(
+        "--serve",
+        action="store_true",
+        help="run a daemon on a unix domain socket to answer requests from ksc-client",
+    )
+
+    parser.add_argument(
+        "-o",
+        "--output",
+        choices=["txt", "html", "json", "ndjson", "alfred"],
+        default="txt",
+        help=(
+            "output format, html puts each shortcut and each key in a <kbd> element,"
+            " json and ndjson output a record with everything about each shortcut,"
+            " alfred outputs every variant for an Alfred Script Filter"
+        ),
+    )
+    parser.add_argument(
+        "--alfred",
+        action="store_const",
+        dest="output",
+        const="alfred",
+        help="same as -o alfred",
+    )
+
+    # these are handled by _profile_request() before parsing, they are here
+    # so they show up in the help
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="show how long each phase takes on standard error",
+    )
+    parser.add_argument(
+        "--profile-stats",
+        metavar="FILE",
+        help="also profile with cProfile and save the stats in FILE",
+    )
 
     # potential future options, here for planning
     #
     # parser.add_argument(
-    #     "-o",
-    #     "--output",
-    #     choices=["txt", "html", "json"],
-    #     default="txt",
-    #     help="output format",
-    # )
-    # parser.add_argument(
-    #     "-s",
-    #     "--style",
-    #     choices=["mac", "win"],
-    #     default="mac",
-    #     help="style of shortcut based on operating system",
-    # )
-    # parser.add_argument(
     #     "-t",
     #     "--template",
     #     help="tempate to use for html output",
@@ -140,17 +248,113 @@ def _build_parser():
     return parser
 
 
-def main(argv=None):
-    """main function"""
-    parser = _build_parser()
+def main(argv=None, *, prog=None):
+    """main function
+
+    prog overrides the program name shown in help and error messages, which
+    ksc-client and the daemon use so their output matches the ksc command
+    """
+    if argv is None:
+        argv = sys.argv[1:]
+    first = next(_calls) == 0
+    argv, profile = _profile_request(argv)
+    if profile is None:
+        return _main(argv, prog, _no_phase)
+
+    # imported here so profiling costs nothing unless it's asked for
+    from . import profiling  # pylint: disable=import-outside-toplevel
+
+    return profiling.profile(
+        _main,
+        argv,
+        prog or os.path.basename(sys.argv[0]),
+        stats=profile or None,
+        imported=ksc._import_started if first else None,  # pylint: disable=protected-access
+    )
+
+
+def _main(argv, prog, phase):
+    """do the work of main()
+
+    phase() is called with the name of each phase when it's done, for --profile
+    """
+    if argv and argv[0] in COMMANDS:
+        # commands have their own arguments, so dispatch them before parsing
+        if prog is None:
+            prog = os.path.basename(sys.argv[0])
+        exit_code = COMMANDS[argv[0]](argv[1:], prog=f"{prog} {argv[0]}")
+        phase(argv[0])
+        return exit_code
+
+    parser = _build_parser(prog)
     args = parser.parse_args(argv)
-    console = Console()
+    if args.plain and not args.list:
+        parser.error("--plain requires --list")
+    phase("arguments")
+
+    if args.serve:
+        # imported here so the daemon machinery isn't loaded for every invocation
+        from . import daemon  # pylint: disable=import-outside-toplevel
+
+        return daemon.serve()
+
+    if args.list and args.plain:
+        # tab separated, without a header, so it's quick to pipe into fzf
+        rows = ksc.MacOS.named_key_rows(args.hyper)
+        print("\n".join("\t".join(row) for row in rows))
+        phase("list")
+        return EXIT_SUCCESS
 
     if args.list:
+        # rich is slow to import, and we only need it here
+        from rich.console import Console  # pylint: disable=import-outside-toplevel
+
+        phase("import rich")
+        console = Console()
         # list all available keys, don't parse any input
         console.print(ksc.MacOS.named_keys(**vars(args)))
+        phase("list")
+        return EXIT_SUCCESS
+
+    if args.complete or args.shell_completion:
+        # pylint: disable=import-outside-toplevel
+        from . import complete
+
+        if args.shell_completion:
+            options = [
+                option
+                for action in parser._actions  # pylint: disable=protected-access
+                for option in action.option_strings
+            ]
+            prog = os.path.basename(parser.prog)
+            print(complete.shell_script(args.shell_completion, prog, options), end="")
+        else:
+            # the last word is the one being completed, unless the input ends
+            # with a space, then it's a new, empty word
+            text = " ".join(args.shortcuts)
+            word = "" if text[-1:].isspace() else text.rsplit(maxsplit=1)[-1:]
+            names = complete.Completer.macos().suggest("".join(word), limit=None)
+            if names:
+                print("\n".join(names))
+        phase("complete")
         return EXIT_SUCCESS
 
+    if args.output == "alfred":
+        if args.batch:
+            parser.error("alfred output can't be used with --batch")
+        # imported here so only Alfred pays for importing json
+        from .alfred import script_filter  # pylint: disable=import-outside-toplevel
+
+        options = ksc.RenderOptions.compile(**vars(args))
+        print(script_filter(" ".join(args.shortcuts), options))
+        phase("alfred")
+        return EXIT_SUCCESS
+
+    if args.batch:
+        exit_code = _batch(parser, args)
+        phase("batch")
+        return exit_code
+
     if not args.shortcuts:
         print(
             f"{parser.prog}: error: the following arguments are required: shortcuts",
@@ -158,18 +362,510 @@ def main(argv=None):
         )
         return EXIT_USAGE
 
+    text = " ".join(args.shortcuts)
     try:
-        combos = ksc.MacOS.parse_shortcuts(" ".join(args.shortcuts))
+        combos = ksc.MacOS.parse_shortcuts(text)
     except ValueError as err:
         print(f"{parser.prog}: {err}", file=sys.stderr)
         return EXIT_ERROR
+    finally:
+        phase("parse")
+
+    options = ksc.RenderOptions.compile(**vars(args))
+    if args.output in RECORD_FORMATS:
+        # pylint: disable=import-outside-toplevel
+        from .records import RecordEncoder, write_records
 
+        encode = RecordEncoder(options).encode
+        texts = ksc.MacOS.sequence_regex.split(text)
+        records = (
+            encode(combo, part) for combo, part in zip(combos, texts, strict=True)
+        )
+        write_records(records, sys.stdout.write, ndjson=args.output == "ndjson")
+        phase("render and output")
+        return EXIT_SUCCESS
     output = []
     for combo in combos:
-        output.append(combo.render(**vars(args)))
+        output.append(options.render(combo))
+    phase("render")
     print(" ".join(output))
+    phase("output")
+    return EXIT_SUCCESS
+
+
+def _no_phase(_name):
+    """stand in for a profiling.Phases clock when not profiling"""
+
+
+# counts calls to main(), only the first one in a process includes the imports
+_calls = itertools.count()
+
+
+def _profile_request(argv):
+    """find out if this invocation should be profiled
+
+    Returns argv without any profiling options, and None when not profiling,
+    an empty string to only time the phases, or the name of a file to save
+    cProfile stats in.
+
+    The options are removed here, before any parsing, so they work anywhere on
+    the command line, including with commands like ``ksc --profile rewrite``.
+    """
+    profile = os.environ.get("KSC_PROFILE", "")
+    if profile in ("", "0"):
+        profile = None
+    elif profile == "1":
+        profile = ""
+    if not any(arg.startswith("--profile") for arg in argv):
+        return argv, profile
+
+    remaining = []
+    args = iter(argv)
+    for arg in args:
+        if arg == "--":
+            remaining.append(arg)
+            remaining.extend(args)
+        elif arg == "--profile":
+            profile = profile or ""
+        elif arg == "--profile-stats":
+            stats = next(args, None)
+            if stats is None:
+                # leave it for argparse to complain about
+                remaining.append(arg)
+            else:
+                profile = stats
+        elif arg.startswith("--profile-stats="):
+            profile = arg.partition("=")[2]
+        else:
+            remaining.append(arg)
+    return remaining, profile
+
+
+def _batch(parser, args):
+    """parse and render every line of every file given on the command line
+
+    Output has one line for every line of input, so the output lines up with the
+    input. Blank lines and lines which can't be parsed produce blank output, and
+    the error is reported on stderr with the file name and line number. Processing
+    continues after errors.
+
+    With json or ndjson output, there is a record for every shortcut which
+    includes the file name and line number, and there is no output for blank
+    lines or errors.
+    """
+    options = ksc.RenderOptions.compile(**vars(args))
+    stats = collections.Counter()
+    lines = _batch_lines(parser, args, stats)
+    write = sys.stdout.write
+    if args.output in RECORD_FORMATS:
+        # pylint: disable=import-outside-toplevel
+        from .records import RecordEncoder, write_records
+
+        encode = RecordEncoder(options).encode
+        records = (
+            encode(combo, part, file=filename, line=lineno)
+            for filename, lineno, text, combos in lines
+            if combos
+            for combo, part in zip(
+                combos, ksc.MacOS.sequence_regex.split(text), strict=True
+            )
+        )
+        write_records(records, write, ndjson=args.output == "ndjson")
+    else:
+        render = options.render
+        for _, _, _, combos in lines:
+            if combos:
+                write(" ".join(render(combo) for combo in combos))
+            write("\n")
+    if stats["failures"]:
+        print(
+            f"{parser.prog}: {stats['failures']} errors in {stats['lines']} lines",
+            file=sys.stderr,
+        )
+        return EXIT_ERROR
     return EXIT_SUCCESS
 
 
+def _batch_lines(parser, args, stats):
+    """generate (filename, lineno, text, combos) for every line of the batch files
+
+    combos is None for blank lines and lines which can't be parsed, errors are
+    reported as they are found. The number of lines and failures are counted
+    in stats.
+    """
+    for filename in args.shortcuts or ["-"]:
+        if filename == "-":
+            # don't close stdin when we are done with it
+            source = contextlib.nullcontext(sys.stdin)
+            filename = "<stdin>"
+        else:
+            try:
+                source = open(filename, encoding="utf-8")  # noqa: SIM115
+            except OSError as err:
+                print(f"{parser.prog}: {err}", file=sys.stderr)
+                stats["failures"] += 1
+                continue
+        with source as fobj:
+            # parse_many() generates a result for every text, in order, so the
+            # copy of the texts from tee() never gets more than one line ahead
+            texts, parse_texts = itertools.tee(line.strip() for line in fobj)
+            results = ksc.MacOS.parse_many(parse_texts, "collect", sequences=True)
+            pairs = zip(texts, results, strict=True)
+            for lineno, (text, result) in enumerate(pairs, start=1):
+                stats["lines"] += 1
+                combos = None
+                if not text:
+                    pass
+                elif isinstance(result, ksc.ParseFailure):
+                    print(
+                        f"{parser.prog}: {filename}:{lineno}: {result.message}",
+                        file=sys.stderr,
+                    )
+                    stats["failures"] += 1
+                else:
+                    combos = result
+                yield filename, lineno, text, combos
+
+
+def _rewrite(argv, prog):
+    """ksc rewrite: replace shortcut markup in documents"""
+    parser = argparse.ArgumentParser(
+        prog=prog,
+        description=(
+            "Replace {% kbd ... %} tags and <kbd>...</kbd> spans in Markdown and"
+            " HTML documents with standardized keyboard shortcuts."
+        ),
+    )
+    parser.add_argument(
+        "files",
+        nargs="*",
+        help=(
+            "documents or directories of documents to rewrite, if not given read"
+            " standard input"
+        ),
+    )
+    parser.add_argument(
+        "-i",
+        "--in-place",
+        action="store_true",
+        help="rewrite the files instead of writing to standard output",
+    )
+    parser.add_argument(
+        "-d",
+        "--dest",
+        help="write the documents from a directory to this directory",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        help="number of processes used to rewrite directories, default is one per CPU",
+    )
+    parser.add_argument(
+        "-f",
+        "--force",
+        action="store_true",
+        help="rewrite documents in directories even if they haven't changed",
+    )
+    _add_render_arguments(parser)
+    args = parser.parse_args(argv)
+
+    directories = [filename for filename in args.files if os.path.isdir(filename)]
+    if args.dest and (len(directories) != 1 or len(args.files) != 1):
+        parser.error("--dest requires exactly one directory")
+    if directories and not (args.in_place or args.dest):
+        parser.error("directories require --in-place or --dest")
+    if args.jobs is not None and args.jobs < 1:
+        parser.error("--jobs must be at least 1")
+
+    # pylint: disable=import-outside-toplevel
+    from .rewrite import Rewriter, RewriteResult, is_markdown, rewrite_tree
+
+    options = ksc.RenderOptions.compile(**vars(args))
+    rewriter = Rewriter(options)
+    exit_code = EXIT_SUCCESS
+    results = []
+    if not args.files:
+        results.append(("<stdin>", rewriter.rewrite(sys.stdin, sys.stdout)))
+    for filename in args.files:
+        try:
+            if filename in directories:
+                tree = rewrite_tree(
+                    filename,
+                    args.dest,
+                    options=options,
+                    jobs=args.jobs,
+                    force=args.force,
+                )
+                for relpath, error in tree.errors:
+                    path = os.path.join(filename, relpath)
+                    results.append((path, RewriteResult(0, [error])))
+            elif args.in_place:
+                results.append((filename, rewriter.rewrite_file(filename)))
+            else:
+                with open(filename, encoding="utf-8", newline="") as infile:
+                    result = rewriter.rewrite(
+                        infile, sys.stdout, markdown=is_markdown(filename)
+                    )
+                    results.append((filename, result))
+        except OSError as err:
+            print(f"{prog}: {err}", file=sys.stderr)
+            exit_code = EXIT_ERROR
+    for filename, result in results:
+        for error in result.errors:
+            if error.lineno is None:
+                print(f"{prog}: {filename}: {error.message}", file=sys.stderr)
+            else:
+                print(
+                    f"{prog}: {filename}:{error.lineno}: {error.message}",
+                    file=sys.stderr,
+                )
+            exit_code = EXIT_ERROR
+    return exit_code
+
+
+def _audit(argv, prog):
+    """ksc audit: find conflicting and duplicate bindings in keymaps"""
+    parser = argparse.ArgumentParser(
+        prog=prog,
+        description=(
+            "Find shortcuts which are bound more than once in keymaps. Each line of"
+            " a keymap is a shortcut and an action, separated by a tab."
+        ),
+    )
+    parser.add_argument(
+        "keymaps",
+        nargs="*",
+        help="keymap files, if not given read standard input",
+    )
+    parser.add_argument(
+        "-d",
+        "--delimiter",
+        default="\t",
+        help="character between the shortcut and the action, default is a tab",
+    )
+    _add_render_arguments(parser)
+    args = parser.parse_args(argv)
+
+    # pylint: disable=import-outside-toplevel
+    from .audit import Auditor, is_conflict
+
+    auditor = Auditor(args.delimiter)
+    exit_code = EXIT_SUCCESS
+    for filename in args.keymaps or ["-"]:
+        if filename == "-":
+            auditor.add_keymap(sys.stdin, "<stdin>")
+            continue
+        try:
+            with open(filename, encoding="utf-8") as keymap:
+                auditor.add_keymap(keymap, filename)
+        except OSError as err:
+            print(f"{prog}: {err}", file=sys.stderr)
+            exit_code = EXIT_ERROR
+    for error in auditor.errors:
+        print(
+            f"{prog}: {error.filename}:{error.lineno}: {error.message}", file=sys.stderr
+        )
+        exit_code = EXIT_ERROR
+
+    render = ksc.RenderOptions.compile(**vars(args)).render
+    counts = collections.Counter()
+    for group in auditor.groups():
+        kind = "conflict" if is_conflict(group) else "duplicate"
+        counts[kind] += 1
+        print(f"{' '.join(render(combo) for combo in group.combos)}: {kind}")
+        for filename, lineno, text, action in group.bindings:
+            print(f"  {filename}:{lineno}: {text} -> {action}")
+    print(
+        f"{counts['conflict']} conflicts and {counts['duplicate']} duplicates"
+        f" in {auditor.bindings} bindings"
+    )
+    if counts["conflict"]:
+        exit_code = EXIT_ERROR
+    return exit_code
+
+
+def _import_cocoa(argv, prog):
+    """ksc import-cocoa: convert Cocoa key binding dictionaries"""
+    parser = argparse.ArgumentParser(
+        prog=prog,
+        description=(
+            "Output the shortcut and actions of every binding in Cocoa"
+            " DefaultKeyBinding.dict files, separated by a tab."
+        ),
+    )
+    parser.add_argument(
+        "files",
+        nargs="*",
+        help="key binding dictionaries, if not given read standard input",
+    )
+    _add_render_arguments(parser)
+    args = parser.parse_args(argv)
+
+    # pylint: disable=import-outside-toplevel
+    from .cocoa import CHUNK_SIZE, read_bindings
+
+    render = ksc.RenderOptions.compile(**vars(args)).render
+    write = sys.stdout.write
+    exit_code = EXIT_SUCCESS
+    for filename in args.files or ["-"]:
+        try:
+            if filename == "-":
+                source = contextlib.nullcontext(sys.stdin)
+                filename = "<stdin>"
+            else:
+                source = open(filename, encoding="utf-8")  # noqa: SIM115
+            with source as fobj:
+                chunks = iter(lambda fobj=fobj: fobj.read(CHUNK_SIZE), "")
+                for combos, actions, lineno in read_bindings(chunks):
+                    if combos is None:
+                        print(
+                            f"{prog}: {filename}:{lineno}: unknown key",
+                            file=sys.stderr,
+                        )
+                        exit_code = EXIT_ERROR
+                        continue
+                    shortcut = " ".join(render(combo) for combo in combos)
+                    write(f"{shortcut}\t{', '.join(actions)}\n")
+        except (OSError, ValueError) as err:
+            print(f"{prog}: {filename}: {err}", file=sys.stderr)
+            exit_code = EXIT_ERROR
+    return exit_code
+
+
+def _import_km(argv, prog):
+    """ksc import-km: list the hot keys of Keyboard Maestro macros"""
+    parser = argparse.ArgumentParser(
+        prog=prog,
+        description=(
+            "Output a cheat sheet of the hot key triggers of the macros in Keyboard"
+            " Maestro .kmmacros and .kmlibrary files."
+        ),
+    )
+    parser.add_argument(
+        "files",
+        nargs="*",
+        help="Keyboard Maestro files, if not given read standard input",
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        choices=["txt", "json", "ndjson"],
+        default="txt",
+        help="output format, json and ndjson output a record for each hot key",
+    )
+    _add_render_arguments(parser)
+    args = parser.parse_args(argv)
+
+    # pylint: disable=import-outside-toplevel
+    from .keyboardmaestro import CHUNK_SIZE, read_hot_keys
+
+    options = ksc.RenderOptions.compile(**vars(args))
+    stats = collections.Counter()
+
+    def hot_keys():
+        """generate (filename, HotKey) for every hot key MacOS knows about"""
+        for filename in args.files or ["-"]:
+            try:
+                if filename == "-":
+                    source = contextlib.nullcontext(sys.stdin.buffer)
+                    filename = "<stdin>"
+                else:
+                    source = open(filename, "rb")  # noqa: SIM115
+                with source as fobj:
+                    chunks = iter(lambda fobj=fobj: fobj.read(CHUNK_SIZE), b"")
+                    for hot_key in read_hot_keys(chunks):
+                        if hot_key.combo is None:
+                            print(
+                                f"{prog}: {filename}:{hot_key.lineno}: unknown key",
+                                file=sys.stderr,
+                            )
+                            stats["failures"] += 1
+                        else:
+                            yield filename, hot_key
+            except (OSError, ValueError) as err:
+                print(f"{prog}: {filename}: {err}", file=sys.stderr)
+                stats["failures"] += 1
+
+    if args.output in RECORD_FORMATS:
+        # pylint: disable=import-outside-toplevel
+        from .records import RecordEncoder, write_records
+
+        encode = RecordEncoder(options).encode
+        records = (
+            encode(
+                hot_key.combo,
+                file=filename,
+                line=hot_key.lineno,
+                group=hot_key.group,
+                macro=hot_key.macro,
+            )
+            for filename, hot_key in hot_keys()
+        )
+        write_records(records, sys.stdout.write, ndjson=args.output == "ndjson")
+    else:
+        render = options.render
+        # hot keys are generated a group at a time, so a group is never split
+        for group, items in itertools.groupby(hot_keys(), lambda item: item[1].group):
+            rows = [(render(hot_key.combo), hot_key.macro) for _, hot_key in items]
+            width = max(len(shortcut) for shortcut, _ in rows)
+            print(group or "Macros")
+            for shortcut, macro in rows:
+                print(f"    {shortcut:<{width}}    {macro}")
+    return EXIT_ERROR if stats["failures"] else EXIT_SUCCESS
+
+
+def _serve(argv, prog):
+    """ksc serve: run the daemon, or an HTTP service"""
+    parser = argparse.ArgumentParser(
+        prog=prog,
+        description=(
+            "Run the daemon which answers requests from ksc-client, or with --http,"
+            " a service which renders shortcuts over HTTP."
+        ),
+    )
+    parser.add_argument(
+        "--http",
+        action="store_true",
+        help="serve HTTP instead of running the daemon",
+    )
+    parser.add_argument(
+        "--host",
+        default="127.0.0.1",
+        help="address for the HTTP service to listen on, default is %(default)s",
+    )
+    parser.add_argument(
+        "--port",
+        type=int,
+        default=8000,
+        help="port for the HTTP service to listen on, default is %(default)s",
+    )
+    args = parser.parse_args(argv)
+
+    # pylint: disable=import-outside-toplevel
+    if args.http:
+        from . import service
+
+        return service.serve(args.host, args.port, prog=prog)
+
+    from . import daemon
+
+    return daemon.serve()
+
+
+RECORD_FORMATS = ("json", "ndjson")
+"""output formats which produce records from ksc.records instead of text"""
+
+
+COMMANDS = {
+    "audit": _audit,
+    "import-cocoa": _import_cocoa,
+    "import-km": _import_km,
+    "rewrite": _rewrite,
+    "serve": _serve,
+}
+"""commands which can be given as the first argument, and the function for each"""
+
+
 if __name__ == "__main__":  # pragma: nocover
     sys.exit(main())
@@ -0,0 +1,93 @@
+#
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2021 Jared Crapo
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+"""
+Alfred Script Filter output
+
+Alfred runs a Script Filter every time you type a character, and shows the items
+it outputs as you type. For ksc, the items are the input rendered every way
+that's useful, so you can pick the one you want:
+
+    $ ksc --alfred command shift p
+    {"items": [{"title": "Shift-Command-P", "subtitle": "Names", ...}, ...]}
+
+The input is parsed once, and rendered with the compiled RenderOptions for each
+variant. Alfred waits for this on every keystroke, so this module only imports
+json and the variants from ksc.records, and only when ksc is run with --alfred.
+
+See https://www.alfredapp.com/help/workflows/inputs/script-filter/json/
+"""
+
+import json
+
+from .macos import MacOS, RenderOptions
+from .records import VARIANTS
+
+SUBTITLES = {"ascii": "ASCII", "html": "HTML"}
+"""the subtitles of the variants whose names aren't just capitalized"""
+
+HINT = "Type a keyboard shortcut like: command shift p"
+
+
+def _item(title, subtitle):
+    """return a Script Filter item which pastes its title"""
+    return {
+        "title": title,
+        "subtitle": subtitle,
+        "arg": title,
+        "text": {"copy": title, "largetype": title},
+    }
+
+
+def script_filter(text, options=None):
+    """return the Script Filter JSON for the shortcuts in text
+
+    options is the RenderOptions from the command line, if they are anything
+    other than the defaults, that rendering is the first item. Variants which
+    render the same as an earlier one are left out.
+    """
+    if not text.strip():
+        items = [{"title": "ksc", "subtitle": HINT, "valid": False}]
+    else:
+        try:
+            combos = MacOS.parse_shortcuts(text)
+        except ValueError as err:
+            items = [{"title": str(err), "subtitle": HINT, "valid": False}]
+        else:
+            variants = [
+                (
+                    SUBTITLES.get(name, name.capitalize()),
+                    RenderOptions.compile(**kwargs),
+                )
+                for name, kwargs in VARIANTS.items()
+            ]
+            if options is not None and options is not variants[0][1]:
+                variants.insert(0, ("Your options", options))
+            items = []
+            seen = set()
+            for name, variant in variants:
+                title = " ".join(variant.render(combo) for combo in combos)
+                if title not in seen:
+                    seen.add(title)
+                    items.append(_item(title, name))
+    return json.dumps({"items": items}, ensure_ascii=False)
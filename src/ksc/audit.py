@@ -0,0 +1,123 @@
+#
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2021 Jared Crapo
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+"""
+Find conflicting and duplicate bindings in keymaps
+
+A keymap is a file with a binding on each line, the text of a shortcut and the
+action it's bound to, separated by a tab:
+
+    cmd-shift-p	Command Palette
+    ⇧⌘P	Open File
+
+Every binding is parsed, and bindings are grouped by the shortcuts they parse
+to, no matter how they are written. MacOSKeyboardShortcut objects are hashable
+and equal when they are the same shortcut, so grouping is a dictionary lookup
+for each binding, and one pass finds every group, however big the keymap is.
+
+A group with more than one action is a conflict, a group with the same action
+more than once is a duplicate.
+"""
+
+import collections
+import itertools
+
+from .macos import MacOS, ParseFailure
+
+Binding = collections.namedtuple("Binding", ["filename", "lineno", "text", "action"])
+"""a line of a keymap"""
+
+Group = collections.namedtuple("Group", ["combos", "bindings"])
+"""the bindings which all parse to the same tuple of shortcuts"""
+
+AuditError = collections.namedtuple("AuditError", ["filename", "lineno", "message"])
+"""a line of a keymap which isn't a binding"""
+
+
+def is_conflict(group):
+    """return True if the bindings in group are for more than one action"""
+    first = group.bindings[0].action
+    return any(binding.action != first for binding in group.bindings)
+
+
+class Auditor:
+    """group the bindings of keymaps by the shortcuts they parse to
+
+    Add keymaps with add_keymap(), then look at groups() and errors.
+    """
+
+    def __init__(self, delimiter="\t"):
+        self.delimiter = delimiter
+        # the bindings for each tuple of shortcuts, in the order they were first seen
+        self._groups = {}
+        self.bindings = 0
+        self.errors = []
+
+    def add_keymap(self, lines, filename):
+        """add the bindings from an iterable of lines, like an open file
+
+        Blank lines, and lines starting with #, are skipped.
+        """
+        rows = self._rows(lines, filename)
+        # parse_many() generates a result for every text, in order, so the
+        # copy of the rows from tee() never gets more than one row ahead
+        rows, texts = itertools.tee(rows)
+        results = MacOS.parse_many((row[0] for row in texts), "collect", sequences=True)
+        groups = self._groups
+        for (text, action, lineno), result in zip(rows, results, strict=True):
+            if result.__class__ is ParseFailure:
+                self.errors.append(AuditError(filename, lineno, result.message))
+                continue
+            self.bindings += 1
+            binding = Binding(filename, lineno, text, action)
+            key = tuple(result)
+            group = groups.get(key)
+            if group is None:
+                groups[key] = [binding]
+            else:
+                group.append(binding)
+
+    def _rows(self, lines, filename):
+        """generate (text, action, lineno) for each binding in lines"""
+        delimiter = self.delimiter
+        for lineno, line in enumerate(lines, start=1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            text, found, action = line.partition(delimiter)
+            text = text.strip()
+            if not found or not text:
+                self.errors.append(
+                    AuditError(filename, lineno, "expected a shortcut and an action")
+                )
+                continue
+            yield text, action.strip(), lineno
+
+    def groups(self):
+        """generate a Group for every shortcut bound more than once
+
+        Groups are generated in the order their shortcuts first appear.
+        """
+        for combos, bindings in self._groups.items():
+            if len(bindings) > 1:
+                yield Group(combos, bindings)
@@ -0,0 +1,180 @@
+#
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2021 Jared Crapo
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+"""
+Opt-in caches for parsed and rendered shortcuts
+
+If you parse and render the same shortcuts over and over, keep a ShortcutCache
+around and use it instead of MacOS.parse_shortcut() and render():
+
+    cache = ksc.ShortcutCache()
+    combo = cache.parse_shortcut("command shift p")
+    text = cache.render(combo, modifier_symbols=True)
+
+Both caches are bounded, evicting the least recently used entry when they are
+full, and are safe to use from multiple threads.
+"""
+
+import collections
+import threading
+
+from .macos import MacOS, RenderOptions
+
+CacheInfo = collections.namedtuple(
+    "CacheInfo", ["hits", "misses", "maxsize", "currsize"]
+)
+
+
+class LRUCache:
+    """a thread safe mapping which holds at most maxsize entries
+
+    When full, adding an entry evicts the least recently used one.
+    """
+
+    def __init__(self, maxsize=1024):
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+        self.maxsize = maxsize
+        self._data = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        """return the value for key, or default if key isn't in the cache"""
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self._misses += 1
+                return default
+            self._data.move_to_end(key)
+            self._hits += 1
+            return value
+
+    def put(self, key, value):
+        """add or replace the value for key, evicting the oldest entry if full"""
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def cache_info(self):
+        """return a CacheInfo with the hits, misses, maxsize and current size"""
+        with self._lock:
+            return CacheInfo(self._hits, self._misses, self.maxsize, len(self._data))
+
+    def clear(self):
+        """remove all entries and reset the statistics"""
+        with self._lock:
+            self._data.clear()
+            self._hits = 0
+            self._misses = 0
+
+
+_MISSING = object()
+
+
+class _ParseFailure:
+    """a negative cache entry, remembers why the text couldn't be parsed"""
+
+    # pylint: disable=too-few-public-methods
+    __slots__ = ("message",)
+
+    def __init__(self, message):
+        self.message = message
+
+
+class ShortcutCache:
+    """cache the results of parsing and rendering shortcuts
+
+    The parse cache is keyed on the text being parsed. Text which can't be
+    parsed is cached too, so parsing it again raises ValueError without doing
+    the work again. The render cache is keyed on the shortcut and the render
+    options.
+    """
+
+    def __init__(self, maxsize=1024, render_maxsize=None):
+        """
+        maxsize is the number of entries in the parse cache
+
+        render_maxsize is the number of entries in the render cache, which
+        defaults to the size of the parse cache
+        """
+        self._parses = LRUCache(maxsize)
+        self._renders = LRUCache(render_maxsize or maxsize)
+
+    def parse_shortcut(self, text):
+        """like MacOS.parse_shortcut(), but cached"""
+        combo = self._parses.get(text, _MISSING)
+        if MacOS.metrics is not None:
+            MacOS.metrics.cache_lookup(combo is not _MISSING)
+        if combo is _MISSING:
+            try:
+                combo = MacOS.parse_shortcut(text)
+            except ValueError as err:
+                self._parses.put(text, _ParseFailure(str(err)))
+                raise
+            self._parses.put(text, combo)
+        elif isinstance(combo, _ParseFailure):
+            raise ValueError(combo.message)
+        return combo
+
+    def parse_shortcuts(self, text):
+        """like MacOS.parse_shortcuts(), but each shortcut is cached"""
+        return [
+            self.parse_shortcut(combo) for combo in MacOS.sequence_regex.split(text)
+        ]
+
+    def render(self, combo, **kwargs):
+        """like combo.render(), but cached
+
+        Designed to be called with the namespace from argparse:
+
+            cache.render(combo, **vars(args))
+        """
+        options = RenderOptions.compile(**kwargs)
+        key = (combo, options.values)
+        text = self._renders.get(key, _MISSING)
+        if MacOS.metrics is not None:
+            MacOS.metrics.cache_lookup(text is not _MISSING)
+        if text is _MISSING:
+            text = options.render(combo)
+            self._renders.put(key, text)
+        return text
+
+    def cache_info(self):
+        """return a dictionary with a CacheInfo for the "parse" and "render" caches"""
+        return {
+            "parse": self._parses.cache_info(),
+            "render": self._renders.cache_info(),
+        }
+
+    def clear(self):
+        """empty both caches and reset their statistics"""
+        self._parses.clear()
+        self._renders.clear()
@@ -0,0 +1,211 @@
+#
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2021 Jared Crapo
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+"""
+Thin client for the ksc daemon
+
+Forward the command line arguments to a daemon started with 'ksc --serve' and
+print the result. If the daemon isn't running, parse the arguments in this
+process instead, so ksc-client always works, it's just faster with the daemon.
+
+This module is imported on every launcher invocation, so it only imports what
+it needs to talk to the socket. That's why it uses _socket instead of socket,
+which imports enum and selectors, and costs more than the rest of the client.
+Importing the ksc package is cheap, it doesn't build the key tables until
+they're used.
+
+The protocol is intentionally tiny. The client sends its working directory and
+then each argument, each followed by a NUL character, then shuts down its side
+of the socket. The daemon runs the command in that directory, so relative paths
+mean the same thing they would to ksc. The daemon replies
+with a header packed as three network order integers: the exit code, the length
+of the standard output, and the length of standard error. The header is followed
+by the utf-8 encoded standard output and standard error.
+"""
+
+import _socket
+import os
+import struct
+import sys
+
+TIMEOUT = 2.0
+"""seconds to wait to connect to the daemon before parsing in process instead"""
+
+HEADER = struct.Struct("!iII")
+"""exit code, length of stdout, length of stderr"""
+
+RUN_LOCALLY = -1
+"""exit code the daemon sends when the client has to do the work itself, because
+the command reads standard input, which the daemon doesn't have, or the daemon
+can't get to the client's working directory"""
+
+
+def socket_path():
+    """return the path of the unix domain socket used by the daemon and the client
+
+    The socket is in $XDG_RUNTIME_DIR if it's set, otherwise in a directory of
+    the temporary directory which only the user can get into. Set the
+    KSC_SOCKET environment variable to use a different path.
+    """
+    path = os.environ.get("KSC_SOCKET")
+    if path:
+        return path
+    rundir = os.environ.get("XDG_RUNTIME_DIR")
+    if rundir:
+        return os.path.join(rundir, "ksc.sock")
+    # tempfile.gettempdir() would do, but importing tempfile costs more than
+    # the entire rest of the client
+    tmpdir = os.environ.get("TMPDIR") or "/tmp"
+    return os.path.join(tmpdir, f"ksc-{os.getuid()}", "ksc.sock")
+
+
+def safe_directory(path):
+    """return True if other users can't replace the files of this user in the
+    directory path
+
+    That's true if only this user, or root, can write to the directory, or if
+    it's sticky like /tmp, where only the owner of a file can remove or rename it.
+    """
+    try:
+        info = os.stat(path)
+    except OSError:
+        return False
+    if info.st_uid not in (os.getuid(), 0):
+        return False
+    return not info.st_mode & 0o022 or bool(info.st_mode & 0o1000)
+
+
+def trusted_socket(path):
+    """return True if the socket at path belongs to this user, and other users
+    can't replace it
+
+    Anyone can create a socket in a shared directory, so without this another
+    user could pretend to be the daemon, and send back whatever they like.
+    """
+    try:
+        info = os.stat(path)
+    except OSError:
+        return False
+    return info.st_uid == os.getuid() and safe_directory(os.path.dirname(path) or ".")
+
+
+def encode_request(argv, cwd):
+    """turn a working directory and a list of arguments into the bytes sent to
+    the daemon"""
+    return "".join(f"{arg}\0" for arg in [cwd, *argv]).encode("utf-8")
+
+
+def decode_request(data):
+    """turn the bytes sent by a client back into (cwd, argv)"""
+    cwd, *argv = data.decode("utf-8").split("\0")[:-1]
+    return cwd, argv
+
+
+def encode_response(exit_code, out, err):
+    """pack the exit code and output into the bytes sent back to the client"""
+    out = out.encode("utf-8")
+    err = err.encode("utf-8")
+    return HEADER.pack(exit_code, len(out), len(err)) + out + err
+
+
+def decode_response(data):
+    """unpack the bytes sent by the daemon into (exit_code, out, err)"""
+    exit_code, outlen, errlen = HEADER.unpack_from(data)
+    start = HEADER.size
+    out = data[start : start + outlen].decode("utf-8")
+    err = data[start + outlen : start + outlen + errlen].decode("utf-8")
+    return exit_code, out, err
+
+
+def starts_server(argv):
+    """return True if argv starts the daemon or the http service
+
+    Those have to run in their own process, never inside the daemon. "serve" is
+    checked anywhere in argv, not just as the command, so options in front of it
+    don't matter, and it isn't the name of any key, so nothing else is caught.
+    """
+    return "--serve" in argv or "serve" in argv
+
+
+def request(argv, path=None):
+    """send argv and the working directory to the daemon and return
+    (exit_code, out, err), or None if the daemon isn't running, or its socket
+    can't be trusted
+
+    Once the daemon has the request, wait as long as it takes for the answer.
+    Commands like rewrite can run for a while, and running them again in the
+    client would do the work twice. Raises OSError if the connection is lost
+    after the request is sent.
+    """
+    if path is None:
+        path = socket_path()
+    if not trusted_socket(path):
+        return None
+    sock = _socket.socket(_socket.AF_UNIX, _socket.SOCK_STREAM)
+    try:
+        sock.settimeout(TIMEOUT)
+        try:
+            sock.connect(path)
+        except OSError:
+            return None
+        sock.settimeout(None)
+        sock.sendall(encode_request(argv, os.getcwd()))
+        sock.shutdown(_socket.SHUT_WR)
+        chunks = []
+        while True:
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+    finally:
+        sock.close()
+    data = b"".join(chunks)
+    if len(data) < HEADER.size:
+        raise ConnectionError("incomplete response from ksc daemon")
+    return decode_response(data)
+
+
+def main(argv=None):
+    """entry point for ksc-client"""
+    if argv is None:
+        argv = sys.argv[1:]
+    if not starts_server(argv):
+        try:
+            response = request(argv)
+        except OSError as err:
+            # the daemon may have done some of the work, so don't run it again
+            sys.stderr.write(f"ksc-client: {err}\n")
+            return 1
+        if response is not None and response[0] != RUN_LOCALLY:
+            exit_code, out, err = response
+            sys.stdout.write(out)
+            sys.stderr.write(err)
+            return exit_code
+    # no daemon, or the daemon can't do it, so do it ourselves
+    from .__main__ import main as ksc_main  # pylint: disable=import-outside-toplevel
+
+    return ksc_main(argv, prog="ksc")
+
+
+if __name__ == "__main__":  # pragma: nocover
+    sys.exit(main())
@@ -0,0 +1,314 @@
+#
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2021 Jared Crapo
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+"""
+Read key bindings from Cocoa DefaultKeyBinding.dict files
+
+The Cocoa Text System reads key bindings from ~/Library/KeyBindings/
+DefaultKeyBinding.dict, an old style property list which maps keys to the
+selectors of actions:
+
+    {
+        "^f" = "moveWordForward:";          /* Control-F */
+        "$\\UF700" = "moveUpAndModifySelection:";
+        "^x" = {                           /* Control-X, then Control-S */
+            "^s" = "save:";
+        };
+    }
+
+Each key is made of modifier characters, ^ for Control, ~ for Option, $ for
+Shift, @ for Command and # for the numeric keypad, followed by the key, which is
+a character, or a function key from the private use area, like \\UF700 for the
+up arrow.
+
+The file is read a chunk at a time, and each binding is generated as soon as
+it's read, so files of any size can be converted without holding them in memory.
+
+    >>> text = '{ "^f" = moveWordForward:; "^x" = { "@s" = "save:"; }; }'
+    >>> [(str(combos[-1]), actions) for combos, actions, _ in read_bindings([text])]
+    [('Control-F', ['moveWordForward:']), ('Command-S', ['save:'])]
+"""
+
+import collections
+import itertools
+import re
+
+from .macos import MacOS
+
+CHUNK_SIZE = 64 * 1024
+"""characters read at a time"""
+
+MODIFIERS = {
+    "^": MacOS.mod_bits[MacOS.mods_ascii["^"]],
+    "~": MacOS.mod_bits[MacOS.mods_ascii["~"]],
+    "$": MacOS.mod_bits[MacOS.mods_ascii["$"]],
+    "@": MacOS.mod_bits[MacOS.mods_ascii["@"]],
+    # the numeric keypad, which ksc doesn't distinguish
+    "#": 0,
+}
+"""the bits of each modifier character"""
+
+FUNCTION_KEYS = ("\uf700", "\uf8ff")
+"""the first and last characters Cocoa uses for function keys"""
+
+KEYS = {
+    # the NS*FunctionKey constants from NSEvent.h which MacOS has a key for
+    "\uf700": "up",
+    "\uf701": "down",
+    "\uf702": "left",
+    "\uf703": "right",
+    **{chr(0xF704 + number - 1): f"f{number}" for number in range(1, 36)},
+    "\uf728": "forwarddelete",
+    "\uf729": "home",
+    "\uf72b": "end",
+    "\uf72c": "pageup",
+    "\uf72d": "pagedown",
+    "\uf739": "clear",
+    # control characters
+    "\x7f": "delete",
+    "\x08": "delete",
+    "\x1b": "escape",
+    "\r": "return",
+    "\n": "return",
+    "\x03": "enter",
+    "\t": "tab",
+    " ": "space",
+}
+"""the name of each key which isn't written as itself"""
+
+# the tokens of an old style property list, a quoted string, an unquoted string,
+# or punctuation. Whitespace and comments before the token are skipped. A slash
+# which starts a comment is never part of an unquoted string, so a comment split
+# across chunks isn't mistaken for one.
+TOKEN_REGEX = re.compile(
+    r"""
+    (?:\s+|//[^\n]*\n|/\*.*?\*/)*
+    (?:
+        "((?:[^"\\]|\\.)*)"
+        |((?:[\w$+:.\-]|/(?![/*]))+)
+        |([{}();=,])
+    )
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+
+# whitespace and comments at the end of the file
+TRAILER_REGEX = re.compile(r"(?:\s+|//[^\n]*(?:\n|$)|/\*.*?\*/)*", re.DOTALL)
+
+ESCAPE_REGEX = re.compile(r"\\(?:U([0-9a-fA-F]{4})|([0-7]{1,3})|(.))", re.DOTALL)
+
+ESCAPES = {"n": "\n", "t": "\t", "r": "\r", "a": "\a", "b": "\b", "f": "\f", "v": "\v"}
+
+
+def _unescape_match(match):
+    hexcode, octal, char = match.groups()
+    if hexcode:
+        return chr(int(hexcode, 16))
+    if octal:
+        return chr(int(octal, 8))
+    return ESCAPES.get(char, char)
+
+
+def unescape(text):
+    r"""return a quoted string from a property list without its escapes
+
+    >>> unescape(r"\UF700 \101\\")
+    '\uf700 A\\'
+    """
+    if "\\" not in text:
+        return text
+    return ESCAPE_REGEX.sub(_unescape_match, text)
+
+
+Token = collections.namedtuple("Token", ["value", "punctuation", "lineno"])
+"""a string, or punctuation if punctuation is True, and the line it started on"""
+
+
+def tokenize(chunks):
+    """generate the tokens in an iterable of chunks of text, like an open file
+
+    Tokens can span chunks. Raises ValueError for text which isn't a token.
+    """
+    buf = ""
+    pos = 0
+    lineno = 1
+    finditer = TOKEN_REGEX.finditer
+    for chunk in itertools.chain(chunks, [None]):
+        if chunk is None:
+            # the end of the file, so a token at the end of buf is complete
+            limit = len(buf) + 1
+        else:
+            buf = buf[pos:] + chunk
+            pos = 0
+            # the last token in buf might continue in the next chunk
+            limit = len(buf)
+        for match in finditer(buf, pos):
+            end = match.end()
+            if match.start() != pos or end == limit:
+                # text which isn't a token, or might not be all of one
+                break
+            # the line the token ends on, which is where it starts, unless it's
+            # a string with a newline in it
+            lineno += buf.count("\n", pos, end)
+            group = match.lastindex
+            if group == 3:
+                yield Token(match[3], True, lineno)
+            elif group == 2:
+                yield Token(match[2], False, lineno)
+            else:
+                yield Token(unescape(match[1]), False, lineno)
+            pos = end
+    trailer = TRAILER_REGEX.match(buf, pos)
+    if trailer.end() != len(buf):
+        lineno += buf.count("\n", pos, trailer.end())
+        raise ValueError(f"line {lineno}: unexpected '{buf[trailer.end()]}'")
+
+
+def cocoa_shortcut(key):
+    """return the MacOSKeyboardShortcut for a key from a key binding dictionary
+
+    Returns None if key isn't a shortcut MacOS knows about.
+    """
+    mask = 0
+    index = 0
+    # the last character is always the key, even if it's a modifier character
+    while index < len(key) - 1 and key[index] in MODIFIERS:
+        mask |= MODIFIERS[key[index]]
+        index += 1
+    key = key[index:]
+    if len(key) == 2 and key[0] == "\\":
+        # an escaped modifier character, like \^, is the key itself
+        key = key[1]
+    if key in KEYS:
+        key = KEYS[key]
+    elif len(key) != 1 or FUNCTION_KEYS[0] <= key <= FUNCTION_KEYS[1]:
+        # function keys we don't have a key for, like \UF746 for Help
+        return None
+    # pylint: disable=protected-access
+    return MacOS._shortcut(mask, key)
+
+
+class _Parser:
+    """turn tokens into bindings, see read_bindings()"""
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.token = None
+        # a token which was read, but not used yet
+        self.pending = None
+
+    def next(self, expected=None):
+        """return the next token, which must be the punctuation expected, if given"""
+        if self.pending:
+            self.token, self.pending = self.pending, None
+        else:
+            self.token = next(self.tokens, None)
+        if self.token is None:
+            raise ValueError("unexpected end of file")
+        if expected and not self._is(expected):
+            self.error(f"expected '{expected}'")
+        return self.token
+
+    def _is(self, punctuation):
+        """return True if the current token is this punctuation"""
+        return self.token.punctuation and self.token.value == punctuation
+
+    def error(self, message):
+        """raise ValueError with message and where it happened"""
+        raise ValueError(
+            f"line {self.token.lineno}: {message}, found '{self.token.value}'"
+        )
+
+    def bindings(self):
+        """generate (keys, actions, lineno) for each binding"""
+        self.next("{")
+        # the keys of the dictionaries we are in
+        keys = []
+        while True:
+            token = self.next()
+            if self._is("}"):
+                if not keys:
+                    return
+                keys.pop()
+                self._end()
+                continue
+            if token.punctuation:
+                self.error("expected a key")
+            key = token
+            self.next("=")
+            value = self.next()
+            if self._is("{"):
+                keys.append(key)
+                continue
+            if self._is("("):
+                actions = self._array()
+            elif value.punctuation:
+                self.error("expected a value")
+            else:
+                actions = [value.value]
+            yield [*keys, key], actions, key.lineno
+            self._end()
+
+    def _array(self):
+        """return the strings in an array, after the opening parenthesis"""
+        values = []
+        while True:
+            token = self.next()
+            if self._is(")"):
+                return values
+            if token.punctuation:
+                self.error("expected a string")
+            values.append(token.value)
+            self.next()
+            if self._is(")"):
+                return values
+            if not self._is(","):
+                self.error("expected ',' or ')'")
+
+    def _end(self):
+        """skip the semicolon after an entry"""
+        # the semicolon is optional after the last entry in a dictionary
+        token = next(self.tokens, None)
+        if token is not None and not (token.punctuation and token.value == ";"):
+            self.pending = token
+
+
+def read_bindings(chunks):
+    """generate (combos, actions, lineno) for each binding in a key binding dictionary
+
+    chunks is an iterable of text, like an open file. combos is the list of
+    shortcuts pressed in order, or None if any of them isn't a shortcut MacOS
+    knows about, actions is the list of selectors, and lineno is the line of
+    the last key.
+
+    Raises ValueError if the dictionary is malformed.
+    """
+    for keys, actions, lineno in _Parser(tokenize(chunks)).bindings():
+        combos = []
+        for key in keys:
+            combo = cocoa_shortcut(key.value)
+            if combo is None:
+                combos = None
+                break
+            combos.append(combo)
+        yield combos, actions, lineno
@@ -0,0 +1,156 @@
+#
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2021 Jared Crapo
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+"""
+Complete and fuzzy match the names of keys and modifiers
+
+Every name ksc accepts for a key or modifier, like pgup, fwddel or cmd, goes
+into a prefix trie and an index of the pairs of letters in each name. Both are
+built the first time they are used, after that completing a name is a walk down
+the trie, and fuzzy matching only compares the names which share a pair of
+letters with the input.
+
+    >>> completer = Completer.macos()
+    >>> completer.complete("pag")
+    ('pagedown', 'pageup')
+    >>> completer.fuzzy("pgdn")
+    ('pgdown', 'pagedown')
+"""
+
+import collections
+import functools
+
+from .macos import MacOS
+
+FUZZY_SCORE = 0.5
+"""the least similarity for fuzzy() to consider a name a match"""
+
+# the key in a trie node for the sorted names which start with that node's prefix
+_NAMES = None
+
+
+def _bigrams(word):
+    """return the set of pairs of letters in a word, including its ends"""
+    word = f"^{word}$"
+    return {word[i : i + 2] for i in range(len(word) - 1)}
+
+
+def _is_subsequence(text, word):
+    """return True if the characters of text are in word, in order"""
+    chars = iter(word)
+    return all(char in chars for char in text)
+
+
+SHELL_SCRIPTS = {
+    "bash": """\
+_ksc() {
+    local cur=${COMP_WORDS[COMP_CWORD]}
+    if [[ $cur == -* ]]; then
+        COMPREPLY=($(compgen -W "%(options)s" -- "$cur"))
+    else
+        COMPREPLY=($(%(prog)s --complete -- "$cur"))
+    fi
+}
+complete -F _ksc %(prog)s
+""",
+    "zsh": """\
+#compdef %(prog)s
+_ksc() {
+    if [[ $PREFIX == -* ]]; then
+        compadd -- %(options)s
+    else
+        compadd -U -- ${(f)"$(%(prog)s --complete -- "$PREFIX")"}
+    fi
+}
+compdef _ksc %(prog)s
+""",
+}
+"""scripts which complete the arguments of ksc in each shell, using --complete"""
+
+
+def shell_script(shell, prog, options):
+    """return the completion script for a shell
+
+    options is a list of the command line options, which the shell completes
+    itself, names are completed by running prog --complete
+    """
+    return SHELL_SCRIPTS[shell] % {"prog": prog, "options": " ".join(options)}
+
+
+class Completer:
+    """complete and fuzzy match a set of names"""
+
+    def __init__(self, names):
+        names = sorted(set(names))
+        self.trie = {_NAMES: tuple(names)}
+        self.bigrams = collections.defaultdict(list)
+        self._name_bigrams = {}
+        for name in names:
+            node = self.trie
+            for char in name:
+                node = node.setdefault(char, {_NAMES: []})
+                node[_NAMES].append(name)
+            bigrams = _bigrams(name)
+            self._name_bigrams[name] = bigrams
+            for bigram in bigrams:
+                self.bigrams[bigram].append(name)
+
+    @classmethod
+    @functools.cache
+    def macos(cls):
+        """return the shared Completer for every name MacOS can parse"""
+        return cls([*MacOS.keyname_map, *MacOS.mod_words])
+
+    def complete(self, prefix):
+        """return a sorted tuple of the names which start with prefix"""
+        node = self.trie
+        for char in prefix.lower():
+            node = node.get(char)
+            if node is None:
+                return ()
+        return tuple(node[_NAMES])
+
+    def fuzzy(self, text, limit=10):
+        """return up to limit names which are like text, the most similar first
+
+        A name is like text if it has the characters of text in order, like
+        pgdn for pagedown, or if enough of the pairs of letters in text are
+        in the name, which catches typos like comand or shfit.
+        """
+        text = text.lower()
+        bigrams = _bigrams(text)
+        shared = collections.Counter()
+        for bigram in bigrams:
+            shared.update(self.bigrams.get(bigram, ()))
+        matches = []
+        for name, count in shared.items():
+            score = 2 * count / (len(bigrams) + len(self._name_bigrams[name]))
+            subsequence = _is_subsequence(text, name)
+            if subsequence or score >= FUZZY_SCORE:
+                matches.append((not subsequence, -score, name))
+        matches.sort()
+        return tuple(name for _, _, name in matches[:limit])
+
+    def suggest(self, text, limit=10):
+        """return the names which start with text, or if none do, are like text"""
+        return self.complete(text)[:limit] or self.fuzzy(text, limit)
@@ -0,0 +1,184 @@
+#
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2021 Jared Crapo
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+"""
+A daemon which keeps a warm ksc resident on a unix domain socket
+
+Launchers like Alfred and Keyboard Maestro run ksc once for every shortcut, which
+means every use pays for interpreter startup and imports. Start the daemon with:
+
+    $ ksc --serve
+
+and then use ksc-client instead of ksc. The client forwards its arguments to the
+daemon and prints whatever the daemon sends back. The daemon runs the exact same
+main() as the ksc command, so the output is identical.
+
+The wire protocol is in ksc.client.
+"""
+
+import contextlib
+import io
+import os
+import socketserver
+import sys
+import threading
+
+from .__main__ import EXIT_ERROR, main
+from .client import (
+    RUN_LOCALLY,
+    decode_request,
+    encode_response,
+    safe_directory,
+    socket_path,
+    starts_server,
+)
+
+
+class StdinRequired(Exception):
+    """raised when a command tries to read standard input in the daemon"""
+
+
+class _NoStdin(io.TextIOBase):
+    """stands in for sys.stdin while running a command
+
+    The daemon can't see the client's standard input, so if a command tries to
+    read it, we stop and tell the client to run the command itself.
+    """
+
+    def read(self, size=-1):
+        raise StdinRequired
+
+    def readline(self, size=-1):
+        raise StdinRequired
+
+    @property
+    def buffer(self):
+        """commands which read bytes get here before they read anything"""
+        raise StdinRequired
+
+
+_lock = threading.Lock()
+"""held while a command runs, because it changes the working directory and the
+standard streams of the whole process"""
+
+
+def run(argv, cwd=None):
+    """run ksc with argv in the directory cwd and return (exit_code, out, err)
+
+    Standard output and standard error are captured instead of printed, and
+    argparse exiting for --help, --version or usage errors is turned into an
+    exit code. If the command tries to read standard input, or cwd can't be
+    changed to, the exit code is RUN_LOCALLY and the output is discarded.
+    """
+    with _lock:
+        olddir = os.getcwd()
+        try:
+            if cwd:
+                os.chdir(cwd)
+        except OSError:
+            return RUN_LOCALLY, "", ""
+        try:
+            return _run(argv)
+        finally:
+            os.chdir(olddir)
+
+
+def _run(argv):
+    """run ksc with argv, capturing the output"""
+    out = io.StringIO()
+    err = io.StringIO()
+    stdin = sys.stdin
+    sys.stdin = _NoStdin()
+    with contextlib.redirect_stdout(out), contextlib.redirect_stderr(err):
+        try:
+            exit_code = main(argv, prog="ksc")
+        except StdinRequired:
+            return RUN_LOCALLY, "", ""
+        except SystemExit as exc:
+            if exc.code is None:
+                exit_code = 0
+            elif isinstance(exc.code, int):
+                exit_code = exc.code
+            else:
+                print(exc.code, file=sys.stderr)
+                exit_code = 1
+        finally:
+            sys.stdin = stdin
+    return exit_code, out.getvalue(), err.getvalue()
+
+
+class RequestHandler(socketserver.StreamRequestHandler):
+    """answer a single request from ksc-client"""
+
+    def handle(self):
+        cwd, argv = decode_request(self.rfile.read())
+        if starts_server(argv):
+            response = encode_response(2, "", "ksc: daemon is already running\n")
+        else:
+            response = encode_response(*run(argv, cwd))
+        self.wfile.write(response)
+
+
+class Server(socketserver.UnixStreamServer):
+    """a unix domain socket server which answers requests one at a time
+
+    Requests are handled serially, which is plenty fast for a launcher, and
+    means we can safely redirect sys.stdout and sys.stderr while running main()
+    """
+
+    def __init__(self, path):
+        # a daemon which crashed or was killed leaves the socket file behind
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(path)
+        # only the user who started the daemon should be able to connect
+        old_umask = os.umask(0o077)
+        try:
+            super().__init__(path, RequestHandler)
+        finally:
+            os.umask(old_umask)
+
+    def server_close(self):
+        super().server_close()
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(self.server_address)
+
+
+def serve(path=None):
+    """run the daemon until interrupted, returns an exit code"""
+    if path is None:
+        path = socket_path()
+    directory = os.path.dirname(path) or "."
+    try:
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+    except OSError as err:
+        print(f"ksc: {err}", file=sys.stderr)
+        return EXIT_ERROR
+    if not safe_directory(directory):
+        print(f"ksc: other users can write to {directory}", file=sys.stderr)
+        return EXIT_ERROR
+    # do a parse and render so everything is imported and warm before the
+    # first request arrives
+    run(["command", "b"])
+    with Server(path) as server, contextlib.suppress(KeyboardInterrupt):
+        server.serve_forever()
+    return 0
@@ -0,0 +1,287 @@
+#
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2021 Jared Crapo
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+"""
+Read the hot key triggers of Keyboard Maestro macros
+
+Keyboard Maestro exports macros as .kmmacros files, and keeps its library in
+.kmlibrary files, both of which are XML property lists. A hot key trigger is a
+dictionary in the Triggers of a macro:
+
+    <dict>
+        <key>KeyCode</key>
+        <integer>35</integer>
+        <key>MacroTriggerType</key>
+        <string>HotKey</string>
+        <key>Modifiers</key>
+        <integer>768</integer>
+    </dict>
+
+KeyCode is a macOS virtual key code, and Modifiers is a Carbon modifier mask,
+this one is Shift-Command-P.
+
+The XML is read incrementally with the expat parser, without building a tree,
+and only the few values needed to find hot keys and their names are kept, so
+the memory used doesn't depend on the size of the library. The hot keys of the
+macro group being read are held until the group ends, because the name of a
+group comes after its macros.
+"""
+
+import collections
+from xml.parsers import expat
+
+from .macos import MacOS, MacOSKeyboardShortcut
+
+CHUNK_SIZE = 64 * 1024
+"""bytes read at a time"""
+
+MODIFIERS = (
+    (256, MacOS.mod_words["command"]),
+    (512, MacOS.mod_words["shift"]),
+    (2048, MacOS.mod_words["option"]),
+    (4096, MacOS.mod_words["control"]),
+)
+"""the Carbon mask for each modifier, and the MacOS bits for it"""
+
+KEY_CODES = {
+    **dict(enumerate("asdfhgzxcv")),
+    **{code: char for code, char in zip(range(11, 18), "bqweryt", strict=True)},
+    **{code: char for code, char in zip(range(18, 24), "123465", strict=True)},
+    24: "=",
+    25: "9",
+    26: "7",
+    27: "-",
+    28: "8",
+    29: "0",
+    30: "]",
+    31: "o",
+    32: "u",
+    33: "[",
+    34: "i",
+    35: "p",
+    36: "return",
+    37: "l",
+    38: "j",
+    39: "'",
+    40: "k",
+    41: ";",
+    42: "\\",
+    43: ",",
+    44: "/",
+    45: "n",
+    46: "m",
+    47: ".",
+    48: "tab",
+    49: "space",
+    50: "`",
+    51: "delete",
+    53: "escape",
+    64: "f17",
+    # keypad keys are the same as the keys on the main keyboard
+    65: ".",
+    67: "*",
+    69: "+",
+    71: "clear",
+    75: "/",
+    76: "enter",
+    78: "-",
+    79: "f18",
+    80: "f19",
+    81: "=",
+    **{code: str(digit) for digit, code in enumerate(range(82, 90))},
+    90: "f20",
+    91: "8",
+    92: "9",
+    96: "f5",
+    97: "f6",
+    98: "f7",
+    99: "f3",
+    100: "f8",
+    101: "f9",
+    103: "f11",
+    105: "f13",
+    106: "f16",
+    107: "f14",
+    109: "f10",
+    111: "f12",
+    113: "f15",
+    115: "home",
+    116: "pageup",
+    117: "forwarddelete",
+    118: "f4",
+    119: "end",
+    120: "f2",
+    121: "pagedown",
+    122: "f1",
+    123: "left",
+    124: "right",
+    125: "down",
+    126: "up",
+}
+"""the key for each macOS virtual key code, from Events.h"""
+
+KEYPAD_SYMBOLS = {67, 69}
+"""key codes of the keypad keys which type a shifted symbol without Shift"""
+
+HotKey = collections.namedtuple("HotKey", ["group", "macro", "combo", "lineno"])
+"""a hot key trigger, combo is None if it isn't a key MacOS knows about"""
+
+# the plist elements which hold a value in a dictionary
+_SCALARS = {"string", "integer", "real", "true", "false", "date", "data"}
+
+# the values of a dictionary which are needed to find hot keys and their names,
+# nothing else is kept
+_KEEP = {"KeyCode", "MacroTriggerType", "Modifiers", "Name"}
+
+
+def hot_key(key_code, modifiers):
+    """return the MacOSKeyboardShortcut for a key code and a Carbon modifier mask
+
+    Returns None if key_code isn't a key MacOS knows about.
+    """
+    key = KEY_CODES.get(key_code)
+    if key is None:
+        return None
+    mask = 0
+    for carbon, bits in MODIFIERS:
+        if modifiers & carbon:
+            mask |= bits
+    if key_code in KEYPAD_SYMBOLS:
+        # MacOS._shortcut() would add Shift, which the keypad doesn't need
+        return MacOSKeyboardShortcut.intern(mask, key)
+    # pylint: disable=protected-access
+    return MacOS._shortcut(mask, key)
+
+
+class _Dict:
+    """what we need to know about a plist dictionary while it's being read"""
+
+    # pylint: disable=too-few-public-methods
+    __slots__ = ("values", "key", "hot_keys", "lineno")
+
+    def __init__(self, lineno):
+        self.values = {}
+        # the last <key> read
+        self.key = None
+        # (macro, combo, lineno) of the hot keys of the macros in this dictionary,
+        # or (None, combo, lineno) of the triggers if this dictionary is a macro
+        self.hot_keys = []
+        self.lineno = lineno
+
+
+class _Reader:
+    """the handlers for the expat parser, which find the hot keys"""
+
+    def __init__(self):
+        self.parser = expat.ParserCreate()
+        self.parser.StartElementHandler = self._start
+        self.parser.EndElementHandler = self._end
+        self.parser.CharacterDataHandler = self._text
+        # the tags of the elements which have started but not ended
+        self.tags = []
+        # the dictionaries which have started but not ended
+        self.dicts = []
+        # the text of the current element, if it's one we need the text of
+        self.text = []
+        # hot keys which are ready to be generated
+        self.hot_keys = []
+
+    def _start(self, tag, _attributes):
+        self.tags.append(tag)
+        self.text.clear()
+        if tag == "dict":
+            self.dicts.append(_Dict(self.parser.CurrentLineNumber))
+
+    def _text(self, data):
+        # the parser can split text into pieces, so collect them
+        if self.tags and (self.tags[-1] == "key" or self.tags[-1] in _SCALARS):
+            self.text.append(data)
+
+    def _end(self, tag):
+        self.tags.pop()
+        if tag == "dict":
+            self._end_dict()
+            return
+        if not self.dicts or self.tags[-1:] != ["dict"]:
+            return
+        current = self.dicts[-1]
+        if tag == "key":
+            current.key = "".join(self.text)
+        elif current.key in _KEEP:
+            current.values[current.key] = "".join(self.text)
+
+    def _end_dict(self):
+        """look at the dictionary which just ended, for hot keys"""
+        ended = self.dicts.pop()
+        values = ended.values
+        parent = self.dicts[-1] if self.dicts else None
+        if values.get("MacroTriggerType") == "HotKey":
+            try:
+                combo = hot_key(int(values["KeyCode"]), int(values.get("Modifiers", 0)))
+            except (KeyError, ValueError):
+                combo = None
+            if parent is not None:
+                parent.hot_keys.append((None, combo, ended.lineno))
+            return
+        if not ended.hot_keys:
+            return
+        name = values.get("Name")
+        if ended.hot_keys[0][0] is None:
+            # a macro, so these are its triggers
+            hot_keys = [(name, combo, lineno) for _, combo, lineno in ended.hot_keys]
+            if parent is not None:
+                parent.hot_keys.extend(hot_keys)
+                return
+            name = None
+        else:
+            hot_keys = ended.hot_keys
+        # a macro group, or a macro which isn't in one
+        for macro, combo, lineno in hot_keys:
+            self.hot_keys.append(HotKey(name, macro, combo, lineno))
+
+    def feed(self, data, final=False):
+        """parse some more of the file, and return the hot keys which are ready"""
+        try:
+            self.parser.Parse(data, final)
+        except expat.ExpatError as err:
+            raise ValueError(
+                f"line {err.lineno}: {expat.ErrorString(err.code)}"
+            ) from err
+        hot_keys = self.hot_keys
+        self.hot_keys = []
+        return hot_keys
+
+
+def read_hot_keys(chunks):
+    """generate a HotKey for every hot key trigger in a Keyboard Maestro plist
+
+    chunks is an iterable of bytes, like an open binary file. Hot keys are
+    generated at the end of each macro group, or each macro if it isn't in a
+    group, and lineno is the line the trigger starts on.
+
+    Raises ValueError if the XML is malformed.
+    """
+    reader = _Reader()
+    for chunk in chunks:
+        yield from reader.feed(chunk)
+    yield from reader.feed(b"", final=True)
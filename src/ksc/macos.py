@@ -26,9 +26,16 @@ Classes to represent MacOS keys and shortcuts
 """
 
 import collections
+import functools
 import re
+import weakref
 
-import rich
+ParseFailure = collections.namedtuple("ParseFailure", ["index", "text", "message"])
+"""a record of an input MacOS.parse_many() couldn't parse
+
+index is the position of the text in the input, message is the message the
+ValueError from MacOS.parse_shortcut() would have had
+"""
 
 
 class MacOSKey:
@@ -36,6 +43,17 @@ class MacOSKey:
 
     # pylint: disable=too-many-instance-attributes, too-few-public-methods
 
+    __slots__ = (
+        "key",
+        "name",
+        "input_names",
+        "shifted_key",
+        "clarified_name",
+        "html_entity",
+        "modifier",
+        "ascii_key",
+    )
+
     def __init__(
         self,
         key,
@@ -93,13 +111,33 @@ class MacOS:
             "⌃",  # this is not a caret, it's another unicode character
             "Control",
             ["control", "cont", "ctrl", "ctl"],
+            html_entity="&#8963;",
             ascii_key="^",  # this one is a caret
             modifier=True,
         ),
-        MacOSKey("⌥", "Option", ["option", "opt", "alt"], ascii_key="~", modifier=True),
-        MacOSKey("⇧", "Shift", ["shift", "shft"], ascii_key="$", modifier=True),
         MacOSKey(
-            "⌘", "Command", ["command", "cmd", "clover"], ascii_key="@", modifier=True
+            "⌥",
+            "Option",
+            ["option", "opt", "alt"],
+            html_entity="&#8997;",
+            ascii_key="~",
+            modifier=True,
+        ),
+        MacOSKey(
+            "⇧",
+            "Shift",
+            ["shift", "shft"],
+            html_entity="&#8679;",
+            ascii_key="$",
+            modifier=True,
+        ),
+        MacOSKey(
+            "⌘",
+            "Command",
+            ["command", "cmd", "clover"],
+            html_entity="&#8984;",
+            ascii_key="@",
+            modifier=True,
         ),
         # the globe key is wierd, it got invented after apple made the ASCII key
         # binding definitions, so there isn't an ASCII symbol associated with the
@@ -111,28 +149,31 @@ class MacOS:
         # So after much debate, I decide to not use the color globe symbol and just
         # leave the key slot empty.
         MacOSKey(None, "Globe", ["globe"], modifier=True),
-        MacOSKey("⎋", "Escape", ["escape", "esc"]),
-        MacOSKey("⇥", "Tab", ["tab"]),
-        MacOSKey("⇪", "Caps Lock", ["capslock", "caps"]),
-        MacOSKey("␣", "Space", ["space"]),
-        MacOSKey("⏏", "Eject", ["eject"]),
-        MacOSKey("⌫", "Delete", ["delete", "del"]),
+        MacOSKey("⎋", "Escape", ["escape", "esc"], html_entity="&#9099;"),
+        MacOSKey("⇥", "Tab", ["tab"], html_entity="&#8677;"),
+        MacOSKey("⇪", "Caps Lock", ["capslock", "caps"], html_entity="&#8682;"),
+        MacOSKey("␣", "Space", ["space"], html_entity="&#9251;"),
+        MacOSKey("⏏", "Eject", ["eject"], html_entity="&#9167;"),
+        MacOSKey("⌫", "Delete", ["delete", "del"], html_entity="&#9003;"),
         MacOSKey(
             "⌦",
             "Forward Delete",
             ["forwarddelete", "fwddelete", "forwarddel", "fwddel"],
+            html_entity="&#8998;",
         ),
-        MacOSKey("⌧", "Clear", ["clear"], clarified_name="Clear (⌧)"),
-        MacOSKey("↩", "Return", ["return", "rtn"]),
-        MacOSKey("⌅", "Enter", ["enter", "ent"]),
-        MacOSKey("⇞", "Page Up", ["pageup", "pgup"]),
-        MacOSKey("⇟", "Page Down", ["pagedown", "pgdown"]),
-        MacOSKey("↖", "Home", ["home"]),
-        MacOSKey("↘", "End", ["end"]),
-        MacOSKey("←", "Left Arrow", ["leftarrow", "left"]),
-        MacOSKey("→", "Right Arrow", ["rightarrow", "right"]),
-        MacOSKey("↑", "Up Arrow", ["uparrow", "up"]),
-        MacOSKey("↓", "Down Arrow", ["downarrow", "down"]),
+        MacOSKey(
+            "⌧", "Clear", ["clear"], html_entity="&#8999;", clarified_name="Clear (⌧)"
+        ),
+        MacOSKey("↩", "Return", ["return", "rtn"], html_entity="&#8617;"),
+        MacOSKey("⌅", "Enter", ["enter", "ent"], html_entity="&#8965;"),
+        MacOSKey("⇞", "Page Up", ["pageup", "pgup"], html_entity="&#8670;"),
+        MacOSKey("⇟", "Page Down", ["pagedown", "pgdown"], html_entity="&#8671;"),
+        MacOSKey("↖", "Home", ["home"], html_entity="&#8598;"),
+        MacOSKey("↘", "End", ["end"], html_entity="&#8600;"),
+        MacOSKey("←", "Left Arrow", ["leftarrow", "left"], html_entity="&larr;"),
+        MacOSKey("→", "Right Arrow", ["rightarrow", "right"], html_entity="&rarr;"),
+        MacOSKey("↑", "Up Arrow", ["uparrow", "up"], html_entity="&uarr;"),
+        MacOSKey("↓", "Down Arrow", ["downarrow", "down"], html_entity="&darr;"),
         MacOSKey("leftclick", "click", ["leftclick", "click"]),
         MacOSKey("rightclick", "right click", ["rightclick", "rclick"]),
         MacOSKey(
@@ -175,7 +216,13 @@ class MacOS:
             shifted_key='"',
             clarified_name="Single Quote (')",
         ),
-        MacOSKey('"', '"', ["doublequote", "dq"], clarified_name='Double Quote (")'),
+        MacOSKey(
+            '"',
+            '"',
+            ["doublequote", "dq"],
+            html_entity="&quot;",
+            clarified_name='Double Quote (")',
+        ),
         MacOSKey(",", ",", ["comma"], shifted_key="<", clarified_name="Comma (,)"),
         MacOSKey(".", ".", ["period"], shifted_key=">", clarified_name="Period (.)"),
         MacOSKey("/", "/", ["slash"], shifted_key="?", clarified_name="Slash (.)"),
@@ -188,11 +235,8 @@ class MacOS:
         _fkey = f"F{_num}"
         keys.append(MacOSKey(_fkey, _fkey, [_fkey.lower()]))
 
-    # modifiers is a subset of keys
-    modifiers = []
-    for _key in keys:
-        if _key.modifier:
-            modifiers.append(_key)
+    # modifiers is a subset of keys, in the order Apple recommends displaying them
+    modifiers = tuple(_key for _key in keys if _key.modifier)
 
     # build a keyname dictionary lookup
     keyname_map = {}
@@ -206,14 +250,65 @@ class MacOS:
     # source
 
     # the hyper key is a wierd because its a combination of other keys, so we have to
-    # handle it separately
-    hyper_mods = []
-    hyper_mods.append(keyname_map["control"])
-    hyper_mods.append(keyname_map["option"])
-    hyper_mods.append(keyname_map["shift"])
-    hyper_mods.append(keyname_map["command"])
+    # handle it separately. It's a tuple, in Apple's order, so it compares equal
+    # to MacOSKeyboardShortcut.mods
+    hyper_mods = (
+        keyname_map["control"],
+        keyname_map["option"],
+        keyname_map["shift"],
+        keyname_map["command"],
+    )
     hyper_name = "Hyper"
-    hyper_regex = r"\b" + hyper_name.lower() + r"\b"
+
+    # indexes so we never have to search through keys
+    #
+    # map the key symbol to the key object, if more than one key has the same
+    # symbol, the first one wins
+    key_map = {}
+    # translate the characters which need it to HTML entities, including the
+    # symbols of the keys which have an html_entity
+    html_trans = {"&": "&amp;", "<": "&lt;", ">": "&gt;"}
+    for _key in keys:
+        if _key.key is not None:
+            key_map.setdefault(_key.key, _key)
+        if _key.html_entity:
+            html_trans[_key.key] = _key.html_entity
+    html_trans = str.maketrans(html_trans)
+    shift_key = keyname_map["shift"]
+
+    # the modifiers of a shortcut are stored as an integer, with one bit for
+    # each modifier. The bits are assigned in Apple's order, so Fn is 1, Control
+    # is 2, etc.
+    mod_bits = {}
+    for _bit, _key in enumerate(modifiers):
+        mod_bits[_key] = 1 << _bit
+    hyper_mask = 0
+    for _key in hyper_mods:
+        hyper_mask |= mod_bits[_key]
+    shift_mask = mod_bits[shift_key]
+    # for every possible mask, the tuple of modifiers it represents, in order
+    mask_mods = []
+    for _mask in range(1 << len(modifiers)):
+        _mods = []
+        for _key in modifiers:
+            if _mask & mod_bits[_key]:
+                _mods.append(_key)
+        mask_mods.append(tuple(_mods))
+    mask_mods = tuple(mask_mods)
+    # for every possible mask, where it sorts compared to the other masks.
+    # Shortcuts sort by comparing their modifiers one by one in Apple's order,
+    # which is the same as comparing the positions of the bits which are set
+    mask_order = [0] * len(mask_mods)
+    for _order, _mask in enumerate(
+        sorted(
+            range(len(mask_mods)),
+            key=lambda mask: [
+                bit for bit in range(mask.bit_length()) if mask >> bit & 1
+            ],
+        )
+    ):
+        mask_order[_mask] = _order
+    mask_order = tuple(mask_order)
 
     # can't refactor mods_ascii and mods_unicode into a single
     # dictionary, see parse_shortcut() for why
@@ -221,21 +316,73 @@ class MacOS:
     mods_unicode = collections.OrderedDict()
     unshifted_keys = ""
     shifted_keys = ""
-    mods_regexes = []
+    # map every word which means a modifier to the bits for that modifier
+    mod_words = {}
     for _key in keys:
         if _key.modifier:
             mods_ascii[_key.ascii_key] = _key
             mods_unicode[_key.key] = _key
-            _regex = r"\b(" + "|".join(_key.input_names) + r")\b"
-            mods_regexes.append((_key, _regex))
+            for _name in _key.input_names:
+                mod_words[_name] = mod_bits[_key]
         if _key.shifted_key:
             unshifted_keys += _key.key
             shifted_keys += _key.shifted_key
+    mod_words[hyper_name.lower()] = hyper_mask
+
+    # a single regular expression which tokenizes a shortcut in one pass. In
+    # order of precedence, it matches:
+    #
+    #   - a hyphen with a non-space character on both sides, or a space, which
+    #     separate tokens and are discarded. Other hyphens are kept so
+    #     'option-shift--' and 'command -' still have a key
+    #   - a whole word which is a modifier, captured in the first group
+    #   - any other whole word, or a single character which isn't part of a
+    #     word, captured in the second group
+    #
+    # longer words come first in the alternation so 'function' isn't matched
+    # as 'func', although \b would catch that anyway
+    token_regex = re.compile(
+        r"(?<=\S)-(?=\S)| |\b("
+        + "|".join(sorted(mod_words, key=len, reverse=True))
+        + r")\b|(\w+|.)",
+        re.IGNORECASE | re.DOTALL,
+    )
+    # shortcuts in a sequence are separated by a slash or pipe surrounded by spaces
+    sequence_regex = re.compile(r" [/|] ")
 
     # make some translation tables
     to_shifted_trans = str.maketrans(unshifted_keys, shifted_keys)
     to_unshifted_trans = str.maketrans(shifted_keys, unshifted_keys)
 
+    @classmethod
+    @functools.cache
+    def named_key_rows(cls, hyper=False):
+        """return a tuple of (key, name, inputs) rows for all the named keys
+
+        The rows never change, so they are only built once for each value of
+        hyper. Use these instead of named_keys() if you don't want rich.
+
+        >>> MacOS.named_key_rows()[3]
+        ('⇧', 'Shift', 'shift,shft')
+        """
+        rows = []
+        # start with the modifiers
+        add_hyper_flag = True
+        for key in cls.keys:
+            if key.modifier is False and add_hyper_flag is True:
+                if hyper:
+                    rows.append(("", cls.hyper_name, cls.hyper_name.lower()))
+                add_hyper_flag = False
+            if key.key != key.name or key.clarified_name or key.input_names:
+                rows.append(
+                    (
+                        key.key or "",
+                        key.clarified_name or key.name,
+                        ",".join(key.input_names if key.input_names else ""),
+                    )
+                )
+        return tuple(rows)
+
     @classmethod
     def named_keys(cls, *, hyper=False, **_):
         """Return a rich Table() containing a formatted list of all known keys
@@ -247,6 +394,11 @@ class MacOS:
         If not using argparse, you can just pass the keyword only
         arguments as you typically would
         """
+        # rich is only needed to list the keys, so don't import it until then
+        # pylint: disable=import-outside-toplevel
+        import rich.box
+        import rich.table
+
         table = rich.table.Table(
             box=rich.box.SIMPLE_HEAD,
             pad_edge=False,
@@ -255,22 +407,35 @@ class MacOS:
         table.add_column("Key")
         table.add_column("Name")
         table.add_column("Inputs")
-
-        # start with the modifiers
-        add_hyper_flag = True
-        for key in cls.keys:
-            if key.modifier is False and add_hyper_flag is True:
-                if hyper:
-                    table.add_row(" ", cls.hyper_name, cls.hyper_name.lower())
-                add_hyper_flag = False
-            if key.key != key.name or key.clarified_name or key.input_names:
-                table.add_row(
-                    key.key,
-                    key.clarified_name or key.name,
-                    ",".join(key.input_names if key.input_names else ""),
-                )
+        for row in cls.named_key_rows(hyper):
+            table.add_row(*row)
         return table
 
+    @classmethod
+    def mods_mask(cls, mods):
+        """return the integer mask for a list of modifier MacOSKey objects
+
+        Modifiers which aren't the objects in MacOS.keys, like copies or keys
+        which were unpickled, are matched by name. Raises ValueError if one of
+        mods isn't a modifier.
+        """
+        mask = 0
+        for mod in mods:
+            try:
+                mask |= cls.mod_bits[mod]
+            except (KeyError, TypeError):
+                mask |= cls._mod_bits_by_name(mod)
+        return mask
+
+    @classmethod
+    def _mod_bits_by_name(cls, mod):
+        """return the bit for a modifier which is equivalent to one in MacOS.keys"""
+        name = getattr(mod, "name", None)
+        key = cls.keyname_map.get(name.lower()) if isinstance(name, str) else None
+        if key not in cls.mod_bits or not getattr(mod, "modifier", False):
+            raise ValueError(f"not a modifier key: {name or mod!r}")
+        return cls.mod_bits[key]
+
     @classmethod
     def parse_shortcuts(cls, text):
         """parse a string or array of text into a standard representation of the shortcut
@@ -280,72 +445,183 @@ class MacOS:
         returns an array of shortcut combinations
         """
         combos = []
-        for combo in re.split(r" [/|] ", text):
+        for combo in cls.sequence_regex.split(text):
             combos.append(cls.parse_shortcut(combo))
         return combos
 
+    # the enabled ksc.metrics.Metrics, if any, see Metrics.enable()
+    metrics = None
+
+    # the most distinct inputs parse_many() remembers the results for
+    parse_many_memo = 10000
+
+    @classmethod
+    def parse_many(cls, texts, errors="raise", *, sequences=False):
+        """parse lots of shortcuts, generating the results as they are parsed
+
+        texts is an iterable of strings, which is consumed lazily, so it can
+        be a file or a generator of any size. Each text is parsed like
+        parse_shortcut(), or if sequences is True, like parse_shortcuts().
+
+        errors says what to do with text which can't be parsed:
+
+            "raise"   - raise ValueError, like parse_shortcut()
+            "collect" - generate a ParseFailure in place of the result
+            "skip"    - don't generate anything for it
+
+        Errors are found without raising and catching exceptions, and the
+        results for repeated texts are remembered, so this is much faster
+        than calling parse_shortcut() in a loop, especially for messy input.
+
+        >>> [str(combo) for combo in MacOS.parse_many(["cmd b", "shift ctrl x"])]
+        ['Command-B', 'Control-Shift-X']
+        """
+        if errors not in ("raise", "collect", "skip"):
+            raise ValueError(f"unknown errors value '{errors}'")
+        parse = cls._parse
+        split = cls.sequence_regex.split
+        # results by text, a string is the text which couldn't be parsed
+        memo = {}
+        memo_size = cls.parse_many_memo
+        for index, text in enumerate(texts):
+            result = memo.get(text)
+            if result is None:
+                if sequences:
+                    result = []
+                    for part in split(text):
+                        combo = parse(part)
+                        if combo is None:
+                            result = part
+                            break
+                        result.append(combo)
+                else:
+                    result = parse(text)
+                    if result is None:
+                        result = text
+                if len(memo) < memo_size:
+                    memo[text] = result
+            if result.__class__ is str:
+                if errors == "raise":
+                    raise ValueError(f"error parsing '{result}'")
+                if errors == "collect":
+                    yield ParseFailure(index, text, f"error parsing '{result}'")
+                continue
+            # a fresh list every time, so changing one result can't change the
+            # results of the same text later on
+            yield list(result) if sequences else result
+
+    @staticmethod
+    def render_many(results, options=None):
+        """render lots of shortcuts, generating the text as they are rendered
+
+        results is an iterable of MacOSKeyboardShortcut objects, or lists of them
+        which are rendered separated by spaces, like the ones from
+        parse_many(). ParseFailure records are generated unchanged, so you can
+        render the output of parse_many(texts, errors="collect").
+
+        options is a RenderOptions, if not given the defaults are used
+
+        >>> options = RenderOptions.compile(modifier_symbols=True)
+        >>> results = MacOS.parse_many(["cmd b", "fred"], "collect")
+        >>> list(MacOS.render_many(results, options))
+        ['⌘B', ParseFailure(index=1, text='fred', message="error parsing 'fred'")]
+        """
+        render = (options or RenderOptions.compile()).render
+        for result in results:
+            if result.__class__ is MacOSKeyboardShortcut:
+                yield render(result)
+            elif result.__class__ is ParseFailure:
+                yield result
+            else:
+                yield " ".join(render(combo) for combo in result)
+
     @classmethod
     def parse_shortcut(cls, text):
         """parse a string and return a MacOSKeyboardShortcut object
 
         Raises ValueError if string can't be parsed
 
+        """
+        if cls.metrics is not None:
+            return cls.metrics.parse_shortcut(cls, text)
+        combo = cls._parse(text)
+        if combo is None:
+            raise ValueError(f"error parsing '{text}'")
+        return combo
+
+    @classmethod
+    def _parse(cls, text):
+        """parse a string and return a MacOSKeyboardShortcut object
+
+        Returns None if the string can't be parsed, so callers which expect
+        lots of errors don't have to pay for raising exceptions
         """
         # pylint: disable=too-many-branches
 
-        # save the original text for an error message
-        orig_text = text
-        mods = []
+        # the bits of the modifiers we have found, see MacOS.mod_bits
+        mask = 0
         key = ""
-        # Only remove hyphens preceeded and followed by non-space character
-        # to avoid removing the last hyphen from 'option-shift--' or 'command -'
-        text = re.sub(r"(?<=\S)-(?=\S)", " ", text)
-        # remove words that represent modifiers from the text, and add them
-        # to the 'mods' array
-        for mod, regex in cls.mods_regexes:
-            (text, howmany) = re.subn(regex, "", text, flags=re.IGNORECASE)
-            if howmany:
-                mods.append(mod)
-        # look for the hyper key
-        (text, howmany) = re.subn(cls.hyper_regex, "", text, flags=re.IGNORECASE)
-        if howmany:
-            for mod in cls.hyper_mods:
-                mods.append(mod)
-
-        # process the remainder of the text
-        for char in text.strip():
-            if char == " ":
-                continue
+        # tokenize the text, adding the bits for any modifier words to the mask
+        others = []
+        for word, other in cls.token_regex.findall(text):
+            if word:
+                # casefold() because re.IGNORECASE matches things like 'ſ' as 's'
+                mask |= cls.mod_words[word.casefold()]
+            elif other:
+                others.append(other)
+        # whitespace other than spaces is part of the key, unless it's at the
+        # beginning or end once the modifiers are removed
+        while others and others[-1].isspace():
+            others.pop()
+        start = 0
+        while start < len(others) and others[start].isspace():
+            start += 1
 
-            if char in cls.mods_unicode:
+        # process the rest of the tokens, all the modifier words have been seen
+        # so we can tell whether an ASCII modifier character is a modifier or a key
+        for token in others[start:]:
+            if token in cls.mods_unicode:
                 # translate unicode modifier symbols to their plaintext equivilents
-                mods.append(cls.mods_unicode[char])
-            elif char in cls.mods_ascii and cls.mods_ascii[char] not in mods:
+                mask |= cls.mod_bits[cls.mods_unicode[token]]
+            elif (
+                token in cls.mods_ascii
+                and not mask & cls.mod_bits[cls.mods_ascii[token]]
+            ):
                 # but since plaintext modifiers could also be a key, aka
                 # @$@ really means command-shift-2, we only treat the first
                 # occurance of a plaintext modifier as a modifier, subsequent
                 # occurances are the key
-                mods.append(cls.mods_ascii[char])
+                mask |= cls.mod_bits[cls.mods_ascii[token]]
             else:
-                key += char
+                key += token
+        return cls._shortcut(mask, key)
+
+    @classmethod
+    def _shortcut(cls, mask, key):
+        """return the MacOSKeyboardShortcut for a mask of modifier bits and a key
 
+        key is a key name, a key symbol, or a character. Applies Apple's rules
+        for shifted keys and upper case letters, like parsing does. Returns None
+        if key isn't a key.
+        """
         # map key names to key symbols
-        if key.lower() in cls.keyname_map:
+        keyobj = cls.keyname_map.get(key.lower())
+        if keyobj:
             # special key names, pgup, etc are in lowercase
-            key = cls.keyname_map[key.lower()].key
+            key = keyobj.key
 
         if len(key) == 1:
             if key in cls.shifted_keys:
                 # command % should be command shift 5
                 # and command ? should be command shift ?
                 # these ↓ are the shifted number keys
-                mods.append(cls.keyname_map["shift"])  # dups will get removed later
+                mask |= cls.shift_mask
                 # the unwritten apple rule that shifted numbers are
                 # written as numbers not their symbols
                 if key in "!@#$%^&*()":
                     key = key.translate(cls.to_unshifted_trans)
             else:
-                if cls.keyname_map["shift"] in mods:
+                if mask & cls.shift_mask:
                     # shift is in the mods, and the key is unshifted
                     # we should have the shifted symbol unless it is
                     # a number or letter
@@ -364,16 +640,14 @@ class MacOS:
                 # either way, if the key is in the map then it's valid
                 pass
             else:
-                raise ValueError(f"error parsing '{orig_text}'")
-
-        # remove duplicate modifiers
-        mods = list(set(mods))
-        # sort the mods to be in Apple's recommended order
-        mods.sort(key=cls.keys.index)
+                return None
 
-        return MacOSKeyboardShortcut(mods, key)
+        # the mask takes care of duplicate modifiers and putting them in
+        # Apple's recommended order
+        return MacOSKeyboardShortcut.intern(mask, key)
 
 
+@functools.total_ordering
 class MacOSKeyboardShortcut:
     """Store and render a keyboard shortcut in the macos flavor
 
@@ -381,16 +655,94 @@ class MacOSKeyboardShortcut:
     correct order as specified by the Apple Style Guidelines. This occurs in
     MacOS.parse_shortcut().
 
+    Shortcuts are immutable values. Two shortcuts with the same modifiers and key
+    are equal and have the same hash, so they can be used in sets and as
+    dictionary keys. Shortcuts sort by their modifiers in Apple's order, and then
+    by key.
+
+    The modifiers are stored in modmask, an integer with a bit set for each
+    modifier, see MacOS.mod_bits. The mods property gives you a tuple of MacOSKey
+    objects instead.
     """
 
+    __slots__ = ("modmask", "key", "__weakref__")
+
+    # every shortcut created by intern(), as long as something else refers to it
+    _interned = weakref.WeakValueDictionary()
+
     def __init__(self, mods, key):
         """
-        mods is a list of MacOSKey objects which are modifiers
+        mods is a list of MacOSKey objects which are modifiers, or an integer
+        with the bits for the modifiers from MacOS.mod_bits
 
         key is the keyname (i.e L, ←, 5 or F12)
         """
-        self.mods = mods
-        self.key = key
+        if not isinstance(mods, int):
+            mods = MacOS.mods_mask(mods)
+        object.__setattr__(self, "modmask", mods)
+        object.__setattr__(self, "key", key)
+
+    @classmethod
+    def intern(cls, mods, key):
+        """return a shortcut for mods and key, sharing an existing one if possible
+
+        mods can be a list of MacOSKey objects or a mask, just like the
+        constructor. Equal shortcuts created by this method are the same object,
+        which saves memory when holding lots of shortcuts.
+        """
+        if not isinstance(mods, int):
+            mods = MacOS.mods_mask(mods)
+        try:
+            return cls._interned[(mods, key)]
+        except KeyError:
+            return cls._interned.setdefault((mods, key), cls(mods, key))
+
+    @property
+    def mods(self):
+        """a tuple of MacOSKey objects for the modifiers, in Apple's order"""
+        return MacOS.mask_mods[self.modmask]
+
+    @property
+    def is_hyper(self):
+        """True if the modifiers are exactly the ones for the hyper key"""
+        return self.modmask == MacOS.hyper_mask
+
+    @property
+    def has_shift(self):
+        """True if shift is one of the modifiers"""
+        return bool(self.modmask & MacOS.shift_mask)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __reduce__(self):
+        return (self.__class__.intern, (self.modmask, self.key))
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __eq__(self, other):
+        if not isinstance(other, MacOSKeyboardShortcut):
+            return NotImplemented
+        return self.modmask == other.modmask and self.key == other.key
+
+    def __hash__(self):
+        return hash((self.modmask, self.key))
+
+    def __lt__(self, other):
+        if not isinstance(other, MacOSKeyboardShortcut):
+            return NotImplemented
+        return self._sort_key() < other._sort_key()
+
+    def _sort_key(self):
+        """modifiers in Apple's order, then the key"""
+        return (MacOS.mask_order[self.modmask], self.key)
 
     def __repr__(self):
         """custom repr"""
@@ -409,6 +761,7 @@ class MacOSKeyboardShortcut:
         plus_sign=False,
         key_symbols=False,
         clarify_keys=False,
+        style="mac",
         **_,
     ):
         """render this key as a string for human consumption
@@ -419,48 +772,35 @@ class MacOSKeyboardShortcut:
 
         If not using argparse, you can just pass the keyword only
         arguments as you typically would
-        """
-        tokens = []
-        joiner = ""
 
-        if modifier_symbols:
-            if plus_sign:
-                joiner = "+"
-            for sym, name in zip(self.mod_symbols(), self.mod_names()):
-                if sym:
-                    tokens.append(sym)
-                else:
-                    # they asked for a format which can't be produced
-                    # (likely they asked for symbols but have the globe key)
-                    # so we are going to return a string with names instead
-                    joiner = "+" if plus_sign else "-"
-                    tokens.append(name)
-        elif modifier_ascii:
-            joiner = ""
-            for asci, name in zip(self.mod_ascii(), self.mod_names()):
-                if asci:
-                    tokens.append(asci)
-                else:
-                    # they asked for a format which can't be produced.
-                    # likely they asked for ascii but gave the globe key
-                    # which doesn't have an ascii representation.
-                    # return a string with names instead, joined by either
-                    # plus or dash
-                    joiner = "+" if plus_sign else "-"
-                    tokens.append(name)
-        else:
-            joiner = "-"
-            tokens.extend(self.mod_names(hyper=hyper))
-        if key_symbols:
-            tokens.extend(self.key)
-        else:
-            tokens.append(self.key_name(clarify_keys=clarify_keys))
-        return joiner.join(tokens)
+        If you are rendering lots of shortcuts with the same options, it's
+        faster to use RenderOptions
+        """
+        if MacOS.metrics is not None:
+            return MacOS.metrics.render(
+                self,
+                hyper=hyper,
+                modifier_symbols=modifier_symbols,
+                modifier_ascii=modifier_ascii,
+                plus_sign=plus_sign,
+                key_symbols=key_symbols,
+                clarify_keys=clarify_keys,
+                style=style,
+            )
+        return RenderOptions.compile(
+            hyper=hyper,
+            modifier_symbols=modifier_symbols,
+            modifier_ascii=modifier_ascii,
+            plus_sign=plus_sign,
+            key_symbols=key_symbols,
+            clarify_keys=clarify_keys,
+            style=style,
+        ).render(self)
 
     def mod_names(self, hyper=False):
         """return a list of modifier names for this shortcut"""
         output = []
-        if hyper and self.mods == MacOS.hyper_mods:
+        if hyper and self.modmask == MacOS.hyper_mask:
             output.append(MacOS.hyper_name)
         else:
             for mod in self.mods:
@@ -489,11 +829,7 @@ class MacOSKeyboardShortcut:
     def key_name(self, *, clarify_keys=False):
         """return either the key, or if it has a name return that"""
         # find the key object, if it exists
-        keyobj = None
-        for keytest in MacOS.keys:
-            if self.key == keytest.key:
-                keyobj = keytest
-                break
+        keyobj = MacOS.key_map.get(self.key)
         # if we have a key object, then use it's name and clarified name
         if keyobj:
             if clarify_keys and keyobj.clarified_name:
@@ -501,3 +837,212 @@ class MacOSKeyboardShortcut:
             return keyobj.name
         # otherwise
         return self.key
+
+
+class RenderOptions:
+    """options for rendering shortcuts, compiled into lookup tables
+
+    When created, the rendered text of the modifiers for every possible
+    combination of modifiers, and the rendered text of every named key, is
+    computed, so rendering a shortcut is a couple of table lookups and a
+    string concatenation.
+
+    Designed to be created with the namespace from argparse:
+
+        options = ksc.RenderOptions.compile(**vars(args))
+        for combo in combos:
+            print(options.render(combo))
+
+    compile() returns a shared instance for each combination of options, which
+    is what you want most of the time. If not using argparse, you can just pass
+    the keyword only arguments as you typically would.
+
+    style is one of STYLES. Other than "mac", the default, styles render
+    shortcuts using the conventions of another platform, and are implemented in
+    ksc.platforms, which isn't imported until a style needs it.
+    """
+
+    # pylint: disable=too-many-instance-attributes
+
+    OPTIONS = (
+        "hyper",
+        "modifier_symbols",
+        "modifier_ascii",
+        "plus_sign",
+        "key_symbols",
+        "clarify_keys",
+        "html",
+        "style",
+    )
+    """the names of the options, in the order they are in the values attribute"""
+
+    STYLES = ("mac", "win", "linux")
+    """the styles shortcuts can be rendered in"""
+
+    HTML_KEYS = tuple(chr(char) for char in range(ord("!"), ord("~") + 1))
+    """keys which aren't in MacOS.keys, but whose HTML is computed in advance"""
+
+    __slots__ = OPTIONS + ("values", "_plans")
+
+    # compiled instances, keyed by the tuple of option values
+    _compiled = {}
+
+    def __init__(
+        self,
+        *,
+        hyper=False,
+        modifier_symbols=False,
+        modifier_ascii=False,
+        plus_sign=False,
+        key_symbols=False,
+        clarify_keys=False,
+        html=False,
+        style="mac",
+        **_,
+    ):
+        # pylint: disable=too-many-arguments
+        self.hyper = bool(hyper)
+        self.modifier_symbols = bool(modifier_symbols)
+        self.modifier_ascii = bool(modifier_ascii)
+        self.plus_sign = bool(plus_sign)
+        self.key_symbols = bool(key_symbols)
+        self.clarify_keys = bool(clarify_keys)
+        self.html = bool(html)
+        self.style = style or "mac"
+        self.values = tuple(getattr(self, option) for option in self.OPTIONS)
+        """a tuple of the option values, usable as a dictionary key"""
+
+        # the rendered key for every named key, by joiner
+        key_texts = {}
+        # for every mask, the rendered modifiers including the trailing joiner,
+        # the rendered keys, and the joiner
+        plans = []
+        for mask in range(len(MacOS.mask_mods)):
+            tokens, joiner = self._render_mods(mask)
+            if joiner not in key_texts:
+                key_texts[joiner] = self._render_keys(joiner)
+            if self.html:
+                # <kbd><kbd>⇧</kbd><kbd>⌘</kbd><kbd>P</kbd></kbd>, the keys
+                # close the outer <kbd>
+                prefix = "<kbd>" + "".join(
+                    f"<kbd>{token.translate(MacOS.html_trans)}</kbd>{joiner}"
+                    for token in tokens
+                )
+            else:
+                prefix = "".join(token + joiner for token in tokens)
+            plans.append((prefix, key_texts[joiner], joiner))
+        self._plans = tuple(plans)
+
+    def __new__(cls, *, style="mac", **_):
+        if cls is RenderOptions and style and style != "mac":
+            # other styles are a subclass in ksc.platforms
+            from . import platforms  # pylint: disable=import-outside-toplevel
+
+            cls = platforms.PlatformRenderOptions
+        return super().__new__(cls)
+
+    @classmethod
+    def compile(cls, **kwargs):
+        """return the shared RenderOptions for these options
+
+        Accepts the same keyword arguments as the constructor, including
+        ones it ignores, so you can pass **vars(args). output="html", as given
+        by the --output command line option, is the same as html=True
+        """
+        if kwargs.get("output") == "html":
+            kwargs = dict(kwargs, html=True)
+        # style is the only option which isn't a boolean, and it's last
+        key = tuple(bool(kwargs.get(option)) for option in cls.OPTIONS[:-1])
+        key += (kwargs.get("style") or "mac",)
+        try:
+            return cls._compiled[key]
+        except KeyError:
+            return cls._compiled.setdefault(key, cls(**kwargs))
+
+    def __repr__(self):
+        options = [
+            f"{option}=True" for option in self.OPTIONS[:-1] if getattr(self, option)
+        ]
+        if self.style != "mac":
+            options.append(f"style={self.style!r}")
+        return f"RenderOptions({', '.join(options)})"
+
+    def _render_mods(self, mask):
+        """return a list of rendered modifiers and the joiner for a mask"""
+        combo = MacOSKeyboardShortcut(mask, "")
+        tokens = []
+        joiner = ""
+
+        if self.modifier_symbols:
+            if self.plus_sign:
+                joiner = "+"
+            for sym, name in zip(combo.mod_symbols(), combo.mod_names(), strict=True):
+                if sym:
+                    tokens.append(sym)
+                else:
+                    # they asked for a format which can't be produced
+                    # (likely they asked for symbols but have the globe key)
+                    # so we are going to return a string with names instead
+                    joiner = "+" if self.plus_sign else "-"
+                    tokens.append(name)
+        elif self.modifier_ascii:
+            joiner = ""
+            for asci, name in zip(combo.mod_ascii(), combo.mod_names(), strict=True):
+                if asci:
+                    tokens.append(asci)
+                else:
+                    # they asked for a format which can't be produced.
+                    # likely they asked for ascii but gave the globe key
+                    # which doesn't have an ascii representation.
+                    # return a string with names instead, joined by either
+                    # plus or dash
+                    joiner = "+" if self.plus_sign else "-"
+                    tokens.append(name)
+        else:
+            joiner = "-"
+            tokens.extend(combo.mod_names(hyper=self.hyper))
+        return tokens, joiner
+
+    def _render_key(self, key, joiner):
+        """render a single key"""
+        if self.key_symbols:
+            # multi-character keys, like F12, get a joiner between each
+            # character, just like the modifiers
+            return joiner.join(key)
+        return MacOSKeyboardShortcut(0, key).key_name(clarify_keys=self.clarify_keys)
+
+    def _render_keys(self, joiner):
+        """return a dictionary of the rendered text for every named key
+
+        For HTML, every key in HTML_KEYS is included too, and the text is the
+        finished HTML fragment, so there is nothing to escape when rendering
+        """
+        texts = {}
+        if self.html:
+            for key in (*MacOS.key_map, *self.HTML_KEYS):
+                texts[key] = self._render_html_key(key, joiner)
+            return texts
+        for key in MacOS.key_map:
+            text = self._render_key(key, joiner)
+            if text != key:
+                texts[key] = text
+        return texts
+
+    def _render_html_key(self, key, joiner):
+        """render a single key as the HTML which ends a shortcut"""
+        text = self._render_key(key, joiner).translate(MacOS.html_trans)
+        return f"<kbd>{text}</kbd></kbd>"
+
+    def render(self, combo):
+        """render a MacOSKeyboardShortcut as a string for human consumption"""
+        prefix, key_texts, joiner = self._plans[combo.modmask]
+        key = combo.key
+        text = key_texts.get(key)
+        if text is None:
+            # keys we don't know anything about, like letters, are rendered as
+            # themselves, except for the multi-character ones with key_symbols
+            if self.html:
+                text = self._render_html_key(key, joiner)
+            else:
+                text = joiner.join(key) if self.key_symbols else key
+        return prefix + text
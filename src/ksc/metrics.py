@@ -0,0 +1,194 @@
+#
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2021 Jared Crapo
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+"""
+Opt-in counters and latency histograms for parsing and rendering shortcuts
+
+If you run a long lived service which uses ksc, turn on metrics and read a
+snapshot of them whenever you like:
+
+    metrics = ksc.Metrics()
+    metrics.enable()
+    ...
+    metrics.snapshot()["parses"]
+
+While enabled, every call to MacOS.parse_shortcut() and
+MacOSKeyboardShortcut.render() is counted and timed, as are the hits and misses
+of every ShortcutCache. The bulk methods, MacOS.parse_many() and
+RenderOptions.render(), are not counted, they are for when every microsecond
+matters.
+
+When metrics aren't enabled, the only cost is checking MacOS.metrics once in
+each of those methods.
+"""
+
+import bisect
+import collections
+import threading
+import time
+
+from .macos import MacOS, RenderOptions
+
+# upper bounds of the histogram buckets in seconds, parsing and rendering a
+# shortcut takes a few microseconds, so anything past a millisecond is trouble
+BUCKETS = (
+    0.000001,
+    0.0000025,
+    0.000005,
+    0.00001,
+    0.000025,
+    0.00005,
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    float("inf"),
+)
+
+
+class Histogram:
+    """count how many observations fall into each of a fixed set of buckets
+
+    Not thread safe on its own, Metrics holds a lock while observing.
+    """
+
+    def __init__(self, bounds=BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * len(bounds)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        """add a value to the first bucket whose upper bound is at least value"""
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def snapshot(self):
+        """return the count, sum and a dictionary of {upper bound: count}"""
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "buckets": dict(zip(self.bounds, self.counts, strict=True)),
+        }
+
+
+class Metrics:
+    """counters and latency histograms for parsing and rendering shortcuts
+
+    Only one Metrics can be enabled at a time, enabling another one replaces it.
+    Safe to use from multiple threads.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def enable(self):
+        """start counting and timing"""
+        MacOS.metrics = self
+
+    def disable(self):
+        """stop counting and timing, the metrics so far are kept"""
+        if MacOS.metrics is self:
+            MacOS.metrics = None
+
+    @property
+    def enabled(self):
+        """True if this is the Metrics being updated"""
+        return MacOS.metrics is self
+
+    def reset(self):
+        """set all the counters and histograms back to zero"""
+        with self._lock:
+            self._parses = 0
+            self._parse_errors = collections.Counter()
+            self._renders = 0
+            self._cache_hits = 0
+            self._cache_misses = 0
+            self._parse_latency = Histogram()
+            self._render_latency = Histogram()
+
+    def snapshot(self):
+        """return a dictionary of all the metrics"""
+        with self._lock:
+            return {
+                "parses": self._parses,
+                "parse_errors": dict(self._parse_errors),
+                "renders": self._renders,
+                "cache_hits": self._cache_hits,
+                "cache_misses": self._cache_misses,
+                "parse_latency": self._parse_latency.snapshot(),
+                "render_latency": self._render_latency.snapshot(),
+            }
+
+    def parse_shortcut(self, cls, text):
+        """MacOS.parse_shortcut() for cls, counted and timed"""
+        # pylint: disable=protected-access
+        start = time.perf_counter()
+        combo = cls._parse(text)
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self._parses += 1
+            self._parse_latency.observe(elapsed)
+            if combo is None:
+                self._parse_errors[error_category(text)] += 1
+        if combo is None:
+            raise ValueError(f"error parsing '{text}'")
+        return combo
+
+    def render(self, combo, **kwargs):
+        """MacOSKeyboardShortcut.render(), counted and timed"""
+        start = time.perf_counter()
+        text = RenderOptions.compile(**kwargs).render(combo)
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self._renders += 1
+            self._render_latency.observe(elapsed)
+        return text
+
+    def cache_lookup(self, hit):
+        """count a ShortcutCache hit, or a miss if hit is False"""
+        with self._lock:
+            if hit:
+                self._cache_hits += 1
+            else:
+                self._cache_misses += 1
+
+
+def error_category(text):
+    """return why text couldn't be parsed, as a short phrase for counting errors
+
+    "empty"       - there's nothing but whitespace
+    "missing key" - there are only modifiers
+    "unknown key" - there's a key, but it isn't one we know
+    """
+    if not text.strip():
+        return "empty"
+    for word, other in MacOS.token_regex.findall(text):
+        # separators match with neither group
+        if word or not other or other.isspace():
+            continue
+        if other not in MacOS.mods_unicode and other not in MacOS.mods_ascii:
+            return "unknown key"
+    return "missing key"
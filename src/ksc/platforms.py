@@ -0,0 +1,168 @@
+#
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2021 Jared Crapo
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+"""
+Render shortcuts in the style of platforms other than macOS
+
+Shortcuts are always parsed by MacOS, and have macOS modifiers. To render them
+for another platform, each macOS modifier is mapped to the matching modifier on
+that platform's keyboard, so Control is Ctrl, Option is Alt, and Command is the
+Windows or Super key, and the names of some keys change, like Return becoming
+Enter. Hyper is a macOS convention, so it's written out as its modifiers, and
+symbols typed with Shift are written as the key which types them, so Shift->
+is Shift+. on other platforms.
+
+The platforms are described by the data in PLATFORMS. The lookup tables for a
+platform are built the first time it's used, and this module isn't imported at
+all unless a style other than "mac" is asked for, so none of this costs anything
+when rendering macOS shortcuts.
+
+    >>> combo = MacOS.parse_shortcut("control shift z")
+    >>> RenderOptions.compile(style="win").render(combo)
+    'Ctrl+Shift+Z'
+"""
+
+import functools
+
+from .macos import MacOS, MacOSKeyboardShortcut, RenderOptions
+
+PLATFORMS = {
+    "win": {
+        # the macOS modifier, and the name on this platform, in the order they
+        # are displayed on this platform
+        "modifiers": [
+            ("Fn", "Fn"),
+            ("Command", "Win"),
+            ("Control", "Ctrl"),
+            ("Option", "Alt"),
+            ("Shift", "Shift"),
+            ("Globe", "Globe"),
+        ],
+        # the macOS name of a key, and the name on this platform, for keys
+        # whose names are different
+        "keys": {
+            "Escape": "Esc",
+            "Delete": "Backspace",
+            "Forward Delete": "Delete",
+            "Return": "Enter",
+            "Page Up": "PgUp",
+            "Page Down": "PgDn",
+            "Space": "Spacebar",
+        },
+    },
+    "linux": {
+        "modifiers": [
+            ("Fn", "Fn"),
+            ("Command", "Super"),
+            ("Control", "Ctrl"),
+            ("Option", "Alt"),
+            ("Shift", "Shift"),
+            ("Globe", "Globe"),
+        ],
+        "keys": {
+            "Escape": "Esc",
+            "Delete": "Backspace",
+            "Forward Delete": "Delete",
+            "Return": "Enter",
+        },
+    },
+}
+"""the modifiers and key names of each platform"""
+
+JOINER = "+"
+"""what goes between the modifiers and the key, on every platform in PLATFORMS"""
+
+
+class Platform:
+    """the lookup tables for rendering shortcuts on one platform"""
+
+    # pylint: disable=too-few-public-methods
+
+    def __init__(self, name, modifiers, keys):
+        self.name = name
+        bits = {mod.name: MacOS.mod_bits[mod] for mod in MacOS.modifiers}
+        # for every mask, the names of the modifiers on this platform, in order
+        mask_names = []
+        for mask in range(len(MacOS.mask_mods)):
+            mask_names.append(
+                tuple(name for mod, name in modifiers if mask & bits[mod])
+            )
+        self.mask_names = tuple(mask_names)
+        symbols = {key.name: key.key for key in MacOS.keys}
+        # the names of the keys which are different on this platform, by symbol
+        self.key_names = {symbols[mac_name]: name for mac_name, name in keys.items()}
+
+    @classmethod
+    @functools.cache
+    def get(cls, name):
+        """return the Platform for a style, building it the first time it's used
+
+        raises ValueError if there is no such platform
+        """
+        try:
+            data = PLATFORMS[name]
+        except KeyError:
+            raise ValueError(f"unknown style '{name}'") from None
+        return cls(name, data["modifiers"], data["keys"])
+
+
+class PlatformRenderOptions(RenderOptions):
+    """render options for a style other than mac
+
+    Modifiers are always names, and are joined with a plus sign, so
+    modifier_symbols, modifier_ascii, plus_sign, and key_symbols don't apply and
+    are ignored. So is hyper, the Hyper modifiers are always written out. Create
+    these with RenderOptions.compile(style=...).
+    """
+
+    __slots__ = ("platform",)
+
+    def __init__(self, *, hyper=False, clarify_keys=False, html=False, style, **_):
+        self.platform = Platform.get(style)
+        super().__init__(hyper=hyper, clarify_keys=clarify_keys, html=html, style=style)
+
+    def __repr__(self):
+        return super().__repr__().replace("RenderOptions", "PlatformRenderOptions", 1)
+
+    def _render_mods(self, mask):
+        """return a list of rendered modifiers and the joiner for a mask"""
+        return list(self.platform.mask_names[mask]), JOINER
+
+    def _render_keys(self, joiner):
+        """return a dictionary of the rendered text for every named key, and for
+        every symbol typed with shift"""
+        texts = super()._render_keys(joiner)
+        if not self.html:
+            # HTML_KEYS already has them for HTML
+            for key in MacOS.shifted_keys:
+                texts[key] = self._render_key(key, joiner)
+        return texts
+
+    def _render_key(self, key, joiner):
+        """render a single key, a symbol typed with shift is rendered as the key
+        which types it"""
+        key = key.translate(MacOS.to_unshifted_trans)
+        name = self.platform.key_names.get(key)
+        if name is not None:
+            return name
+        return MacOSKeyboardShortcut(0, key).key_name(clarify_keys=self.clarify_keys)
@@ -0,0 +1,96 @@
+#
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2021 Jared Crapo
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+"""
+Time the phases of the ksc command line program
+
+Turned on by the --profile and --profile-stats command line options, or by the
+KSC_PROFILE environment variable, see main() in ksc.__main__. This module is
+only imported when profiling, so it costs nothing the rest of the time.
+
+The time each phase takes is printed on standard error when the program
+finishes, standard output is never touched. If a file name is given, the whole
+run is also profiled with cProfile, and the stats are saved to that file, where
+they can be examined with pstats or tools like snakeviz.
+"""
+
+import cProfile
+import sys
+import time
+
+
+class Phases:
+    """a clock which records how long each phase takes
+
+    Call it with the name of a phase when that phase is done. The phase took
+    the time since the previous phase was done, or since the clock started.
+    """
+
+    def __init__(self, start=None):
+        self.start = time.perf_counter() if start is None else start
+        self.last = self.start
+        self.times = []
+
+    def __call__(self, name):
+        now = time.perf_counter()
+        self.times.append((name, now - self.last))
+        self.last = now
+
+    def report(self, prog, file=None):
+        """print the time of each phase, and the total"""
+        file = file or sys.stderr
+        width = max((len(name) for name, _ in self.times), default=0)
+        width = max(width, len("total"))
+        print(f"{prog}: profile", file=file)
+        for name, seconds in self.times:
+            print(f"  {name:<{width}} {seconds * 1000:10.3f} ms", file=file)
+        total = self.last - self.start
+        print(f"  {'total':<{width}} {total * 1000:10.3f} ms", file=file)
+
+
+def profile(func, argv, prog, *, stats=None, imported=None):
+    """call func(argv, prog, phase), timing its phases, and return what it returns
+
+    stats is the name of a file to save cProfile stats in, if not given
+    cProfile isn't used.
+
+    imported is the time.perf_counter() when ksc started being imported, which
+    is reported as the import phase. Only pass it the first time a process
+    runs main(), after that the imports are long done.
+    """
+    phases = Phases(imported)
+    if imported is not None:
+        phases("import")
+    profiler = cProfile.Profile() if stats else None
+    try:
+        if profiler:
+            profiler.enable()
+        try:
+            return func(argv, prog, phases)
+        finally:
+            if profiler:
+                profiler.disable()
+    finally:
+        phases.report(prog)
+        if profiler:
+            profiler.dump_stats(stats)
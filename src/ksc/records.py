@@ -0,0 +1,140 @@
+#
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2021 Jared Crapo
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+"""
+Structured records of shortcuts for machine consumers
+
+Every shortcut becomes a JSON object with the input text, the canonical list of
+modifiers, the key, the names of the key, and the shortcut rendered every way
+ksc knows how:
+
+    {"input": "cmd shift p", "mods": ["Shift", "Command"], "key": "P", ...}
+
+The fields which depend on the modifiers, and the fields which depend on the
+key, are encoded as JSON once, when the RecordEncoder is created. Encoding a
+shortcut is then a couple of lookups, rendering the variants, and joining the
+pieces together.
+"""
+
+import json
+import json.encoder
+
+from .macos import MacOS, RenderOptions
+
+VARIANTS = {
+    "names": {},
+    "symbols": {"modifier_symbols": True, "key_symbols": True},
+    "ascii": {"modifier_ascii": True},
+    "hyper": {"hyper": True},
+    "clarified": {"clarify_keys": True},
+    "html": {"html": True},
+}
+"""the rendered variants included in every record, and the options for each"""
+
+
+def _dumps(value):
+    """encode a value as compact JSON, leaving unicode characters alone"""
+    # encode_basestring is what json uses for strings, strings and line numbers
+    # are most of what we encode, so skip the overhead of dumps() for them
+    if isinstance(value, str):
+        return json.encoder.encode_basestring(value)
+    if type(value) is int:
+        return str(value)
+    return json.dumps(value, ensure_ascii=False)
+
+
+class RecordEncoder:
+    """encode shortcuts as JSON records
+
+    options is the RenderOptions for the "text" variant of each record, which is
+    what the text output would have been. If not given, the defaults are used.
+    """
+
+    def __init__(self, options=None):
+        self.options = options or RenderOptions.compile()
+        self._renders = [("text", self.options.render)]
+        for name, kwargs in VARIANTS.items():
+            self._renders.append((name, RenderOptions.compile(**kwargs).render))
+        # the encoded "mods" field for every mask
+        self._mod_fields = tuple(
+            '"mods": ' + _dumps([mod.name for mod in mods]) for mods in MacOS.mask_mods
+        )
+        # the encoded key fields for every key we know about
+        self._key_fields = {}
+        for key in (*MacOS.key_map, *RenderOptions.HTML_KEYS):
+            self._key_fields[key] = self._encode_key(key)
+
+    @staticmethod
+    def _encode_key(key):
+        """encode the fields of a record which only depend on the key"""
+        keyobj = MacOS.key_map.get(key)
+        name = keyobj.name if keyobj else key
+        clarified = keyobj.clarified_name if keyobj else None
+        return (
+            f'"key": {_dumps(key)}, "key_name": {_dumps(name)},'
+            f' "clarified_name": {_dumps(clarified)}'
+        )
+
+    def encode(self, combo, text=None, **fields):
+        """return a JSON object for a MacOSKeyboardShortcut as a string
+
+        text is the input the shortcut was parsed from. Any other keyword
+        arguments are added to the beginning of the record, which is how the
+        file name and line number are included when converting files.
+        """
+        key_fields = self._key_fields.get(combo.key)
+        if key_fields is None:
+            key_fields = self._encode_key(combo.key)
+        parts = [f'"{name}": {_dumps(value)}' for name, value in fields.items()]
+        parts.append(f'"input": {_dumps(text)}')
+        parts.append(self._mod_fields[combo.modmask])
+        parts.append(key_fields)
+        rendered = ", ".join(
+            f'"{name}": {_dumps(render(combo))}' for name, render in self._renders
+        )
+        parts.append(f'"rendered": {{{rendered}}}')
+        return "{" + ", ".join(parts) + "}"
+
+    def record(self, combo, text=None, **fields):
+        """return the record for a MacOSKeyboardShortcut as a dictionary"""
+        return json.loads(self.encode(combo, text, **fields))
+
+
+def write_records(records, write, ndjson=False):
+    """write encoded records as they are generated
+
+    records is an iterable of strings from RecordEncoder.encode(), write is a
+    function like sys.stdout.write. If ndjson is True, each record is on a line
+    by itself, otherwise the records are written as a JSON array with one record
+    on each line. Either way, the records are never all held in memory.
+    """
+    if ndjson:
+        for record in records:
+            write(record + "\n")
+        return
+    separator = "[\n"
+    for record in records:
+        write(separator)
+        write(record)
+        separator = ",\n"
+    write("[]\n" if separator == "[\n" else "\n]\n")
@@ -0,0 +1,664 @@
+#
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2021 Jared Crapo
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+"""
+Rewrite keyboard shortcut markup in Markdown and HTML documents
+
+Finds Jekyll style tags like:
+
+    {% kbd command shift p %}
+
+and HTML spans like:
+
+    <kbd>cmd-shift-p</kbd>
+
+and replaces them with the standardized representation of the shortcut. Liquid
+tags are replaced by the rendered shortcut, <kbd> spans keep their markup and
+get new contents. Everything else is copied through unchanged.
+
+Markup in the code blocks and code spans of Markdown documents is an example,
+not a shortcut, so it's left alone. HTML documents are rewritten everywhere.
+
+Documents are processed in chunks, so memory use doesn't depend on the size of
+the document.
+
+Whole directory trees of documents can be rewritten with rewrite_tree(), which
+spreads the work across a pool of processes, and keeps a manifest so documents
+which haven't changed since the last run are skipped.
+"""
+
+import codecs
+import collections
+import concurrent.futures
+import contextlib
+import hashlib
+import html
+import json
+import os
+import re
+import tempfile
+
+from .macos import MacOS, RenderOptions
+
+MAX_SHORTCUT = 200
+"""the longest shortcut text we will look for inside a tag"""
+
+TAG_REGEX = re.compile(
+    # {% kbd command shift p %}
+    rf"\{{%\s*kbd\s+(?P<liquid>[^\n]{{1,{MAX_SHORTCUT}}}?)\s*%\}}"
+    # <kbd>command shift p</kbd>, but not the individual keys of
+    # <kbd><kbd>⌘</kbd><kbd>P</kbd></kbd> or <kbd>Ctrl</kbd>+<kbd>P</kbd>
+    r"|(?<!<kbd>)(?<!</kbd>)(?<!</kbd>[-+])"
+    rf"(?P<open><kbd(?:\s[^<>]{{0,{MAX_SHORTCUT}}})?>)"
+    rf"(?P<html>[^<]{{1,{MAX_SHORTCUT}}}?)(?P<close></kbd>)"
+    r"(?![-+]?</?kbd)",
+    re.IGNORECASE,
+)
+"""find the markup for a shortcut"""
+
+MAX_TAG = 3 * MAX_SHORTCUT + 50
+"""no match of TAG_REGEX, including what it looks ahead at, can be longer than this"""
+
+LOOKBEHIND = len("</kbd>-")
+"""the most characters TAG_REGEX looks at before a match"""
+
+CHUNK_SIZE = 64 * 1024
+"""how many characters to read at a time"""
+
+RewriteError = collections.namedtuple("RewriteError", ["lineno", "text", "message"])
+"""a shortcut which couldn't be parsed, the markup is left unchanged"""
+
+RewriteResult = collections.namedtuple("RewriteResult", ["replaced", "errors"])
+"""how many shortcuts were replaced, and a list of RewriteError"""
+
+TreeResult = collections.namedtuple(
+    "TreeResult", ["rewritten", "skipped", "replaced", "errors"]
+)
+"""the number of documents rewritten and skipped, how many shortcuts were
+replaced, and a list of (path, RewriteError) tuples"""
+
+HTML_SUFFIXES = (".html", ".htm")
+"""documents with these suffixes are HTML, everything else is Markdown"""
+
+DOCUMENT_SUFFIXES = (".md", ".markdown", *HTML_SUFFIXES)
+"""rewrite_tree() rewrites files with these suffixes"""
+
+LINE_START_REGEX = re.compile(r"(?P<indent>[ \t]*)(?P<fence>`{3,}|~{3,})?")
+"""the indent of a line, and the fence if the line might start or end a code block"""
+
+INLINE_REGEX = re.compile(r"`+|\n")
+"""the things which matter to code spans in the rest of a line"""
+
+PARAGRAPH_END_REGEX = re.compile(
+    # a blank line
+    r"\n(?=[ \t\r]*(?:\n|\Z)"
+    # a fence or a heading
+    r"| {0,3}(?:`{3,}[^`\n]*(?:\n|\Z)|~{3}|#{1,6}(?:[ \t\r\n]|\Z)))"
+)
+"""the end of a paragraph, at a blank line, fence or heading, code spans can't go
+past it"""
+
+MANIFEST = ".ksc-manifest.json"
+"""the name of the file rewrite_tree() uses to remember what it has done"""
+
+
+class Rewriter:
+    """rewrite the shortcut markup in documents using the given render options"""
+
+    def __init__(self, options=None, chunk_size=CHUNK_SIZE):
+        """
+        options is a RenderOptions, if not given, the defaults are used
+
+        chunk_size is the number of characters to read at a time
+        """
+        self.options = options or RenderOptions.compile()
+        self.chunk_size = chunk_size
+
+    def replacement(self, match):
+        """return the replacement text for a match of TAG_REGEX
+
+        Raises ValueError if the shortcut can't be parsed
+        """
+        liquid = match.group("liquid")
+        render = self.options.render
+        if liquid is not None:
+            combos = MacOS.parse_shortcuts(liquid.strip())
+            return " ".join(render(combo) for combo in combos)
+        combos = MacOS.parse_shortcuts(html.unescape(match.group("html")).strip())
+        text = " ".join(render(combo) for combo in combos)
+        if self.options.html:
+            # the rendered shortcuts are complete <kbd> elements
+            return text
+        text = html.escape(text, quote=False)
+        return match.group("open") + text + match.group("close")
+
+    def rewrite(self, infile, outfile, *, markdown=True):
+        """read a document from infile, and write the rewritten document to outfile
+
+        infile and outfile are text file objects. Open them with newline="" so
+        line endings are preserved. If markdown is True, markup in code blocks
+        and code spans is left alone.
+
+        returns a RewriteResult
+        """
+        # pylint: disable=too-many-locals
+        replaced = 0
+        errors = []
+        # the text we have read, the first 'written' characters have already
+        # been written, but we keep them so TAG_REGEX can look behind a match
+        buf = ""
+        written = 0
+        # the line number of buf[written]
+        lineno = 1
+        code = _CodeScanner() if markdown else None
+        while True:
+            chunk = infile.read(self.chunk_size)
+            buf += chunk
+            if code:
+                code.scan(buf, final=not chunk)
+            if chunk:
+                # a match must start before this, so that any match, even one
+                # which is as long as possible, is entirely in the buffer, and
+                # we know whether it's in code
+                cut = len(buf) - MAX_TAG
+                if code:
+                    cut = min(cut, code.pos - MAX_TAG)
+                if cut <= written:
+                    continue
+            else:
+                cut = len(buf)
+            pos = written
+            for match in _find_tags(buf, written, cut, code):
+                try:
+                    text = self.replacement(match)
+                    replaced += 1
+                except ValueError as err:
+                    line = lineno + buf.count("\n", written, match.start())
+                    errors.append(RewriteError(line, match.group(), str(err)))
+                    text = match.group()
+                outfile.write(buf[pos : match.start()])
+                outfile.write(text)
+                pos = match.end()
+            # copy everything up to the cut, unless a match extends beyond it
+            end = max(pos, cut)
+            outfile.write(buf[pos:end])
+            lineno += buf.count("\n", written, end)
+            keep = max(end - LOOKBEHIND, 0)
+            buf = buf[keep:]
+            written = end - keep
+            if code:
+                code.trim(keep)
+            if not chunk:
+                break
+        return RewriteResult(replaced, errors)
+
+    def rewrite_file(self, filename, dest=None, *, hashes=None):
+        """rewrite filename, writing the result to dest
+
+        If dest isn't given, filename is rewritten in place, and isn't touched if
+        nothing in it changes. dest is replaced atomically, so it's never left
+        half written.
+
+        If hashes is a dict, the sha256 hex digests of the document and of the
+        rewritten document are put in it as "source" and "output". They are
+        computed as the document is read and written.
+
+        returns a RewriteResult
+        """
+        in_place = dest is None or os.fspath(dest) == os.fspath(filename)
+        try:
+            with (
+                open(filename, "rb") as infile,
+                atomic_write(dest or filename, like=filename, binary=True) as outfile,
+            ):
+                reader = _HashingReader(infile)
+                writer = _HashingWriter(outfile)
+                result = self.rewrite(reader, writer, markdown=is_markdown(filename))
+                source = reader.hash.hexdigest()
+                output = writer.hash.hexdigest()
+                if in_place and source == output:
+                    raise _Unchanged
+        except _Unchanged:
+            pass
+        if hashes is not None:
+            hashes.update(source=source, output=output)
+        return result
+
+
+class _Unchanged(Exception):
+    """raised to throw away a rewritten document which is the same as the original"""
+
+
+class _HashingReader:
+    """read text from a binary file of utf-8, hashing the bytes as they're read"""
+
+    def __init__(self, fobj):
+        self.fobj = fobj
+        self.hash = hashlib.sha256()
+        self.decoder = codecs.getincrementaldecoder("utf-8")()
+
+    def read(self, size):
+        """return up to size characters, or "" at the end of the file"""
+        while True:
+            data = self.fobj.read(size)
+            self.hash.update(data)
+            text = self.decoder.decode(data, final=not data)
+            # a chunk which ends part way through a character might not
+            # decode to anything, but that doesn't mean we're at the end
+            if text or not data:
+                return text
+
+
+class _HashingWriter:
+    """write text to a binary file as utf-8, hashing the bytes as they're written"""
+
+    def __init__(self, fobj):
+        self.fobj = fobj
+        self.hash = hashlib.sha256()
+
+    def write(self, text):
+        """write text to the file"""
+        data = text.encode("utf-8")
+        self.hash.update(data)
+        self.fobj.write(data)
+
+
+def is_markdown(filename):
+    """return True if filename is a Markdown document, or False if it's HTML"""
+    return not str(filename).lower().endswith(HTML_SUFFIXES)
+
+
+def _find_tags(buf, start, cut, code):
+    """generate the matches of TAG_REGEX in buf which start between start and cut
+
+    Matches in the code found by code, a _CodeScanner, are skipped. code may be
+    None to find every match.
+    """
+    regions = code.regions() if code else []
+    for code_start, code_end in [*regions, (len(buf), len(buf))]:
+        if code_end <= start:
+            continue
+        # stop at the code, so a match can't run into it
+        for match in TAG_REGEX.finditer(buf, start, max(code_start, start)):
+            if match.start() >= cut:
+                return
+            yield match
+        start = code_end
+        if start >= cut:
+            return
+
+
+class _CodeScanner:
+    """find the code blocks and code spans in a Markdown document
+
+    The document is given a buffer at a time to scan(), which remembers where
+    it got to, so it picks up there when the buffer has more text in it. These
+    are the CommonMark rules, simplified a little:
+
+    - fenced code blocks start with a line of at least three backticks or
+      tildes, and end with a line of at least as many of the same character,
+      or at the end of the document
+    - indented code blocks are lines indented by four or more spaces, after a
+      blank line or a heading, so indented paragraphs in lists are treated as
+      code too
+    - code spans start with a run of backticks and end with a run of the same
+      length in the same paragraph, otherwise the backticks are just text.
+      Paragraphs end at blank lines, fences and headings
+    """
+
+    def __init__(self):
+        # how much of the buffer has been scanned
+        self.pos = 0
+        self.line_start = True
+        # the fence of the fenced code block we're in
+        self.fence = None
+        self.indented = False
+        # the previous line was part of a paragraph, so an indented line
+        # continues it instead of starting a code block
+        self.paragraph = False
+        # (start, end) of the code found, and the start of the code we're in
+        self.code = []
+        self.code_start = None
+
+    def regions(self):
+        """return a list of (start, end) of the code in the scanned part of the
+        buffer"""
+        if self.code_start is None:
+            return self.code
+        return [*self.code, (self.code_start, self.pos)]
+
+    def trim(self, keep):
+        """forget about the first keep characters of the buffer"""
+        self.pos -= keep
+        if self.code_start is not None:
+            self.code_start -= keep
+        self.code = [
+            (start - keep, end - keep) for start, end in self.code if end > keep
+        ]
+
+    def scan(self, buf, final):
+        """scan as much of buf as we can
+
+        Stops early if it needs to see more of the document to know what
+        something is, unless final is True, which means there's no more
+        """
+        while self.pos < len(buf):
+            if self.line_start:
+                done = self._scan_line_start(buf, final)
+            elif self.fence or self.indented:
+                newline = buf.find("\n", self.pos)
+                self.pos = len(buf) if newline == -1 else newline + 1
+                self.line_start = newline != -1
+                done = True
+            else:
+                done = self._scan_inline(buf, final)
+            if not done:
+                return
+
+    def _open(self, start):
+        if self.code_start is None:
+            self.code_start = start
+
+    def _close(self, end):
+        self.code.append((self.code_start, end))
+        self.code_start = None
+
+    def _scan_line_start(self, buf, final):
+        """work out what the line at self.pos is, returns False if we need more
+        of the line"""
+        start = self.pos
+        match = LINE_START_REGEX.match(buf, start)
+        indent, fence = match.group("indent", "fence")
+        text = start + len(indent)
+        newline = buf.find("\n", start)
+        if newline == -1 and not final and (text == len(buf) or buf[text] in "`~"):
+            # we need to see the first character of the line, and all of the
+            # line if it might be a fence
+            return False
+        end = len(buf) if newline == -1 else newline + 1
+        rest = buf[match.end() : end].strip()
+        width = len(indent.expandtabs(4))
+        blank = not fence and not rest
+        self.pos = end
+        self.line_start = newline != -1
+        if self.fence:
+            if (
+                fence
+                and fence[0] == self.fence[0]
+                and len(fence) >= len(self.fence)
+                and width <= 3
+                and not rest
+            ):
+                self._close(end)
+                self.fence = None
+        elif fence and width <= 3 and not (fence[0] == "`" and "`" in rest):
+            self._open(start)
+            self.fence = fence
+            self.indented = False
+            self.paragraph = False
+        elif blank:
+            self.paragraph = False
+        elif width >= 4 and (self.indented or not self.paragraph):
+            self._open(start)
+            self.indented = True
+        else:
+            if self.indented:
+                self._close(start)
+                self.indented = False
+            self.paragraph = not (width <= 3 and buf.startswith("#", text))
+            self.pos = text
+            self.line_start = False
+        return True
+
+    def _scan_inline(self, buf, final):
+        """scan the rest of a line for code spans, returns False if we need more
+        of the document to find out where a code span ends"""
+        match = INLINE_REGEX.search(buf, self.pos)
+        if not match:
+            self.pos = len(buf)
+            return True
+        if match.group() == "\n":
+            self.pos = match.end()
+            self.line_start = True
+            return True
+        ticks = len(match.group())
+        closer = re.compile(rf"(?<!`)`{{{ticks}}}(?!`)").search(buf, match.end())
+        if closer:
+            # the end of the paragraph has to be before the line with the
+            # closing backticks, and we need all of that line to see if it's a
+            # fence which ends the paragraph
+            newline = buf.find("\n", closer.end())
+            if newline == -1 and not final:
+                self.pos = match.start()
+                return False
+            line_end = len(buf) if newline == -1 else newline + 1
+            end = PARAGRAPH_END_REGEX.search(buf, match.end(), line_end)
+            if end and end.start() >= closer.start():
+                end = None
+        else:
+            end = PARAGRAPH_END_REGEX.search(buf, match.end())
+            if end and not final and buf.find("\n", end.end()) == -1:
+                # the paragraph might not end there, we need all of the line
+                self.pos = match.start()
+                return False
+        if closer and not end:
+            self.code.append((match.start(), closer.end()))
+            self.pos = closer.end()
+        elif end or final:
+            # no closing backticks, so these are just text
+            self.pos = match.end()
+        else:
+            self.pos = match.start()
+            return False
+        return True
+
+
+def rewrite_tree(source, dest=None, *, options=None, jobs=None, force=False):
+    """rewrite every document in the source directory tree
+
+    Documents are files ending in one of DOCUMENT_SUFFIXES, directories whose
+    names start with a dot are ignored. If dest is given, the rewritten documents
+    are written to the same relative path in the dest directory, otherwise they
+    are rewritten in place.
+
+    The documents are rewritten by a pool of jobs processes, which defaults to
+    the number of CPUs. A manifest of the content of every document is kept in
+    the dest directory, documents which haven't changed since they were last
+    rewritten by the same version of ksc with the same options are skipped. Pass
+    force=True to rewrite everything.
+
+    returns a TreeResult
+    """
+    # pylint: disable=too-many-locals
+    options = options or RenderOptions.compile()
+    jobs = jobs or os.cpu_count() or 1
+    manifest_path = os.path.join(dest or source, MANIFEST)
+    header = _manifest_header(options)
+    previous = {} if force else _read_manifest(manifest_path, header)
+
+    tasks = []
+    for relpath, size in _find_documents(source, dest):
+        target = os.path.join(dest or source, relpath)
+        entry = previous.get(relpath)
+        current = ()
+        if entry and dest is None:
+            # the document has been rewritten in place, so it contains the output
+            current = (entry["output"],)
+        elif entry and os.path.exists(target):
+            current = (entry["source"],)
+        task = (relpath, os.path.join(source, relpath), target, current)
+        tasks.append((size, task))
+
+    # deal the documents, largest first, into a few batches for each process, so
+    # every batch has a similar amount of work
+    tasks.sort(key=lambda item: item[0], reverse=True)
+    count = min(len(tasks), jobs * 4)
+    batches = [[task for _, task in tasks[i::count]] for i in range(count)]
+    if jobs == 1 or count <= 1:
+        _init_worker(options.values)
+        results = map(_rewrite_documents, batches)
+        outcomes = [outcome for batch in results for outcome in batch]
+    else:
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers=jobs, initializer=_init_worker, initargs=(options.values,)
+        ) as executor:
+            results = executor.map(_rewrite_documents, batches)
+            outcomes = [outcome for batch in results for outcome in batch]
+
+    rewritten = skipped = replaced = 0
+    errors = []
+    files = {}
+    for relpath, entry, result in outcomes:
+        if result is None:
+            skipped += 1
+            files[relpath] = previous[relpath]
+            continue
+        rewritten += 1
+        replaced += result.replaced
+        errors.extend((relpath, error) for error in result.errors)
+        # documents with errors aren't remembered, so the errors are reported
+        # every time until they are fixed
+        if entry and not result.errors:
+            files[relpath] = entry
+    os.makedirs(os.path.dirname(manifest_path), exist_ok=True)
+    with atomic_write(manifest_path) as outfile:
+        json.dump(dict(header, files=files), outfile, indent=1, sort_keys=True)
+        outfile.write("\n")
+    errors.sort(key=lambda item: (item[0], item[1].lineno or 0))
+    return TreeResult(rewritten, skipped, replaced, errors)
+
+
+def _manifest_header(options):
+    """the parts of the manifest which must match for it to be used"""
+    import ksc  # pylint: disable=import-outside-toplevel
+
+    return {
+        "ksc": ksc.__version__,
+        "options": dict(zip(options.OPTIONS, options.values, strict=True)),
+    }
+
+
+def _read_manifest(path, header):
+    """return the files from the manifest at path, or {} if it can't be used"""
+    try:
+        with open(path, encoding="utf-8") as fobj:
+            manifest = json.load(fobj)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(manifest, dict) or not isinstance(manifest.get("files"), dict):
+        return {}
+    if any(manifest.get(key) != value for key, value in header.items()):
+        return {}
+    return manifest["files"]
+
+
+def _find_documents(source, dest=None):
+    """generate (relpath, size) for every document in the source tree
+
+    relpath always uses / as the separator, so manifests are portable
+    """
+    skip = os.path.realpath(dest) if dest else None
+    for dirpath, dirnames, filenames in os.walk(source):
+        dirnames[:] = [
+            dirname
+            for dirname in sorted(dirnames)
+            if not dirname.startswith(".")
+            and os.path.realpath(os.path.join(dirpath, dirname)) != skip
+        ]
+        for filename in sorted(filenames):
+            if filename.lower().endswith(DOCUMENT_SUFFIXES):
+                path = os.path.join(dirpath, filename)
+                relpath = os.path.relpath(path, source).replace(os.sep, "/")
+                yield relpath, os.path.getsize(path)
+
+
+# the Rewriter used by this process to rewrite documents for rewrite_tree()
+_worker_rewriter = None
+
+
+def _init_worker(values):
+    """create the Rewriter for this process once, instead of once per document"""
+    global _worker_rewriter  # pylint: disable=global-statement
+    options = RenderOptions.compile(
+        **dict(zip(RenderOptions.OPTIONS, values, strict=True))
+    )
+    _worker_rewriter = Rewriter(options)
+
+
+def _rewrite_documents(batch):
+    """rewrite a batch of documents, returns a list of (relpath, entry, result)
+
+    entry is the manifest entry for the document, result is a RewriteResult, or
+    None if the document was skipped because it hasn't changed
+    """
+    outcomes = []
+    for relpath, source, dest, current in batch:
+        try:
+            outcomes.append((relpath, *_rewrite_document(source, dest, current)))
+        except (OSError, UnicodeDecodeError) as err:
+            error = RewriteError(None, "", str(err))
+            outcomes.append((relpath, None, RewriteResult(0, [error])))
+    return outcomes
+
+
+def _rewrite_document(source, dest, current):
+    """rewrite one document, returns the manifest entry and a RewriteResult"""
+    if current and _file_digest(source) in current:
+        return None, None
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    entry = {}
+    result = _worker_rewriter.rewrite_file(source, dest, hashes=entry)
+    return entry, result
+
+
+def _file_digest(filename):
+    """return the sha256 hex digest of the contents of filename"""
+    digest = hashlib.sha256()
+    with open(filename, "rb") as fobj:
+        while data := fobj.read(CHUNK_SIZE * 16):
+            digest.update(data)
+    return digest.hexdigest()
+
+
+@contextlib.contextmanager
+def atomic_write(filename, like=None, *, binary=False):
+    """open a temporary file for writing which replaces filename when closed
+
+    The temporary file is a utf-8 text file, or a binary file if binary is True.
+    The new file gets the permissions of like, which defaults to filename. If
+    an exception occurs, the temporary file is removed and filename is left
+    unchanged.
+    """
+    dirname = os.path.dirname(os.path.abspath(filename))
+    fd, tmpname = tempfile.mkstemp(dir=dirname, prefix=".ksc-", suffix=".tmp")
+    try:
+        text = {} if binary else {"encoding": "utf-8", "newline": ""}
+        with open(fd, "wb" if binary else "w", **text) as outfile:
+            yield outfile
+        with contextlib.suppress(FileNotFoundError):
+            os.chmod(tmpname, os.stat(like or filename).st_mode & 0o7777)
+        os.replace(tmpname, filename)
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(tmpname)
+        raise
@@ -0,0 +1,348 @@
+#
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2021 Jared Crapo
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+"""
+An HTTP service which parses and renders shortcuts
+
+For tools which would rather make an HTTP request than run ksc. Start it with:
+
+    $ ksc serve --http --port 8080
+
+Render a single shortcut, or a sequence of them, with a GET:
+
+    $ curl 'http://127.0.0.1:8080/render?text=cmd+shift+p&modifier_symbols=1'
+    {"input": "cmd shift p", "output": "⇧⌘P"}
+
+Render lots of shortcuts by POSTing them, one per line. The body is read as it
+arrives and the results are streamed back as newline delimited JSON, one object
+for every line which isn't blank:
+
+    $ curl --data-binary @shortcuts.txt 'http://127.0.0.1:8080/render?hyper=1'
+    {"line": 1, "input": "cmd b", "output": "Command-B"}
+    {"line": 3, "input": "fred", "error": "error parsing 'fred'"}
+
+The query parameters are the keyword arguments of MacOSKeyboardShortcut.render(),
+booleans can be given as 1, true, yes or on, and 0, false, no, off or nothing.
+
+Built on asyncio so it can handle lots of connections at once, with nothing
+but the standard library. Parsing and rendering happen on the event loop, they
+are quick, and everything they need is built once and shared by every request.
+Each connection handles a single request.
+"""
+
+import asyncio
+import contextlib
+import json
+import sys
+import urllib.parse
+from json.encoder import encode_basestring
+
+from .macos import MacOS, ParseFailure, RenderOptions
+
+HOST = "127.0.0.1"
+"""the address the service listens on, only this machine by default"""
+
+PORT = 8000
+"""the port the service listens on"""
+
+BATCH_SIZE = 1000
+"""the most lines of a POST body parsed and rendered before sending the results"""
+
+MAX_BODY_LINE = 64 * 1024
+"""the longest line in a request, including the request line and headers"""
+
+TRUE = ("1", "true", "yes", "on")
+FALSE = ("", "0", "false", "no", "off")
+
+REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    411: "Length Required",
+    413: "Content Too Large",
+}
+
+
+class HTTPError(Exception):
+    """an error which is sent to the client as a response with this status"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def render_options(query):
+    """return the RenderOptions for the parameters of a query string
+
+    Raises HTTPError for parameters which aren't render options, or which have
+    values that don't make sense.
+    """
+    kwargs = {}
+    for name, values in urllib.parse.parse_qs(query, keep_blank_values=True).items():
+        if name == "text":
+            continue
+        if name not in RenderOptions.OPTIONS:
+            raise HTTPError(400, f"unknown option '{name}'")
+        value = values[-1]
+        if name == "style":
+            if value not in RenderOptions.STYLES:
+                raise HTTPError(400, f"unknown style '{value}'")
+        elif value.lower() in TRUE:
+            value = True
+        elif value.lower() in FALSE:
+            value = False
+        else:
+            raise HTTPError(400, f"'{value}' isn't true or false for {name}")
+        kwargs[name] = value
+    return RenderOptions.compile(**kwargs)
+
+
+def _render_line(lineno, text, result, render):
+    """return the encoded JSON line for a line of a POST body"""
+    # encode_basestring is what json.dumps() uses for strings, without the
+    # overhead of dumps(), which adds up over thousands of lines
+    if result.__class__ is ParseFailure:
+        field, value = "error", result.message
+    else:
+        field, value = "output", " ".join(render(combo) for combo in result)
+    return (
+        f'{{"line": {lineno}, "input": {encode_basestring(text)},'
+        f' "{field}": {encode_basestring(value)}}}\n'
+    )
+
+
+class Service:
+    """answer HTTP requests to render shortcuts"""
+
+    async def handle(self, reader, writer):
+        """handle a single request on a connection, then close it"""
+        try:
+            method, path, query, headers = await self._read_head(reader)
+            if path != "/render":
+                raise HTTPError(404, f"no such path '{path}'")
+            options = render_options(query)
+            if method == "GET":
+                await self.render(query, options, writer)
+            elif method == "POST":
+                await self.render_batch(reader, headers, options, writer)
+            else:
+                raise HTTPError(405, f"method {method} isn't allowed")
+        except HTTPError as err:
+            self._respond(writer, err.status, {"error": err.message})
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            with contextlib.suppress(ConnectionError):
+                await writer.drain()
+            writer.close()
+            with contextlib.suppress(ConnectionError):
+                await writer.wait_closed()
+
+    async def _read_head(self, reader):
+        """return (method, path, query, headers) of a request
+
+        header names are lower case
+        """
+        line = await self._readline(reader)
+        try:
+            method, target, _ = line.split()
+        except ValueError as err:
+            raise HTTPError(400, "bad request line") from err
+        url = urllib.parse.urlsplit(target)
+        headers = {}
+        while True:
+            line = await self._readline(reader)
+            if not line:
+                break
+            name, colon, value = line.partition(":")
+            if not colon:
+                raise HTTPError(400, "bad header")
+            headers[name.strip().lower()] = value.strip()
+        return method, url.path, url.query, headers
+
+    @staticmethod
+    async def _readline(reader):
+        """return a line of the request without the line ending"""
+        try:
+            line = await reader.readuntil(b"\n")
+        except asyncio.LimitOverrunError as err:
+            raise HTTPError(413, "line too long") from err
+        except asyncio.IncompleteReadError as err:
+            if err.partial:
+                raise HTTPError(400, "incomplete request") from err
+            raise
+        return line.decode("utf-8", errors="replace").rstrip("\r\n")
+
+    async def _body_lines(self, reader, headers):
+        """generate lists of the lines of a request body as they arrive
+
+        Bodies can be sent with a Content-Length or chunked.
+        """
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            blocks = self._chunks(reader)
+        elif "content-length" in headers:
+            try:
+                length = int(headers["content-length"])
+            except ValueError as err:
+                raise HTTPError(400, "bad Content-Length") from err
+            blocks = self._blocks(reader, length)
+        else:
+            raise HTTPError(411, "Content-Length or chunked body required")
+        partial = b""
+        async for block in blocks:
+            lines = (partial + block).split(b"\n")
+            partial = lines.pop()
+            if len(partial) > MAX_BODY_LINE:
+                raise HTTPError(413, "line too long")
+            if lines:
+                yield [line.decode("utf-8", errors="replace") for line in lines]
+        if partial:
+            yield [partial.decode("utf-8", errors="replace")]
+
+    @staticmethod
+    async def _blocks(reader, length):
+        """generate a body of length bytes, as it arrives"""
+        while length > 0:
+            block = await reader.read(min(length, MAX_BODY_LINE))
+            if not block:
+                raise asyncio.IncompleteReadError(b"", length)
+            length -= len(block)
+            yield block
+
+    async def _chunks(self, reader):
+        """generate the chunks of a chunked body"""
+        while True:
+            line = await self._readline(reader)
+            try:
+                size = int(line.partition(";")[0], 16)
+            except ValueError as err:
+                raise HTTPError(400, "bad chunk size") from err
+            if size == 0:
+                # skip any trailers
+                while await self._readline(reader):
+                    pass
+                return
+            chunk = await reader.readexactly(size)
+            await self._readline(reader)
+            yield chunk
+
+    def _respond(self, writer, status, record):
+        """send a complete JSON response"""
+        body = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+        self._start(writer, status, "application/json", len(body))
+        writer.write(body)
+
+    @staticmethod
+    def _start(writer, status, content_type, length=None):
+        """send the status line and headers, a chunked body follows if no length"""
+        lines = [
+            f"HTTP/1.1 {status} {REASONS[status]}",
+            f"Content-Type: {content_type}; charset=utf-8",
+            "Connection: close",
+        ]
+        if length is None:
+            lines.append("Transfer-Encoding: chunked")
+        else:
+            lines.append(f"Content-Length: {length}")
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+
+    async def render(self, query, options, writer):
+        """answer a GET, which renders the text parameter"""
+        texts = urllib.parse.parse_qs(query).get("text")
+        if not texts:
+            raise HTTPError(400, "the text parameter is required")
+        text = texts[-1]
+        try:
+            combos = MacOS.parse_shortcuts(text)
+        except ValueError as err:
+            raise HTTPError(400, str(err)) from err
+        output = " ".join(options.render(combo) for combo in combos)
+        self._respond(writer, 200, {"input": text, "output": output})
+
+    async def render_batch(self, reader, headers, options, writer):
+        """answer a POST, which renders every line of the body
+
+        Lines are parsed and rendered in batches as they arrive, and the results
+        for each batch are sent as a chunk, so neither the request nor the
+        response is ever held in memory.
+        """
+        render = options.render
+        blocks = self._body_lines(reader, headers)
+        # read the first lines before promising a successful response, so a bad
+        # body gets an error status
+        lines = await anext(blocks, None)
+        self._start(writer, 200, "application/x-ndjson")
+        lineno = 0
+        try:
+            while lines is not None:
+                for start in range(0, len(lines), BATCH_SIZE):
+                    batch = [line.strip() for line in lines[start : start + BATCH_SIZE]]
+                    results = MacOS.parse_many(
+                        [text for text in batch if text], "collect", sequences=True
+                    )
+                    out = []
+                    for text in batch:
+                        lineno += 1
+                        if text:
+                            out.append(
+                                _render_line(lineno, text, next(results), render)
+                            )
+                    await self._write_chunk(writer, "".join(out))
+                lines = await anext(blocks, None)
+        except HTTPError as err:
+            # too late to change the status, so the error is the last line
+            error = json.dumps({"error": err.message}) + "\n"
+            await self._write_chunk(writer, error)
+        writer.write(b"0\r\n\r\n")
+
+    @staticmethod
+    async def _write_chunk(writer, text):
+        """send text as a chunk of a chunked response"""
+        if text:
+            chunk = text.encode("utf-8")
+            writer.write(f"{len(chunk):x}\r\n".encode("ascii") + chunk + b"\r\n")
+            await writer.drain()
+
+
+async def start_server(host=HOST, port=PORT):
+    """start the service and return the asyncio server"""
+    service = Service()
+    return await asyncio.start_server(service.handle, host, port, limit=MAX_BODY_LINE)
+
+
+def serve(host=HOST, port=PORT, prog="ksc serve"):
+    """run the service until interrupted, returns an exit code"""
+
+    async def run():
+        server = await start_server(host, port)
+        for sock in server.sockets:
+            name = sock.getsockname()
+            print(f"{prog}: listening on http://{name[0]}:{name[1]}/", file=sys.stderr)
+        async with server:
+            await server.serve_forever()
+
+    with contextlib.suppress(KeyboardInterrupt):
+        asyncio.run(run())
+    return 0
@@ -64,10 +64,33 @@ def pytest_clean(_):
 namespace_clean.add_task(pytest_clean, name="tests")
 
 
+@invoke.task(
+    help={
+        "output": "save the results to this JSON file",
+        "compare": "compare to results saved in this JSON file, fail if slower",
+        "threshold": "fraction slower a metric can be before failing, default 0.1",
+        "only": "comma separated benchmarks to run: parse,render,named_keys,import",
+    }
+)
+def bench(context, output=None, compare=None, threshold=0.1, only=None):
+    "Run the benchmarks in benchmarks/bench.py"
+    args = ["python", "benchmarks/bench.py"]
+    if output:
+        args.extend(["--output", output])
+    if compare:
+        args.extend(["--compare", compare, "--threshold", str(threshold)])
+    if only:
+        args.extend(only.split(","))
+    context.run(" ".join(args), echo=True, pty=True)
+
+
+namespace.add_task(bench)
+
+
 @invoke.task
 def quality(context):
     "Inspect code quality using ruff"
-    context.run("ruff check *.py src/ksc tests", echo=True)
+    context.run("ruff check *.py src/ksc tests benchmarks", echo=True)
 
 
 namespace.add_task(quality, name="inspect")
@@ -77,7 +100,7 @@ namespace_check.add_task(quality)
 @invoke.task
 def format_check(context):
     """Check if code is properly formatted using ruff"""
-    context.run("ruff format --check *.py tests src", echo=True)
+    context.run("ruff format --check *.py tests src benchmarks", echo=True)
 
 
 namespace_check.add_task(format_check, name="format")
@@ -86,7 +109,7 @@ namespace_check.add_task(format_check, name="format")
 @invoke.task
 def formatt(context):
     """Format code using ruff"""
-    context.run("ruff format *.py tests src", echo=True)
+    context.run("ruff format *.py tests src benchmarks", echo=True)
 
 
 namespace.add_task(formatt, name="format")
@@ -0,0 +1,87 @@
+#
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2021 Jared Crapo
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+# pylint: disable=protected-access, missing-function-docstring
+# pylint: disable=missing-module-docstring, unused-variable
+
+import json
+
+import pytest
+
+import ksc
+from ksc.alfred import HINT, script_filter
+
+
+def _items(text, **kwargs):
+    options = ksc.RenderOptions.compile(**kwargs) if kwargs else None
+    return json.loads(script_filter(text, options))["items"]
+
+
+def test_variants():
+    items = _items("command shift p")
+    assert [(item["subtitle"], item["title"]) for item in items] == [
+        ("Names", "Shift-Command-P"),
+        ("Symbols", "⇧⌘P"),
+        ("ASCII", "$@P"),
+        ("HTML", "<kbd><kbd>Shift</kbd>-<kbd>Command</kbd>-<kbd>P</kbd></kbd>"),
+    ]
+    for item in items:
+        assert item["arg"] == item["title"]
+        assert item["text"] == {"copy": item["title"], "largetype": item["title"]}
+        assert "valid" not in item
+
+
+@pytest.mark.parametrize(
+    "text, subtitle, title",
+    [
+        ("hyper x", "Hyper", "Hyper-X"),
+        ("option .", "Clarified", "Option-Period (.)"),
+        ("control x / control c", "Symbols", "⌃X ⌃C"),
+    ],
+)
+def test_variant(text, subtitle, title):
+    items = {item["subtitle"]: item["title"] for item in _items(text)}
+    assert items[subtitle] == title
+
+
+def test_options_first():
+    items = _items("cmd b", modifier_symbols=True, plus_sign=True)
+    assert (items[0]["subtitle"], items[0]["title"]) == ("Your options", "⌘+B")
+    assert items[1]["subtitle"] == "Names"
+
+
+def test_default_options_not_repeated():
+    items = _items("cmd b", style="mac")
+    assert items[0]["subtitle"] == "Names"
+
+
+@pytest.mark.parametrize(
+    "text, title",
+    [
+        ("", "ksc"),
+        ("   ", "ksc"),
+        ("cmd", "error parsing 'cmd'"),
+    ],
+)
+def test_invalid(text, title):
+    assert _items(text) == [{"title": title, "subtitle": HINT, "valid": False}]
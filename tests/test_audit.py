@@ -0,0 +1,103 @@
+#
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2021 Jared Crapo
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+# pylint: disable=protected-access, missing-function-docstring
+# pylint: disable=missing-module-docstring, unused-variable
+
+import pytest
+
+import ksc
+from ksc.audit import AuditError, Auditor, Binding, is_conflict
+
+KEYMAP = """\
+cmd-shift-p\tCommand Palette
+# a comment
+
+⇧⌘P\tOpen File
+$@p\tCommand Palette
+cmd b\tBold
+command b\tBold
+fred\tNothing
+no action
+control x / control c\tQuit
+ctrl-x ctrl-c\tQuit
+cmd z\tUndo
+"""
+
+
+@pytest.fixture
+def auditor():
+    auditor = Auditor()
+    auditor.add_keymap(KEYMAP.splitlines(), "keymap.tsv")
+    return auditor
+
+
+def test_groups(auditor):
+    groups = list(auditor.groups())
+    assert [group.combos for group in groups] == [
+        (ksc.MacOS.parse_shortcut("shift command p"),),
+        (ksc.MacOS.parse_shortcut("command b"),),
+    ]
+    assert groups[0].bindings == [
+        Binding("keymap.tsv", 1, "cmd-shift-p", "Command Palette"),
+        Binding("keymap.tsv", 4, "⇧⌘P", "Open File"),
+        Binding("keymap.tsv", 5, "$@p", "Command Palette"),
+    ]
+    assert is_conflict(groups[0])
+    assert not is_conflict(groups[1])
+
+
+def test_errors(auditor):
+    assert auditor.errors == [
+        AuditError("keymap.tsv", 8, "error parsing 'fred'"),
+        AuditError("keymap.tsv", 9, "expected a shortcut and an action"),
+        AuditError("keymap.tsv", 11, "error parsing 'ctrl-x ctrl-c'"),
+    ]
+    assert auditor.bindings == 7
+
+
+def test_sequences():
+    auditor = Auditor()
+    auditor.add_keymap(["control x / control c\tQuit", "^x | ^c\tExit"], "a")
+    (group,) = auditor.groups()
+    assert len(group.combos) == 2
+    assert is_conflict(group)
+
+
+def test_across_keymaps():
+    auditor = Auditor(delimiter=",")
+    auditor.add_keymap(["cmd b,Bold"], "a.csv")
+    auditor.add_keymap(["⌘B,Bookmark"], "b.csv")
+    (group,) = auditor.groups()
+    assert [binding.filename for binding in group.bindings] == ["a.csv", "b.csv"]
+
+
+def test_many_bindings():
+    keys = "abcdefghijklmnopqrstuvwxyz"
+    lines = [f"command {keys[i % 26]}\taction {i % 52}" for i in range(10000)]
+    auditor = Auditor()
+    auditor.add_keymap(lines, "big")
+    groups = list(auditor.groups())
+    assert len(groups) == 26
+    assert sum(len(group.bindings) for group in groups) == 10000
+    assert all(is_conflict(group) for group in groups)
@@ -0,0 +1,143 @@
+#
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2021 Jared Crapo
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+# pylint: disable=protected-access, missing-function-docstring
+# pylint: disable=missing-module-docstring, unused-variable
+
+import threading
+
+import pytest
+
+import ksc
+from ksc.cache import LRUCache
+
+
+def test_lru_evicts_oldest():
+    cache = LRUCache(2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    # b was least recently used
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert len(cache) == 2
+
+
+def test_lru_info_and_clear():
+    cache = LRUCache(10)
+    cache.put("a", 1)
+    cache.get("a")
+    cache.get("a")
+    cache.get("b")
+    assert cache.cache_info() == ksc.CacheInfo(2, 1, 10, 1)
+    cache.clear()
+    assert cache.cache_info() == ksc.CacheInfo(0, 0, 10, 0)
+
+
+def test_lru_maxsize():
+    with pytest.raises(ValueError):
+        LRUCache(0)
+
+
+def test_parse_cached():
+    cache = ksc.ShortcutCache()
+    first = cache.parse_shortcut("command shift p")
+    second = cache.parse_shortcut("command shift p")
+    assert first is second
+    assert str(first) == "Shift-Command-P"
+    info = cache.cache_info()["parse"]
+    assert info.hits == 1
+    assert info.misses == 1
+
+
+def test_parse_negative_cache():
+    cache = ksc.ShortcutCache()
+    for _ in range(3):
+        with pytest.raises(ValueError, match="fred"):
+            cache.parse_shortcut("fred")
+    info = cache.cache_info()["parse"]
+    assert info.hits == 2
+    assert info.misses == 1
+    assert info.currsize == 1
+
+
+def test_parse_shortcuts_cached():
+    cache = ksc.ShortcutCache()
+    combos = cache.parse_shortcuts("control x / control c / control x")
+    assert [str(combo) for combo in combos] == [
+        "Control-X",
+        "Control-C",
+        "Control-X",
+    ]
+    assert combos[0] is combos[2]
+
+
+def test_render_cached():
+    cache = ksc.ShortcutCache()
+    combo = ksc.MacOS.parse_shortcut("hyper t")
+    assert cache.render(combo, hyper=True) == "Hyper-T"
+    assert cache.render(combo, hyper=True, list=False) == "Hyper-T"
+    assert cache.render(combo, modifier_symbols=True) == "⌃⌥⇧⌘T"
+    # an equivalent shortcut parsed separately hits the cache too
+    other = ksc.MacOS.parse_shortcut("^~$@t")
+    assert cache.render(other, hyper=True) == "Hyper-T"
+    info = cache.cache_info()["render"]
+    assert info.hits == 2
+    assert info.misses == 2
+
+
+def test_clear():
+    cache = ksc.ShortcutCache(maxsize=5, render_maxsize=7)
+    combo = cache.parse_shortcut("command b")
+    cache.render(combo)
+    cache.clear()
+    info = cache.cache_info()
+    assert info["parse"] == ksc.CacheInfo(0, 0, 5, 0)
+    assert info["render"] == ksc.CacheInfo(0, 0, 7, 0)
+
+
+def test_threads():
+    cache = ksc.ShortcutCache(maxsize=8)
+    inputs = [f"command f{num}" for num in range(1, 21)]
+    errors = []
+
+    def worker():
+        try:
+            for _ in range(50):
+                for text in inputs:
+                    combo = cache.parse_shortcut(text)
+                    assert cache.render(combo) == text.replace("command f", "Command-F")
+        except AssertionError as err:  # pragma: nocover
+            errors.append(err)
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+    info = cache.cache_info()["parse"]
+    assert info.currsize == 8
+    assert info.hits + info.misses == 4 * 50 * 20
@@ -0,0 +1,166 @@
+#
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2021 Jared Crapo
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+# pylint: disable=protected-access, missing-function-docstring
+# pylint: disable=missing-module-docstring, unused-variable
+
+import re
+
+import pytest
+
+from ksc.cocoa import cocoa_shortcut, read_bindings, tokenize, unescape
+
+BINDINGS = r"""/* my bindings */
+{
+    "^f" = "moveWordForward:";   // Control-F
+    "~d" = deleteWordForward:;
+    "$\UF700" = "moveUpAndModifySelection:";
+    "@\UF729" = ("moveToBeginningOfDocument:", "moveToBeginningOfLine:");
+    "^x" = {
+        "^s" = "save:";
+        "u" = undo:
+    };
+    "\UF746" = "help:";
+    "~$a" = (insertText:, "\"å\"")
+}
+"""
+
+
+def _bindings(chunks):
+    return [
+        (combos and " ".join(str(combo) for combo in combos), actions, lineno)
+        for combos, actions, lineno in read_bindings(chunks)
+    ]
+
+
+EXPECTED = [
+    ("Control-F", ["moveWordForward:"], 3),
+    ("Option-D", ["deleteWordForward:"], 4),
+    ("Shift-Up Arrow", ["moveUpAndModifySelection:"], 5),
+    ("Command-Home", ["moveToBeginningOfDocument:", "moveToBeginningOfLine:"], 6),
+    ("Control-X Control-S", ["save:"], 8),
+    ("Control-X U", ["undo:"], 9),
+    (None, ["help:"], 11),
+    ("Option-Shift-A", ["insertText:", '"å"'], 12),
+]
+
+
+def test_read_bindings():
+    assert _bindings([BINDINGS]) == EXPECTED
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64])
+def test_read_bindings_chunks(size):
+    chunks = (BINDINGS[i : i + size] for i in range(0, len(BINDINGS), size))
+    assert _bindings(chunks) == EXPECTED
+
+
+def test_read_bindings_lazily():
+    def chunks():
+        yield '{ "^a" = first:; '
+        raise AssertionError("read too far")
+
+    bindings = read_bindings(chunks())
+    combos, actions, _ = next(bindings)
+    assert str(combos[0]) == "Control-A"
+    assert actions == ["first:"]
+
+
+@pytest.mark.parametrize(
+    "key, shortcut",
+    [
+        ("^a", "Control-A"),
+        ("@$z", "Shift-Command-Z"),
+        ("~", "Shift-~"),
+        ("^~", "Control-Shift-~"),
+        ("@\\^", "Shift-Command-6"),
+        ("#5", "5"),
+        ("\uf704", "F1"),
+        ("@\uf726", "Command-F35"),
+        ("\uf72c", "Page Up"),
+        ("@\x7f", "Command-Delete"),
+        ("\x1b", "Escape"),
+        ("\r", "Return"),
+        ("\x03", "Enter"),
+        ("~\t", "Option-Tab"),
+        ("^ ", "Control-Space"),
+    ],
+)
+def test_cocoa_shortcut(key, shortcut):
+    assert str(cocoa_shortcut(key)) == shortcut
+
+
+@pytest.mark.parametrize("key", ["", "^", "ab", "\uf746", "^\uf8ff"])
+def test_cocoa_shortcut_unknown(key):
+    if key == "^":
+        # the last character is always the key
+        assert str(cocoa_shortcut(key)) == "Shift-6"
+    else:
+        assert cocoa_shortcut(key) is None
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("plain", "plain"),
+        (r"\UF700", "\uf700"),
+        (r"\177", "\x7f"),
+        (r"\033x", "\x1bx"),
+        (r"a\nb\tc", "a\nb\tc"),
+        (r"\"\\", '"\\'),
+        (r"\^", "^"),
+    ],
+)
+def test_unescape(text, expected):
+    assert unescape(text) == expected
+
+
+def test_tokenize_lines():
+    tokens = list(tokenize(['{\n  "a"\n  =\n/* a\ncomment */ b;}']))
+    assert [(token.value, token.lineno) for token in tokens] == [
+        ("{", 1),
+        ("a", 2),
+        ("=", 3),
+        ("b", 5),
+        (";", 5),
+        ("}", 5),
+    ]
+
+
+@pytest.mark.parametrize(
+    "text, message",
+    [
+        ('{ "a" = b; & }', "line 1: unexpected '&'"),
+        ('{ "a" = b;\n', "unexpected end of file"),
+        ('"a" = b;', "line 1: expected '{', found 'a'"),
+        ('{ "a" b; }', "line 1: expected '=', found 'b'"),
+        ('{ "a" = ; }', "line 1: expected a value, found ';'"),
+        ("{ = b; }", "line 1: expected a key, found '='"),
+        ('{ "a" = (b c); }', "line 1: expected ',' or ')', found 'c'"),
+        ('{ "a" = (b, ;); }', "line 1: expected a string, found ';'"),
+        ('{ "a" = "b; }', "line 1: unexpected '\"'"),
+    ],
+)
+def test_errors(text, message):
+    with pytest.raises(ValueError, match=re.escape(message)):
+        list(read_bindings([text]))
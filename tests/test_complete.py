@@ -0,0 +1,103 @@
+#
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2021 Jared Crapo
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+# pylint: disable=protected-access, missing-function-docstring
+# pylint: disable=missing-module-docstring, unused-variable
+
+import pytest
+
+import ksc
+from ksc.complete import Completer, shell_script
+
+
+@pytest.fixture
+def completer():
+    return Completer.macos()
+
+
+def test_macos_is_shared():
+    assert Completer.macos() is Completer.macos()
+
+
+def test_every_name(completer):
+    names = completer.complete("")
+    assert set(names) == set(ksc.MacOS.keyname_map) | {"hyper"}
+    assert list(names) == sorted(names)
+
+
+@pytest.mark.parametrize(
+    "prefix, names",
+    [
+        ("pa", ("pagedown", "pageup")),
+        ("PgU", ("pgup",)),
+        ("command", ("command",)),
+        ("hyp", ("hyper",)),
+        ("fred", ()),
+    ],
+)
+def test_complete(completer, prefix, names):
+    assert completer.complete(prefix) == names
+
+
+@pytest.mark.parametrize(
+    "text, first",
+    [
+        ("pgdn", "pgdown"),
+        ("comand", "command"),
+        ("escpe", "escape"),
+        ("rclk", "rclick"),
+        ("Shfit", "shft"),
+    ],
+)
+def test_fuzzy(completer, text, first):
+    assert completer.fuzzy(text)[0] == first
+
+
+def test_fuzzy_no_match(completer):
+    assert completer.fuzzy("zzz") == ()
+
+
+def test_fuzzy_limit(completer):
+    assert len(completer.fuzzy("f", limit=3)) <= 3
+
+
+def test_suggest(completer):
+    assert completer.suggest("pa") == ("pagedown", "pageup")
+    # nothing starts with it, so it's fuzzy
+    assert completer.suggest("pgdn") == completer.fuzzy("pgdn")
+    assert len(completer.suggest("f", limit=5)) == 5
+
+
+def test_small_completer():
+    completer = Completer(["abc", "abd", "xyz", "abc"])
+    assert completer.complete("a") == ("abc", "abd")
+    assert completer.complete("ab") == ("abc", "abd")
+    assert completer.complete("abd") == ("abd",)
+    assert completer.complete("abde") == ()
+
+
+@pytest.mark.parametrize("shell", ["bash", "zsh"])
+def test_shell_script(shell):
+    script = shell_script(shell, "ksc", ["-y", "--hyper"])
+    assert "ksc --complete" in script
+    assert "-y --hyper" in script
@@ -0,0 +1,341 @@
+#
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2021 Jared Crapo
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+# pylint: disable=protected-access, missing-function-docstring
+# pylint: disable=missing-module-docstring, unused-variable
+
+import io
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+import ksc.__main__
+from ksc import client, daemon
+from ksc.__main__ import EXIT_ERROR, EXIT_SUCCESS, EXIT_USAGE, main
+
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    path = str(tmp_path / "ksc.sock")
+    monkeypatch.setenv("KSC_SOCKET", path)
+    srv = daemon.Server(path)
+    thread = threading.Thread(target=srv.serve_forever, daemon=True)
+    thread.start()
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+    thread.join()
+
+
+def test_socket_path_env(monkeypatch):
+    monkeypatch.setenv("KSC_SOCKET", "/some/where/ksc.sock")
+    assert client.socket_path() == "/some/where/ksc.sock"
+
+
+def test_socket_path_runtime_dir(monkeypatch):
+    monkeypatch.delenv("KSC_SOCKET", raising=False)
+    monkeypatch.setenv("XDG_RUNTIME_DIR", "/run/user/501")
+    assert client.socket_path() == "/run/user/501/ksc.sock"
+
+
+def test_socket_path_default(monkeypatch):
+    monkeypatch.delenv("KSC_SOCKET", raising=False)
+    monkeypatch.delenv("XDG_RUNTIME_DIR", raising=False)
+    monkeypatch.setenv("TMPDIR", "/tmp")
+    assert client.socket_path() == f"/tmp/ksc-{os.getuid()}/ksc.sock"
+
+
+@pytest.mark.parametrize(
+    "mode, safe",
+    [
+        (0o700, True),
+        (0o755, True),
+        (0o777, False),
+        (0o770, False),
+        (0o1777, True),
+    ],
+)
+def test_safe_directory(tmp_path, mode, safe):
+    directory = tmp_path / "dir"
+    directory.mkdir()
+    directory.chmod(mode)
+    assert client.safe_directory(str(directory)) is safe
+    assert not client.safe_directory(str(tmp_path / "missing"))
+
+
+def test_untrusted_socket(server, tmp_path, monkeypatch):
+    path = server.server_address
+    assert client.trusted_socket(path)
+    assert not client.trusted_socket(str(tmp_path / "missing.sock"))
+    tmp_path.chmod(0o777)
+    try:
+        assert not client.trusted_socket(path)
+        assert client.request(["command", "b"]) is None
+    finally:
+        tmp_path.chmod(0o700)
+    monkeypatch.setattr(os, "getuid", lambda: os.stat(path).st_uid + 1)
+    assert not client.trusted_socket(path)
+
+
+def test_serve_makes_private_directory(tmp_path, monkeypatch):
+    served = []
+
+    class FakeServer:
+        def __init__(self, path):
+            served.append(path)
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *args):
+            pass
+
+        def serve_forever(self):
+            pass
+
+    monkeypatch.setattr(daemon, "Server", FakeServer)
+    path = str(tmp_path / "run" / "ksc.sock")
+    assert daemon.serve(path) == EXIT_SUCCESS
+    assert served == [path]
+    assert (tmp_path / "run").stat().st_mode & 0o777 == 0o700
+
+
+def test_serve_refuses_shared_directory(tmp_path, capsys):
+    tmp_path.chmod(0o777)
+    try:
+        assert daemon.serve(str(tmp_path / "ksc.sock")) == EXIT_ERROR
+    finally:
+        tmp_path.chmod(0o700)
+    _, err = capsys.readouterr()
+    assert f"other users can write to {tmp_path}" in err
+
+
+@pytest.mark.parametrize(
+    "argv",
+    [
+        [],
+        [""],
+        ["command", "b"],
+        ["-ms", "-p", "command", "shift", "%"],
+        ["control", "x", "/", "control", "c"],
+        ["⌘⇧F"],
+    ],
+)
+def test_request_roundtrip(argv):
+    data = client.encode_request(argv, "/some/where")
+    assert client.decode_request(data) == ("/some/where", argv)
+
+
+def test_response_roundtrip():
+    response = client.encode_response(EXIT_ERROR, "⌘B\n", "ksc: oops\n")
+    assert client.decode_response(response) == (EXIT_ERROR, "⌘B\n", "ksc: oops\n")
+
+
+@pytest.mark.parametrize(
+    "cmdline, exit_code",
+    [
+        ("command b", EXIT_SUCCESS),
+        ("-ms -p command shift %", EXIT_SUCCESS),
+        ("-y hyper space", EXIT_SUCCESS),
+        ("control x / control c", EXIT_SUCCESS),
+        ("command //", EXIT_ERROR),
+        ("", EXIT_USAGE),
+        ("-ly", EXIT_SUCCESS),
+    ],
+)
+def test_client_matches_main(server, cmdline, exit_code, capsys):
+    argv = cmdline.split(" ") if cmdline else []
+    expected_code = main(argv, prog="ksc")
+    expected = capsys.readouterr()
+    assert expected_code == exit_code
+
+    assert client.main(argv) == exit_code
+    actual = capsys.readouterr()
+    assert actual.out == expected.out
+    assert actual.err == expected.err
+
+
+def test_client_usage_error(server, capsys):
+    assert client.main(["--bogus"]) == EXIT_USAGE
+    out, err = capsys.readouterr()
+    assert not out
+    assert err.startswith("usage: ksc")
+
+
+def test_client_version(server, capsys):
+    assert client.main(["--version"]) == EXIT_SUCCESS
+    out, _ = capsys.readouterr()
+    assert out
+
+
+@pytest.mark.parametrize(
+    "argv",
+    [
+        ["--serve"],
+        ["serve"],
+        ["serve", "--http", "--port", "0"],
+        ["--profile", "serve", "--http"],
+    ],
+)
+def test_daemon_refuses_serve(server, argv):
+    exit_code, out, err = client.request(argv)
+    assert exit_code == EXIT_USAGE
+    assert not out
+    assert err
+    # the daemon is still answering
+    assert client.request(["command", "b"])[0] == EXIT_SUCCESS
+
+
+@pytest.mark.parametrize(
+    "argv, result",
+    [
+        (["--serve"], True),
+        (["serve", "--http"], True),
+        (["-ms", "serve"], True),
+        (["command", "b"], False),
+        (["rewrite", "doc.md"], False),
+    ],
+)
+def test_starts_server(argv, result):
+    assert client.starts_server(argv) is result
+
+
+def test_client_serve_runs_locally(server, monkeypatch):
+    requests = []
+    monkeypatch.setattr(client, "request", requests.append)
+    local = []
+    monkeypatch.setattr(ksc.__main__, "main", lambda argv, prog: local.append(argv))
+    client.main(["serve", "--http"])
+    assert not requests
+    assert local == [["serve", "--http"]]
+
+
+def test_client_fallback(tmp_path, monkeypatch, capsys):
+    monkeypatch.setenv("KSC_SOCKET", str(tmp_path / "missing.sock"))
+    assert client.main(["-ms", "command", "b"]) == EXIT_SUCCESS
+    out, _ = capsys.readouterr()
+    assert out == "⌘B\n"
+
+
+def test_client_waits_for_slow_commands(server, monkeypatch, capsys):
+    monkeypatch.setattr(client, "TIMEOUT", 0.05)
+
+    def slow_main(argv, prog):
+        time.sleep(0.2)
+        print("done")
+        return EXIT_SUCCESS
+
+    monkeypatch.setattr(daemon, "main", slow_main)
+    local = []
+    monkeypatch.setattr(ksc.__main__, "main", lambda argv, prog: local.append(argv))
+    assert client.main(["rewrite", "-i", "docs"]) == EXIT_SUCCESS
+    out, _ = capsys.readouterr()
+    assert out == "done\n"
+    assert not local
+
+
+def test_client_lost_connection(server, monkeypatch, capsys):
+    def broken_run(argv, cwd=None):
+        raise RuntimeError("broken")
+
+    monkeypatch.setattr(daemon, "run", broken_run)
+    local = []
+    monkeypatch.setattr(ksc.__main__, "main", lambda argv, prog: local.append(argv))
+    assert client.main(["command", "b"]) == EXIT_ERROR
+    _, err = capsys.readouterr()
+    assert "ksc-client: incomplete response from ksc daemon" in err
+    assert not local
+
+
+def test_server_removes_stale_socket(tmp_path):
+    path = tmp_path / "stale.sock"
+    path.write_text("")
+    srv = daemon.Server(str(path))
+    srv.server_close()
+    assert not path.exists()
+
+
+def test_client_relative_paths(server, tmp_path, monkeypatch, capsys):
+    (tmp_path / "shortcuts.txt").write_text("command b\n", encoding="utf-8")
+    monkeypatch.chdir(tmp_path)
+    exit_code, out, err = client.request(["--batch", "-ms", "shortcuts.txt"])
+    assert (exit_code, out, err) == (EXIT_SUCCESS, "⌘B\n", "")
+    assert client.main(["--batch", "shortcuts.txt"]) == EXIT_SUCCESS
+    out, _ = capsys.readouterr()
+    assert out == "Command-B\n"
+
+
+def test_daemon_runs_in_cwd(tmp_path):
+    (tmp_path / "shortcuts.txt").write_text("command b\n", encoding="utf-8")
+    cwd = os.getcwd()
+    exit_code, out, _ = daemon.run(["--batch", "shortcuts.txt"], str(tmp_path))
+    assert (exit_code, out) == (EXIT_SUCCESS, "Command-B\n")
+    assert os.getcwd() == cwd
+
+
+def test_daemon_missing_cwd_runs_locally(tmp_path):
+    exit_code, _, _ = daemon.run(["command", "b"], str(tmp_path / "missing"))
+    assert exit_code == client.RUN_LOCALLY
+
+
+def test_daemon_stdin_runs_locally(server, monkeypatch, capsys):
+    exit_code, out, err = client.request(["--batch"])
+    assert exit_code == client.RUN_LOCALLY
+    monkeypatch.setattr(sys, "stdin", io.StringIO("command b\n"))
+    assert client.main(["--batch", "-ms"]) == EXIT_SUCCESS
+    out, _ = capsys.readouterr()
+    assert out == "⌘B\n"
+
+
+KM_MACROS = """\
+<?xml version="1.0" encoding="UTF-8"?>
+<plist version="1.0">
+<array><dict>
+    <key>Macros</key>
+    <array><dict>
+        <key>Name</key><string>Bold</string>
+        <key>Triggers</key>
+        <array><dict>
+            <key>KeyCode</key><integer>11</integer>
+            <key>MacroTriggerType</key><string>HotKey</string>
+            <key>Modifiers</key><integer>256</integer>
+        </dict></array>
+    </dict></array>
+    <key>Name</key><string>Global</string>
+</dict></array>
+</plist>
+"""
+
+
+def test_daemon_import_km_stdin_runs_locally(server, monkeypatch, capsys):
+    assert daemon.run(["import-km"]) == (client.RUN_LOCALLY, "", "")
+    exit_code, _, _ = client.request(["import-km", "-ms"])
+    assert exit_code == client.RUN_LOCALLY
+    plist = KM_MACROS.encode("utf-8")
+    monkeypatch.setattr(sys, "stdin", io.TextIOWrapper(io.BytesIO(plist)))
+    assert client.main(["import-km", "-ms"]) == EXIT_SUCCESS
+    out, _ = capsys.readouterr()
+    assert out.splitlines() == ["Global", "    ⌘B    Bold"]
@@ -0,0 +1,182 @@
+#
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2021 Jared Crapo
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+# pylint: disable=protected-access, missing-function-docstring
+# pylint: disable=missing-module-docstring, unused-variable
+
+import pytest
+
+import ksc
+from ksc.keyboardmaestro import KEY_CODES, HotKey, hot_key, read_hot_keys
+
+HEADER = """\
+<?xml version="1.0" encoding="UTF-8"?>
+<!DOCTYPE plist PUBLIC "-//Apple//DTD PLIST 1.0//EN" "http://www.apple.com/DTDs/PropertyList-1.0.dtd">
+<plist version="1.0">
+"""
+
+
+def _trigger(key_code, modifiers):
+    return f"""\
+<dict>
+    <key>FireType</key>
+    <string>Pressed</string>
+    <key>KeyCode</key>
+    <integer>{key_code}</integer>
+    <key>MacroTriggerType</key>
+    <string>HotKey</string>
+    <key>Modifiers</key>
+    <integer>{modifiers}</integer>
+</dict>
+"""
+
+
+def _macro(name, *triggers):
+    return f"""\
+<dict>
+    <key>Actions</key>
+    <array><dict><key>Name</key><string>not the macro</string></dict></array>
+    <key>Name</key>
+    <string>{name}</string>
+    <key>Triggers</key>
+    <array>
+        <dict>
+            <key>MacroTriggerType</key>
+            <string>TypedString</string>
+        </dict>
+        {"".join(triggers)}
+    </array>
+</dict>
+"""
+
+
+def _group(name, *macros):
+    return f"""\
+<dict>
+    <key>Macros</key>
+    <array>{"".join(macros)}</array>
+    <key>Name</key>
+    <string>{name}</string>
+</dict>
+"""
+
+
+LIBRARY = (
+    HEADER
+    + "<array>"
+    + _group(
+        "Global",
+        _macro("Palette", _trigger(35, 768)),
+        _macro("Typed only"),
+        _macro("Two keys", _trigger(122, 0), _trigger(126, 4096 | 2048)),
+    )
+    + _group("Finder", _macro("Help", _trigger(114, 256)))
+    + "</array></plist>"
+).encode("utf-8")
+
+
+def _read(chunks):
+    return [
+        (hot.group, hot.macro, hot.combo and str(hot.combo))
+        for hot in read_hot_keys(chunks)
+    ]
+
+
+EXPECTED = [
+    ("Global", "Palette", "Shift-Command-P"),
+    ("Global", "Two keys", "F1"),
+    ("Global", "Two keys", "Control-Option-Up Arrow"),
+    ("Finder", "Help", None),
+]
+
+
+def test_read_hot_keys():
+    assert _read([LIBRARY]) == EXPECTED
+
+
+@pytest.mark.parametrize("size", [1, 5, 100])
+def test_read_hot_keys_chunks(size):
+    chunks = (LIBRARY[i : i + size] for i in range(0, len(LIBRARY), size))
+    assert _read(chunks) == EXPECTED
+
+
+def test_line_numbers():
+    hot_keys = list(read_hot_keys([LIBRARY]))
+    # the line of the <dict> of the trigger, which is the line before FireType
+    fire_type = LIBRARY[: LIBRARY.index(b"<key>FireType")].count(b"\n") + 1
+    assert hot_keys[0].lineno == fire_type - 1
+
+
+def test_macro_without_group():
+    data = (HEADER + "<array>" + _macro("Solo", _trigger(0, 512)) + "</array>").encode()
+    assert list(read_hot_keys([data + b"</plist>"]))[0][:3] == (
+        None,
+        "Solo",
+        ksc.MacOS.parse_shortcut("shift a"),
+    )
+
+
+def test_groups_generated_as_they_end():
+    def chunks():
+        yield LIBRARY[: LIBRARY.index(b"<string>Finder")]
+        raise AssertionError("read too far")
+
+    hot_keys = read_hot_keys(chunks())
+    assert next(hot_keys).macro == "Palette"
+
+
+def test_malformed():
+    with pytest.raises(ValueError, match="line 1: mismatched tag"):
+        list(read_hot_keys([b"<plist><array></plist>"]))
+
+
+@pytest.mark.parametrize(
+    "key_code, modifiers, shortcut",
+    [
+        (0, 0, "A"),
+        (11, 256, "Command-B"),
+        (18, 512, "Shift-1"),
+        (36, 4096, "Control-Return"),
+        (49, 2048, "Option-Space"),
+        (51, 256 | 512 | 2048 | 4096, "Control-Option-Shift-Command-Delete"),
+        (53, 0, "Escape"),
+        (76, 0, "Enter"),
+        (117, 256, "Command-Forward Delete"),
+        (122, 0, "F1"),
+        (67, 256, "Command-*"),
+        (69, 256, "Command-+"),
+        (69, 512, "Shift-+"),
+    ],
+)
+def test_hot_key(key_code, modifiers, shortcut):
+    assert str(hot_key(key_code, modifiers)) == shortcut
+
+
+def test_every_key_code():
+    for key_code in KEY_CODES:
+        assert hot_key(key_code, 0) is not None
+
+
+def test_unknown_key_code():
+    assert hot_key(114, 0) is None
+    assert HotKey._fields == ("group", "macro", "combo", "lineno")
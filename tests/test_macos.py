@@ -24,6 +24,11 @@
 # pylint: disable=protected-access, missing-function-docstring
 # pylint: disable=missing-module-docstring, unused-variable
 
+import copy
+import html
+import pickle
+import re
+
 import pytest
 
 import ksc
@@ -76,6 +81,14 @@ from ksc.__main__ import (
         ("option rightclick", "Option-right click"),
         ("hyper 5", "Control-Option-Shift-Command-5"),
         ("command dq", 'Shift-Command-"'),
+        ("option-shift--", "Option-Shift-_"),
+        ("FUNCTION f1", "Fn-F1"),
+        ("@command", "Shift-Command-2"),
+        ("⌘@", "Shift-Command-2"),
+        ("cmd\tq", "Command-Q"),
+        ("\tcontrol x ", "Control-X"),
+        ("Command-Shift-Hyper-T", "Control-Option-Shift-Command-T"),
+        ("page up", "Page Up"),
     ],
 )
 def test_mac_parse(inp, parsed):
@@ -93,6 +106,8 @@ def test_mac_parse(inp, parsed):
         "command - shift 5",
         "control ^F",
         "^$~",
+        "fnord",
+        "command\tx\tq",
     ],
 )
 def test_mac_parse_error(inp):
@@ -132,6 +147,17 @@ def test_mac_parse_multiple(inp, count):
         ("-ma globe T", "Globe-T"),
         ("-ms -p globe n", "Globe+N"),
         ("-ma -p globe T", "Globe+T"),
+        ("-o html @b", "<kbd><kbd>Command</kbd>-<kbd>B</kbd></kbd>"),
+        (
+            "-o html -ms $@5",
+            "<kbd><kbd>&#8679;</kbd><kbd>&#8984;</kbd><kbd>5</kbd></kbd>",
+        ),
+        ("-o html -ms -k ^left", "<kbd><kbd>&#8963;</kbd><kbd>&larr;</kbd></kbd>"),
+        (
+            "-o html option <",
+            "<kbd><kbd>Option</kbd>-<kbd>Shift</kbd>-<kbd>&lt;</kbd></kbd>",
+        ),
+        ("-o html -y hyper 5", "<kbd><kbd>Hyper</kbd>-<kbd>5</kbd></kbd>"),
     ],
 )
 def test_mac_render(cmdline, result, capsys):
@@ -160,7 +186,292 @@ def test_mac_list_hyper(capsys):
     assert exit_code == EXIT_SUCCESS
 
 
+def test_mac_list_plain(capsys):
+    exit_code = main(["-l", "--plain"])
+    out, _ = capsys.readouterr()
+    lines = out.splitlines()
+    assert "\u2318\tCommand\tcommand,cmd,clover" in lines
+    assert "\tGlobe\tglobe" in lines
+    assert not any(ksc.MacOS.hyper_name in line for line in lines)
+    assert all(line.count("\t") == 2 for line in lines)
+    assert exit_code == EXIT_SUCCESS
+
+
+def test_mac_list_plain_hyper(capsys):
+    exit_code = main(["-ly", "--plain"])
+    out, _ = capsys.readouterr()
+    assert "\tHyper\thyper" in out.splitlines()
+    assert exit_code == EXIT_SUCCESS
+
+
+def test_plain_requires_list(capsys):
+    with pytest.raises(SystemExit) as exc:
+        main(["--plain", "command", "b"])
+    out, err = capsys.readouterr()
+    assert not out
+    assert "--plain requires --list" in err
+    assert exc.value.code == 2
+
+
+def test_named_key_rows_cached():
+    rows = ksc.MacOS.named_key_rows()
+    assert ksc.MacOS.named_key_rows() is rows
+    hyper_rows = ksc.MacOS.named_key_rows(True)
+    assert len(hyper_rows) == len(rows) + 1
+    assert ksc.MacOS.named_keys().row_count == len(rows)
+
+
 def test_keyboard_shortcut_dunders():
     combo = ksc.MacOS.parse_shortcut("opt command v")
     assert repr(combo) == "MacOSKeyboardShortcut('Option-Command-V')"
     assert str(combo) == "Option-Command-V"
+
+
+def test_key_indexes():
+    for key in ksc.MacOS.keys:
+        if key.key is not None:
+            assert ksc.MacOS.key_map[key.key] is key
+    assert ksc.MacOS.mask_mods[ksc.MacOS.hyper_mask] == ksc.MacOS.hyper_mods
+    bits = [ksc.MacOS.mod_bits[mod] for mod in ksc.MacOS.modifiers]
+    assert bits == sorted(bits)
+
+
+def test_hyper_mods():
+    combo = ksc.MacOS.parse_shortcut("hyper t")
+    assert combo.mods == ksc.MacOS.hyper_mods
+    assert combo.is_hyper
+    assert ksc.MacOS.parse_shortcut("control option command t").mods != (
+        ksc.MacOS.hyper_mods
+    )
+
+
+def test_keyboard_shortcut_value():
+    first = ksc.MacOS.parse_shortcut("command shift p")
+    second = ksc.MacOS.parse_shortcut("⇧⌘P")
+    third = ksc.MacOSKeyboardShortcut(list(first.mods), "P")
+    # parsing interns the shortcut
+    assert first is second
+    assert first == third
+    assert first is not third
+    assert hash(first) == hash(third)
+    assert len({first, second, third}) == 1
+    assert first != ksc.MacOS.parse_shortcut("command p")
+    assert first != "Shift-Command-P"
+
+
+def test_keyboard_shortcut_immutable():
+    combo = ksc.MacOS.parse_shortcut("command p")
+    with pytest.raises(AttributeError):
+        combo.key = "Q"
+    with pytest.raises(AttributeError):
+        del combo.key
+    with pytest.raises(AttributeError):
+        combo.other = 1
+    assert copy.copy(combo) is combo
+    assert copy.deepcopy(combo) is combo
+    assert pickle.loads(pickle.dumps(combo)) == combo
+
+
+def test_keyboard_shortcut_ordering():
+    inputs = ["command a", "shift command a", "a", "control z", "fn f1", "command b"]
+    combos = sorted(ksc.MacOS.parse_shortcut(inp) for inp in inputs)
+    assert [str(combo) for combo in combos] == [
+        "A",
+        "Fn-F1",
+        "Control-Z",
+        "Shift-Command-A",
+        "Command-A",
+        "Command-B",
+    ]
+    assert combos[0] < combos[1] <= combos[1]
+    with pytest.raises(TypeError):
+        _ = combos[0] < "A"
+
+
+def test_modifier_mask():
+    combo = ksc.MacOS.parse_shortcut("command shift control shift h")
+    bits = ksc.MacOS.mod_bits
+    control, shift, command = (
+        ksc.MacOS.keyname_map[name] for name in ("control", "shift", "command")
+    )
+    assert combo.modmask == bits[control] | bits[shift] | bits[command]
+    assert combo.mods == (control, shift, command)
+    assert combo.has_shift
+    assert not combo.is_hyper
+    assert ksc.MacOS.parse_shortcut("hyper h").is_hyper
+    assert not ksc.MacOS.parse_shortcut("h").has_shift
+    assert ksc.MacOS.mods_mask([command, shift, control]) == combo.modmask
+    # mods can be given in any order, or as a mask
+    assert ksc.MacOSKeyboardShortcut([command, shift, control], "H") == combo
+    assert ksc.MacOSKeyboardShortcut(combo.modmask, "H") == combo
+    assert ksc.MacOSKeyboardShortcut.intern(combo.modmask, "H") is combo
+
+
+def test_modifier_copies():
+    combo = ksc.MacOS.parse_shortcut("command shift b")
+    copies = copy.deepcopy(list(combo.mods))
+    assert ksc.MacOSKeyboardShortcut(copies, "B") == combo
+    unpickled = pickle.loads(pickle.dumps(list(combo.mods)))
+    assert ksc.MacOS.mods_mask(unpickled) == combo.modmask
+    built = ksc.MacOSKey("⌘", "Command", ["command"], modifier=True)
+    assert ksc.MacOS.mods_mask([built]) == ksc.MacOS.mod_words["command"]
+
+
+@pytest.mark.parametrize(
+    "mod",
+    [
+        ksc.MacOS.keyname_map["space"],
+        ksc.MacOSKey("⌘", "Command", ["command"]),
+        ksc.MacOSKey("✦", "Sparkle", ["sparkle"], modifier=True),
+        "command",
+        None,
+        [],
+    ],
+)
+def test_modifier_mask_not_modifier(mod):
+    with pytest.raises(ValueError, match="not a modifier key"):
+        ksc.MacOS.mods_mask([mod])
+
+
+@pytest.mark.parametrize(
+    "options, inp, result",
+    [
+        ({}, "$@5", "Shift-Command-5"),
+        ({"modifier_symbols": True, "plus_sign": True}, "$@5", "⇧+⌘+5"),
+        ({"hyper": True}, "^~$@R", "Hyper-R"),
+        ({"modifier_ascii": True}, "hyper 5", "^~$@5"),
+        ({"modifier_symbols": True, "key_symbols": True}, "command esc", "⌘⎋"),
+        ({"key_symbols": True}, "command f12", "Command-F-1-2"),
+        ({"clarify_keys": True}, "@.", "Command-Period (.)"),
+        ({"modifier_symbols": True, "plus_sign": True}, "globe n", "Globe+N"),
+        ({"modifier_ascii": True}, "globe command t", "@-Globe-T"),
+    ],
+)
+def test_render_options(options, inp, result):
+    combo = ksc.MacOS.parse_shortcut(inp)
+    compiled = ksc.RenderOptions.compile(**options)
+    assert compiled.render(combo) == result
+    assert ksc.RenderOptions(**options).render(combo) == result
+    assert combo.render(**options) == result
+
+
+def test_render_options_compile():
+    first = ksc.RenderOptions.compile(hyper=True, list=False, shortcuts=[])
+    second = ksc.RenderOptions.compile(hyper=1)
+    assert first is second
+    assert first.values == (True, False, False, False, False, False, False, "mac")
+    assert repr(first) == "RenderOptions(hyper=True)"
+    assert ksc.RenderOptions.compile() is not first
+
+
+def test_render_options_unknown_key():
+    compiled = ksc.RenderOptions.compile(modifier_symbols=True, key_symbols=True)
+    combo = ksc.MacOSKeyboardShortcut([ksc.MacOS.keyname_map["command"]], "XY")
+    assert compiled.render(combo) == "⌘XY"
+
+
+def test_render_options_html_output():
+    assert ksc.RenderOptions.compile(output="html") is ksc.RenderOptions.compile(
+        html=True
+    )
+    assert not ksc.RenderOptions.compile(output="txt").html
+
+
+def test_html_entities():
+    for key in ksc.MacOS.keys:
+        if key.html_entity:
+            assert html.unescape(key.html_entity) == key.key
+
+
+@pytest.mark.parametrize("values", range(1 << 6))
+def test_render_html_matches_text(values):
+    # the text of the HTML is exactly the text output
+    options = {
+        option: bool(values & 1 << bit)
+        for bit, option in enumerate(ksc.RenderOptions.OPTIONS[:6])
+    }
+    text = ksc.RenderOptions.compile(**options)
+    markup = ksc.RenderOptions.compile(html=True, **options)
+    for inp in [
+        "hyper 5",
+        "globe command f12",
+        "option <",
+        'shift command "',
+        "ctrl é",
+    ]:
+        combo = ksc.MacOS.parse_shortcut(inp)
+        rendered = markup.render(combo)
+        assert rendered.startswith("<kbd><kbd>")
+        assert rendered.endswith("</kbd></kbd>")
+        assert html.unescape(re.sub("<[^>]*>", "", rendered)) == text.render(combo)
+
+
+def test_render_html_unknown_key():
+    compiled = ksc.RenderOptions.compile(html=True)
+    combo = ksc.MacOSKeyboardShortcut([ksc.MacOS.keyname_map["command"]], "<é>")
+    assert (
+        compiled.render(combo) == "<kbd><kbd>Command</kbd>-<kbd>&lt;é&gt;</kbd></kbd>"
+    )
+
+
+def test_parse_many():
+    texts = ["command b", "fred", "shift command %", "command b", "fred"]
+    combos = list(ksc.MacOS.parse_many(iter(texts), "skip"))
+    assert combos == [
+        ksc.MacOS.parse_shortcut("command b"),
+        ksc.MacOS.parse_shortcut("shift command 5"),
+        ksc.MacOS.parse_shortcut("command b"),
+    ]
+    results = list(ksc.MacOS.parse_many(texts, errors="collect"))
+    assert results[1] == ksc.ParseFailure(1, "fred", "error parsing 'fred'")
+    assert results[4] == ksc.ParseFailure(4, "fred", "error parsing 'fred'")
+    assert results[3] is results[0]
+
+
+def test_parse_many_raise():
+    results = ksc.MacOS.parse_many(["command b", "fred", "command c"])
+    assert next(results) == ksc.MacOS.parse_shortcut("command b")
+    with pytest.raises(ValueError, match="error parsing 'fred'"):
+        next(results)
+
+
+def test_parse_many_memo(monkeypatch):
+    # results are still correct once the memo is full
+    monkeypatch.setattr(ksc.MacOS, "parse_many_memo", 1)
+    texts = ["command b", "command c", "fred", "command c", "fred"]
+    results = list(ksc.MacOS.parse_many(texts, "collect"))
+    assert [str(result) for result in results[:2]] == ["Command-B", "Command-C"]
+    assert results[3] == results[1]
+    assert results[4].index == 4
+
+
+def test_parse_many_sequences():
+    texts = ["control x / control c", "control x / fred"]
+    results = list(ksc.MacOS.parse_many(texts, "collect", sequences=True))
+    assert results[0] == ksc.MacOS.parse_shortcuts(texts[0])
+    assert results[1] == ksc.ParseFailure(1, texts[1], "error parsing 'fred'")
+
+
+def test_parse_many_sequences_repeated():
+    texts = ["control x / control c"] * 3
+    results = ksc.MacOS.parse_many(texts, sequences=True)
+    first = next(results)
+    first.append(ksc.MacOS.parse_shortcut("command b"))
+    expected = ksc.MacOS.parse_shortcuts(texts[0])
+    assert list(results) == [expected, expected]
+
+
+def test_parse_many_bad_errors():
+    with pytest.raises(ValueError):
+        list(ksc.MacOS.parse_many(["command b"], errors="ignore"))
+
+
+def test_render_many():
+    texts = ["command b", "control x / control c", "fred"]
+    results = ksc.MacOS.parse_many(texts, "collect", sequences=True)
+    options = ksc.RenderOptions.compile(modifier_symbols=True)
+    rendered = list(ksc.MacOS.render_many(results, options))
+    assert rendered[:2] == ["⌘B", "⌃X ⌃C"]
+    assert rendered[2].text == "fred"
+    combos = ksc.MacOS.parse_many(["command b"])
+    assert list(ksc.MacOS.render_many(combos)) == ["Command-B"]
@@ -24,12 +24,31 @@
 # pylint: disable=protected-access, missing-function-docstring
 # pylint: disable=missing-module-docstring, unused-variable
 
+import io
+import json
+import pstats
+import subprocess
+import sys
+
+import pytest
+
+import ksc
 from ksc.__main__ import (
     main,
     EXIT_ERROR,
+    EXIT_SUCCESS,
     EXIT_USAGE,
 )
 
+# microseconds it can take to import ksc when parsing and rendering a shortcut,
+# it takes 10-20ms on a typical machine, so this is generous to avoid false
+# failures, but still fails if something like rich or importlib.metadata sneaks
+# back onto the hot path
+IMPORT_BUDGET = 50000
+
+# modules that are too slow to import on the hot path
+SLOW_MODULES = ["rich", "importlib.metadata", "ksc.platforms", "ksc.profiling"]
+
 
 def test_mac_list(capsys):
     argv = []
@@ -47,3 +66,482 @@ def test_mac_parse_err(capsys):
     assert err
     assert not out
     assert exit_code == EXIT_ERROR
+
+
+def test_mac_version(capsys):
+    argv = ["--version"]
+    with pytest.raises(SystemExit) as exc:
+        main(argv)
+    assert exc.value.code == EXIT_SUCCESS
+    out, _ = capsys.readouterr()
+    assert out == f"{ksc.__version__}\n"
+
+
+def _importtime_lines(*args, code=None):
+    """run ksc, or some python code, with -X importtime and generate
+    (module, cumulative microseconds, nested) for each import"""
+    command = ["-c", code] if code else ["-m", "ksc", *args]
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", *command],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, module = line.split("|")
+        if cumulative.strip().isdigit():
+            nested = module.startswith("  ")
+            yield module.strip(), int(cumulative), nested
+
+
+def _importtime(*args, code=None):
+    """run ksc, or some python code, with -X importtime and return
+    {module: cumulative microseconds}"""
+    return {
+        module: cumulative
+        for module, cumulative, _ in _importtime_lines(*args, code=code)
+    }
+
+
+def _ksc_importtime(*args):
+    """run ksc with -X importtime and return the microseconds it took to import
+    the package and all its modules"""
+    return sum(
+        cumulative
+        for module, cumulative, nested in _importtime_lines(*args)
+        if not nested and (module == "ksc" or module.startswith("ksc."))
+    )
+
+
+def test_import_budget():
+    times = _importtime("command", "b")
+    for module in SLOW_MODULES:
+        assert module not in times
+    assert "ksc.macos" in times
+    assert _ksc_importtime("command", "b") < IMPORT_BUDGET
+
+
+def test_import_client():
+    times = _importtime(code="import ksc.client")
+    assert "ksc.client" in times
+    for module in [*SLOW_MODULES, "ksc.macos", "ksc.__main__", "socket"]:
+        assert module not in times
+
+
+def test_import_list_uses_rich():
+    times = _importtime("-l")
+    assert "rich" in times
+
+
+def test_import_list_plain():
+    times = _importtime("-l", "--plain")
+    assert "rich" not in times
+
+
+def test_batch_files(tmp_path, capsys):
+    first = tmp_path / "first.txt"
+    first.write_text("command b\n\n$@5\n", encoding="utf-8")
+    second = tmp_path / "second.txt"
+    second.write_text("control x / control c\n", encoding="utf-8")
+    exit_code = main(["--batch", str(first), str(second)])
+    out, err = capsys.readouterr()
+    assert out == "Command-B\n\nShift-Command-5\nControl-X Control-C\n"
+    assert not err
+    assert exit_code == EXIT_SUCCESS
+
+
+def test_batch_stdin(monkeypatch, capsys):
+    monkeypatch.setattr(sys, "stdin", io.StringIO("command b\nhyper t\n"))
+    exit_code = main(["-b", "-ms", "-p", "-y"])
+    out, _ = capsys.readouterr()
+    assert out == "⌘+B\n⌃+⌥+⇧+⌘+T\n"
+    assert exit_code == EXIT_SUCCESS
+
+
+def test_batch_errors(tmp_path, capsys):
+    fname = tmp_path / "shortcuts.txt"
+    fname.write_text("command b\nfred\ncommand c\nQ99\n", encoding="utf-8")
+    exit_code = main(["--batch", str(fname)])
+    out, err = capsys.readouterr()
+    # output lines up with the input, errors make blank lines
+    assert out == "Command-B\n\nCommand-C\n\n"
+    assert f"{fname}:2: error parsing 'fred'" in err
+    assert f"{fname}:4: error parsing 'Q99'" in err
+    assert "2 errors in 4 lines" in err
+    assert exit_code == EXIT_ERROR
+
+
+def test_batch_missing_file(tmp_path, capsys):
+    exit_code = main(["--batch", str(tmp_path / "nope.txt")])
+    out, err = capsys.readouterr()
+    assert not out
+    assert err
+    assert exit_code == EXIT_ERROR
+
+
+def test_output_json(capsys):
+    exit_code = main(["-o", "json", "-ms", "control", "x", "/", "control", "c"])
+    out, _ = capsys.readouterr()
+    records = json.loads(out)
+    assert [record["input"] for record in records] == ["control x", "control c"]
+    assert records[0]["mods"] == ["Control"]
+    assert records[0]["key"] == "X"
+    assert records[0]["rendered"]["text"] == "⌃X"
+    assert records[0]["rendered"]["names"] == "Control-X"
+    assert exit_code == EXIT_SUCCESS
+
+
+def test_output_ndjson(capsys):
+    exit_code = main(["-o", "ndjson", "command", "b"])
+    out, _ = capsys.readouterr()
+    assert out.count("\n") == 1
+    assert json.loads(out)["rendered"]["symbols"] == "⌘B"
+    assert exit_code == EXIT_SUCCESS
+
+
+@pytest.mark.parametrize("output", ["json", "ndjson"])
+def test_batch_records(tmp_path, capsys, output):
+    fname = tmp_path / "shortcuts.txt"
+    fname.write_text("command b / shift ]\n\nfred\noption left\n", encoding="utf-8")
+    exit_code = main(["--batch", "-o", output, str(fname)])
+    out, err = capsys.readouterr()
+    if output == "json":
+        records = json.loads(out)
+    else:
+        records = [json.loads(line) for line in out.splitlines()]
+    assert [(record["line"], record["input"]) for record in records] == [
+        (1, "command b"),
+        (1, "shift ]"),
+        (4, "option left"),
+    ]
+    assert records[2]["file"] == str(fname)
+    assert records[2]["key_name"] == "Left Arrow"
+    assert f"{fname}:3: error parsing 'fred'" in err
+    assert exit_code == EXIT_ERROR
+
+
+def test_batch_json_empty(monkeypatch, capsys):
+    monkeypatch.setattr(sys, "stdin", io.StringIO(""))
+    exit_code = main(["-b", "-o", "json"])
+    out, _ = capsys.readouterr()
+    assert json.loads(out) == []
+    assert exit_code == EXIT_SUCCESS
+
+
+def test_import_style_uses_platforms():
+    times = _importtime("-s", "win", "command", "b")
+    assert "ksc.platforms" in times
+
+
+@pytest.mark.parametrize(
+    "argv",
+    [
+        ["--profile", "command", "b"],
+        ["command", "b", "--profile"],
+        ["command", "--profile-stats", "{stats}", "b"],
+        ["--profile-stats={stats}", "command", "b"],
+    ],
+)
+def test_profile(tmp_path, capsys, argv):
+    stats = tmp_path / "ksc.pstats"
+    argv = [arg.format(stats=stats) for arg in argv]
+    exit_code = main(argv)
+    out, err = capsys.readouterr()
+    assert out == "Command-B\n"
+    assert exit_code == EXIT_SUCCESS
+    # the import phase is only reported the first time main() runs in a process
+    phases = [line.split()[0] for line in err.splitlines()[1:]]
+    phases = [phase for phase in phases if phase != "import"]
+    assert phases == ["arguments", "parse", "render", "output", "total"]
+    if "--profile" not in argv:
+        assert pstats.Stats(str(stats)).total_calls > 0
+
+
+def test_profile_environment(monkeypatch, capsys):
+    monkeypatch.setenv("KSC_PROFILE", "1")
+    exit_code = main(["-o", "json", "command", "b"])
+    out, err = capsys.readouterr()
+    assert json.loads(out)[0]["key"] == "B"
+    assert "render and output" in err
+    assert exit_code == EXIT_SUCCESS
+
+
+def test_profile_environment_off(monkeypatch, capsys):
+    monkeypatch.setenv("KSC_PROFILE", "0")
+    main(["command", "b"])
+    _, err = capsys.readouterr()
+    assert err == ""
+
+
+def test_profile_command(monkeypatch, capsys):
+    monkeypatch.setattr(sys, "stdin", io.StringIO("kbd:[command b]"))
+    exit_code = main(["rewrite", "--profile"])
+    out, err = capsys.readouterr()
+    assert out == "kbd:[command b]"
+    assert "  rewrite " in err
+    assert exit_code == EXIT_SUCCESS
+
+
+def test_profile_after_double_dash(capsys):
+    exit_code = main(["--", "--profile"])
+    _, err = capsys.readouterr()
+    assert "error parsing '--profile'" in err
+    assert "profile\n" not in err
+    assert exit_code == EXIT_ERROR
+
+
+def test_profile_import_first_call_only():
+    result = subprocess.run(
+        [sys.executable, "-m", "ksc", "--profile", "command", "b"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert result.stdout == "Command-B\n"
+    assert "  import " in result.stderr
+
+
+@pytest.mark.parametrize(
+    "argv, expected",
+    [
+        (["serve", "--http"], ("http", "127.0.0.1", 8000)),
+        (["serve", "--http", "--host", "::1", "--port", "9000"], ("http", "::1", 9000)),
+        (["serve"], ("daemon",)),
+    ],
+)
+def test_serve(monkeypatch, argv, expected):
+    # pylint: disable=import-outside-toplevel
+    from ksc import daemon, service
+
+    calls = []
+    monkeypatch.setattr(
+        service, "serve", lambda host, port, prog: calls.append(("http", host, port))
+    )
+    monkeypatch.setattr(daemon, "serve", lambda: calls.append(("daemon",)))
+    main(argv)
+    assert calls == [expected]
+
+
+@pytest.mark.parametrize("argv", [["--alfred", "cmd", "b"], ["-o", "alfred", "cmd b"]])
+def test_alfred(capsys, argv):
+    exit_code = main(argv)
+    out, err = capsys.readouterr()
+    items = json.loads(out)["items"]
+    assert items[0]["title"] == "Command-B"
+    assert not err
+    assert exit_code == EXIT_SUCCESS
+
+
+def test_alfred_error(capsys):
+    exit_code = main(["--alfred", "fred"])
+    out, _ = capsys.readouterr()
+    assert json.loads(out)["items"][0]["valid"] is False
+    # alfred shows the error as an item, it isn't a failure
+    assert exit_code == EXIT_SUCCESS
+
+
+def test_alfred_batch(capsys):
+    with pytest.raises(SystemExit):
+        main(["--alfred", "--batch"])
+    _, err = capsys.readouterr()
+    assert "can't be used with --batch" in err
+
+
+def test_import_alfred_budget():
+    times = _importtime("--alfred", "command", "b")
+    for module in SLOW_MODULES:
+        assert module not in times
+    assert _ksc_importtime("--alfred", "command", "b") < IMPORT_BUDGET
+
+
+@pytest.mark.parametrize(
+    "argv, names",
+    [
+        (["--complete", "pa"], ["pagedown", "pageup"]),
+        (["--complete", "command", "pgu"], ["pgup"]),
+        (["--complete", "command pgdn"], ["pgdown", "pagedown"]),
+        (["--complete", "zzz"], []),
+    ],
+)
+def test_complete(capsys, argv, names):
+    exit_code = main(argv)
+    out, _ = capsys.readouterr()
+    assert out.splitlines() == names
+    assert exit_code == EXIT_SUCCESS
+
+
+@pytest.mark.parametrize("argv", [["--complete"], ["--complete", "command "]])
+def test_complete_new_word(capsys, argv):
+    main(argv)
+    out, _ = capsys.readouterr()
+    assert len(out.splitlines()) == len(ksc.MacOS.keyname_map) + 1
+
+
+@pytest.mark.parametrize("shell", ["bash", "zsh"])
+def test_shell_completion(capsys, shell):
+    exit_code = main(["--shell-completion", shell], prog="ksc")
+    out, _ = capsys.readouterr()
+    assert "ksc --complete" in out
+    assert "--modifier-symbols" in out
+    assert exit_code == EXIT_SUCCESS
+
+
+def test_import_complete_budget():
+    times = _importtime("--complete", "pa")
+    for module in SLOW_MODULES:
+        assert module not in times
+
+
+def test_audit(tmp_path, capsys):
+    keymap = tmp_path / "keymap.tsv"
+    keymap.write_text(
+        "cmd-shift-p\tPalette\n⇧⌘P\tOpen\ncmd b\tBold\n⌘B\tBold\nfred\tx\n",
+        encoding="utf-8",
+    )
+    exit_code = main(["audit", "-ms", str(keymap)])
+    out, err = capsys.readouterr()
+    assert out.splitlines() == [
+        "⇧⌘P: conflict",
+        f"  {keymap}:1: cmd-shift-p -> Palette",
+        f"  {keymap}:2: ⇧⌘P -> Open",
+        "⌘B: duplicate",
+        f"  {keymap}:3: cmd b -> Bold",
+        f"  {keymap}:4: ⌘B -> Bold",
+        "1 conflicts and 1 duplicates in 4 bindings",
+    ]
+    assert f"{keymap}:5: error parsing 'fred'" in err
+    assert exit_code == EXIT_ERROR
+
+
+def test_audit_stdin(monkeypatch, capsys):
+    monkeypatch.setattr(sys, "stdin", io.StringIO("cmd b,Bold\nshift cmd b,Big\n"))
+    exit_code = main(["audit", "-d", ","])
+    out, err = capsys.readouterr()
+    assert out == "0 conflicts and 0 duplicates in 2 bindings\n"
+    assert not err
+    assert exit_code == EXIT_SUCCESS
+
+
+def test_audit_missing_file(tmp_path, capsys):
+    exit_code = main(["audit", str(tmp_path / "nope.tsv")])
+    _, err = capsys.readouterr()
+    assert "No such file" in err
+    assert exit_code == EXIT_ERROR
+
+
+def test_import_cocoa(tmp_path, capsys):
+    bindings = tmp_path / "DefaultKeyBinding.dict"
+    bindings.write_text(
+        '{\n"^f" = moveWordForward:;\n"\\UF746" = help:;\n'
+        '"^x" = { "@s" = (save:, close:); };\n}\n',
+        encoding="utf-8",
+    )
+    exit_code = main(["import-cocoa", "-ms", str(bindings)])
+    out, err = capsys.readouterr()
+    assert out == "⌃F\tmoveWordForward:\n⌃X ⌘S\tsave:, close:\n"
+    assert f"{bindings}:3: unknown key" in err
+    assert exit_code == EXIT_ERROR
+
+
+def test_import_cocoa_stdin(monkeypatch, capsys):
+    monkeypatch.setattr(sys, "stdin", io.StringIO('{ "@b" = bold:; }'))
+    exit_code = main(["import-cocoa"])
+    out, _ = capsys.readouterr()
+    assert out == "Command-B\tbold:\n"
+    assert exit_code == EXIT_SUCCESS
+
+
+def test_import_cocoa_malformed(tmp_path, capsys):
+    bindings = tmp_path / "bad.dict"
+    bindings.write_text('{ "@b" = bold:; "@c" }', encoding="utf-8")
+    exit_code = main(["import-cocoa", str(bindings), str(tmp_path / "nope.dict")])
+    out, err = capsys.readouterr()
+    assert out == "Command-B\tbold:\n"
+    assert f"{bindings}: line 1: expected '='" in err
+    assert "No such file" in err
+    assert exit_code == EXIT_ERROR
+
+
+KM_MACROS = """\
+<?xml version="1.0" encoding="UTF-8"?>
+<plist version="1.0">
+<array><dict>
+    <key>Macros</key>
+    <array>
+        <dict>
+            <key>Name</key><string>Palette</string>
+            <key>Triggers</key>
+            <array><dict>
+                <key>KeyCode</key><integer>35</integer>
+                <key>MacroTriggerType</key><string>HotKey</string>
+                <key>Modifiers</key><integer>768</integer>
+            </dict></array>
+        </dict>
+        <dict>
+            <key>Name</key><string>Help</string>
+            <key>Triggers</key>
+            <array><dict>
+                <key>KeyCode</key><integer>114</integer>
+                <key>MacroTriggerType</key><string>HotKey</string>
+                <key>Modifiers</key><integer>256</integer>
+            </dict></array>
+        </dict>
+        <dict>
+            <key>Name</key><string>Bold</string>
+            <key>Triggers</key>
+            <array><dict>
+                <key>KeyCode</key><integer>11</integer>
+                <key>MacroTriggerType</key><string>HotKey</string>
+                <key>Modifiers</key><integer>256</integer>
+            </dict></array>
+        </dict>
+    </array>
+    <key>Name</key><string>Global</string>
+</dict></array>
+</plist>
+"""
+
+
+def test_import_km(tmp_path, capsys):
+    macros = tmp_path / "Global.kmmacros"
+    macros.write_text(KM_MACROS, encoding="utf-8")
+    exit_code = main(["import-km", "-ms", str(macros)])
+    out, err = capsys.readouterr()
+    assert out.splitlines() == [
+        "Global",
+        "    ⇧⌘P    Palette",
+        "    ⌘B     Bold",
+    ]
+    assert f"{macros}:18: unknown key" in err
+    assert exit_code == EXIT_ERROR
+
+
+@pytest.mark.parametrize("output", ["json", "ndjson"])
+def test_import_km_records(tmp_path, capsys, output):
+    macros = tmp_path / "Global.kmmacros"
+    macros.write_text(KM_MACROS.replace("114", "122"), encoding="utf-8")
+    exit_code = main(["import-km", "-o", output, str(macros)])
+    out, _ = capsys.readouterr()
+    if output == "json":
+        records = json.loads(out)
+    else:
+        records = [json.loads(line) for line in out.splitlines()]
+    assert [(record["macro"], record["rendered"]["text"]) for record in records] == [
+        ("Palette", "Shift-Command-P"),
+        ("Help", "Command-F1"),
+        ("Bold", "Command-B"),
+    ]
+    assert records[0]["group"] == "Global"
+    assert records[0]["file"] == str(macros)
+    assert exit_code == EXIT_SUCCESS
+
+
+def test_import_km_malformed(tmp_path, capsys):
+    macros = tmp_path / "bad.kmmacros"
+    macros.write_text("<plist><array></plist>", encoding="utf-8")
+    exit_code = main(["import-km", str(macros)])
+    _, err = capsys.readouterr()
+    assert f"{macros}: line 1: mismatched tag" in err
+    assert exit_code == EXIT_ERROR
@@ -0,0 +1,160 @@
+#
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2021 Jared Crapo
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+# pylint: disable=protected-access, missing-function-docstring
+# pylint: disable=missing-module-docstring, unused-variable
+
+import pytest
+
+import ksc
+from ksc.metrics import BUCKETS, Histogram, error_category
+
+
+@pytest.fixture
+def metrics():
+    metrics = ksc.Metrics()
+    metrics.enable()
+    yield metrics
+    metrics.disable()
+
+
+def test_disabled_by_default():
+    assert ksc.MacOS.metrics is None
+    metrics = ksc.Metrics()
+    ksc.MacOS.parse_shortcut("command b").render()
+    assert metrics.snapshot()["parses"] == 0
+    assert not metrics.enabled
+
+
+def test_parse_and_render(metrics):
+    combo = ksc.MacOS.parse_shortcut("command b")
+    assert combo.render(modifier_symbols=True) == "⌘B"
+    assert str(combo) == "Command-B"
+    snapshot = metrics.snapshot()
+    assert snapshot["parses"] == 1
+    assert snapshot["renders"] == 2
+    assert snapshot["parse_errors"] == {}
+    assert snapshot["parse_latency"]["count"] == 1
+    assert snapshot["render_latency"]["count"] == 2
+    assert sum(snapshot["render_latency"]["buckets"].values()) == 2
+    assert snapshot["render_latency"]["sum"] > 0
+
+
+def test_parse_shortcuts_counts_each_shortcut(metrics):
+    ksc.MacOS.parse_shortcuts("control x / control c")
+    assert metrics.snapshot()["parses"] == 2
+
+
+def test_parse_errors(metrics):
+    for text in ["fred", "command shift", " ", "command fred"]:
+        with pytest.raises(ValueError, match=f"error parsing '{text}'"):
+            ksc.MacOS.parse_shortcut(text)
+    snapshot = metrics.snapshot()
+    assert snapshot["parses"] == 4
+    assert snapshot["parse_errors"] == {
+        "unknown key": 2,
+        "missing key": 1,
+        "empty": 1,
+    }
+
+
+def test_cache_hits_and_misses(metrics):
+    cache = ksc.ShortcutCache()
+    combo = cache.parse_shortcut("command b")
+    cache.parse_shortcut("command b")
+    cache.render(combo)
+    cache.render(combo)
+    cache.render(combo, hyper=True)
+    snapshot = metrics.snapshot()
+    assert snapshot["cache_hits"] == 2
+    assert snapshot["cache_misses"] == 3
+    # only the miss had to parse
+    assert snapshot["parses"] == 1
+
+
+def test_disable_keeps_metrics(metrics):
+    ksc.MacOS.parse_shortcut("command b")
+    metrics.disable()
+    ksc.MacOS.parse_shortcut("command b")
+    assert not metrics.enabled
+    assert ksc.MacOS.metrics is None
+    assert metrics.snapshot()["parses"] == 1
+
+
+def test_enable_replaces(metrics):
+    other = ksc.Metrics()
+    other.enable()
+    ksc.MacOS.parse_shortcut("command b")
+    # disabling the one which isn't enabled doesn't disable the other
+    metrics.disable()
+    assert other.enabled
+    other.disable()
+    assert metrics.snapshot()["parses"] == 0
+    assert other.snapshot()["parses"] == 1
+
+
+def test_reset(metrics):
+    ksc.MacOS.parse_shortcut("command b")
+    metrics.reset()
+    snapshot = metrics.snapshot()
+    assert snapshot["parses"] == 0
+    assert snapshot["parse_latency"]["count"] == 0
+
+
+@pytest.mark.parametrize(
+    "value, bucket",
+    [
+        (0, 0.000001),
+        (0.000001, 0.000001),
+        (0.000003, 0.000005),
+        (0.001, 0.001),
+        (1.5, float("inf")),
+    ],
+)
+def test_histogram(value, bucket):
+    histogram = Histogram()
+    histogram.observe(value)
+    snapshot = histogram.snapshot()
+    assert snapshot["count"] == 1
+    assert snapshot["sum"] == value
+    assert list(snapshot["buckets"]) == list(BUCKETS)
+    assert snapshot["buckets"][bucket] == 1
+
+
+@pytest.mark.parametrize(
+    "text, category",
+    [
+        ("", "empty"),
+        ("  ", "empty"),
+        ("command shift", "missing key"),
+        ("⌘⇧", "missing key"),
+        ("$@~", "missing key"),
+        ("shift ab", "unknown key"),
+        ("fred", "unknown key"),
+        ("hyper foo", "unknown key"),
+    ],
+)
+def test_error_category(text, category):
+    with pytest.raises(ValueError):
+        ksc.MacOS.parse_shortcut(text)
+    assert error_category(text) == category
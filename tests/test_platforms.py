@@ -0,0 +1,109 @@
+#
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2021 Jared Crapo
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+# pylint: disable=protected-access, missing-function-docstring
+# pylint: disable=missing-module-docstring, unused-variable
+
+import pytest
+
+import ksc
+from ksc.__main__ import EXIT_SUCCESS, main
+from ksc.platforms import PLATFORMS, Platform, PlatformRenderOptions
+
+
+@pytest.mark.parametrize(
+    "style, inp, result",
+    [
+        ("win", "control shift z", "Ctrl+Shift+Z"),
+        ("win", "command option delete", "Win+Alt+Backspace"),
+        ("win", "hyper space", "Win+Ctrl+Alt+Shift+Spacebar"),
+        ("win", "control pgdown", "Ctrl+PgDn"),
+        ("win", "fn f12", "Fn+F12"),
+        ("win", "control >", "Ctrl+Shift+."),
+        ("win", "control shift 5", "Ctrl+Shift+5"),
+        ("linux", "control shift z", "Ctrl+Shift+Z"),
+        ("linux", "command option fwddel", "Super+Alt+Delete"),
+        ("linux", "control return", "Ctrl+Enter"),
+        ("linux", "option left", "Alt+Left Arrow"),
+        ("linux", "globe e", "Globe+E"),
+        ("linux", "command ?", "Super+Shift+/"),
+    ],
+)
+def test_style(style, inp, result):
+    combo = ksc.MacOS.parse_shortcut(inp)
+    assert ksc.RenderOptions.compile(style=style).render(combo) == result
+    assert combo.render(style=style) == result
+
+
+def test_style_options():
+    # hyper is a mac thing
+    combo = ksc.MacOS.parse_shortcut("hyper .")
+    options = ksc.RenderOptions.compile(style="win", hyper=True, clarify_keys=True)
+    assert options.render(combo) == "Win+Ctrl+Alt+Shift+Period (.)"
+    combo = ksc.MacOS.parse_shortcut("control >")
+    assert options.render(combo) == "Ctrl+Shift+Period (.)"
+    # so are symbols
+    options = ksc.RenderOptions.compile(
+        style="linux", modifier_symbols=True, key_symbols=True
+    )
+    assert options.render(ksc.MacOS.parse_shortcut("control esc")) == "Ctrl+Esc"
+    options = ksc.RenderOptions.compile(style="win", html=True)
+    assert options.render(combo) == (
+        "<kbd><kbd>Ctrl</kbd>+<kbd>Shift</kbd>+<kbd>.</kbd></kbd>"
+    )
+
+
+def test_style_compile():
+    options = ksc.RenderOptions.compile(style="win", hyper=True)
+    assert isinstance(options, PlatformRenderOptions)
+    assert options is ksc.RenderOptions.compile(style="win", hyper=True)
+    assert options is not ksc.RenderOptions.compile(style="linux", hyper=True)
+    assert options.values[-1] == "win"
+    assert repr(options) == "PlatformRenderOptions(hyper=True, style='win')"
+    # constructing directly works too
+    assert isinstance(ksc.RenderOptions(style="linux"), PlatformRenderOptions)
+    assert type(ksc.RenderOptions.compile(style=None)) is ksc.RenderOptions
+
+
+def test_style_unknown():
+    with pytest.raises(ValueError, match="unknown style 'amiga'"):
+        ksc.RenderOptions.compile(style="amiga")
+
+
+def test_platforms_match_styles():
+    assert ("mac", *PLATFORMS) == ksc.RenderOptions.STYLES
+    assert Platform.get("win") is Platform.get("win")
+
+
+def test_style_cache():
+    cache = ksc.ShortcutCache()
+    combo = ksc.MacOS.parse_shortcut("control c")
+    assert cache.render(combo) == "Control-C"
+    assert cache.render(combo, style="win") == "Ctrl+C"
+
+
+def test_style_cli(capsys):
+    exit_code = main(["-s", "linux", "control", "x", "/", "control", "c"])
+    out, _ = capsys.readouterr()
+    assert out == "Ctrl+X Ctrl+C\n"
+    assert exit_code == EXIT_SUCCESS
@@ -0,0 +1,72 @@
+#
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2021 Jared Crapo
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+# pylint: disable=protected-access, missing-function-docstring
+# pylint: disable=missing-module-docstring, unused-variable
+
+import json
+
+import pytest
+
+import ksc
+from ksc.records import VARIANTS, RecordEncoder
+
+
+@pytest.mark.parametrize(
+    "inp, mods, key, key_name, clarified_name",
+    [
+        ("command shift p", ["Shift", "Command"], "P", "P", None),
+        (
+            "hyper left",
+            ["Control", "Option", "Shift", "Command"],
+            "←",
+            "Left Arrow",
+            None,
+        ),
+        ("command .", ["Command"], ".", ".", "Period (.)"),
+        ("control é", ["Control"], "É", "É", None),
+        ('option "', ["Option", "Shift"], '"', '"', 'Double Quote (")'),
+    ],
+)
+def test_record(inp, mods, key, key_name, clarified_name):
+    combo = ksc.MacOS.parse_shortcut(inp)
+    record = RecordEncoder().record(combo, inp)
+    assert record["input"] == inp
+    assert record["mods"] == mods
+    assert record["key"] == key
+    assert record["key_name"] == key_name
+    assert record["clarified_name"] == clarified_name
+    assert list(record["rendered"]) == ["text", *VARIANTS]
+    for name, options in VARIANTS.items():
+        assert record["rendered"][name] == ksc.RenderOptions.compile(**options).render(
+            combo
+        )
+
+
+def test_record_options_and_fields():
+    options = ksc.RenderOptions.compile(modifier_symbols=True, plus_sign=True)
+    combo = ksc.MacOS.parse_shortcut("command shift p")
+    encoded = RecordEncoder(options).encode(combo, file="a.txt", line=3)
+    assert encoded.startswith('{"file": "a.txt", "line": 3, "input": null,')
+    record = json.loads(encoded)
+    assert record["rendered"]["text"] == "⇧+⌘+P"
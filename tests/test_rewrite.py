@@ -0,0 +1,346 @@
+#
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2021 Jared Crapo
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+# pylint: disable=protected-access, missing-function-docstring
+# pylint: disable=missing-module-docstring, unused-variable
+
+import hashlib
+import io
+import os
+
+import pytest
+
+import ksc
+from ksc.__main__ import EXIT_ERROR, EXIT_SUCCESS, main
+from ksc.rewrite import CHUNK_SIZE, MANIFEST, Rewriter, rewrite_tree
+
+DOCUMENT = """\
+# Shortcuts
+
+Press {% kbd cmd shift p %} to open the command palette.
+Use <kbd>ctrl-x / ctrl-c</kbd> to quit, or <kbd class="key">@q</kbd>.
+Already expanded: <kbd><kbd>⌘</kbd><kbd>B</kbd></kbd> and <kbd>Ctrl</kbd>+<kbd>C</kbd>.
+Escaped: <kbd>command &lt;</kbd>
+Broken: {% kbd fred %}
+"""
+
+EXPECTED = """\
+# Shortcuts
+
+Press Shift-Command-P to open the command palette.
+Use <kbd>Control-X Control-C</kbd> to quit, or <kbd class="key">Command-Q</kbd>.
+Already expanded: <kbd><kbd>⌘</kbd><kbd>B</kbd></kbd> and <kbd>Ctrl</kbd>+<kbd>C</kbd>.
+Escaped: <kbd>Shift-Command-&lt;</kbd>
+Broken: {% kbd fred %}
+"""
+
+
+def test_rewrite():
+    out = io.StringIO()
+    result = Rewriter().rewrite(io.StringIO(DOCUMENT), out)
+    assert out.getvalue() == EXPECTED
+    assert result.replaced == 4
+    assert len(result.errors) == 1
+    error = result.errors[0]
+    assert error.lineno == 7
+    assert error.text == "{% kbd fred %}"
+    assert "fred" in error.message
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 64, 1000])
+def test_rewrite_chunks(chunk_size):
+    # lots of copies so tags straddle chunk boundaries at every possible offset
+    document = DOCUMENT * 50
+    out = io.StringIO()
+    result = Rewriter(chunk_size=chunk_size).rewrite(io.StringIO(document), out)
+    assert out.getvalue() == EXPECTED * 50
+    assert result.replaced == 200
+    assert [error.lineno for error in result.errors] == [
+        7 + 7 * copy for copy in range(50)
+    ]
+
+
+def test_rewrite_options():
+    options = ksc.RenderOptions.compile(modifier_symbols=True)
+    out = io.StringIO()
+    Rewriter(options).rewrite(io.StringIO("{% kbd cmd shift p %}"), out)
+    assert out.getvalue() == "⇧⌘P"
+
+
+def test_rewrite_html_options():
+    options = ksc.RenderOptions.compile(modifier_symbols=True, html=True)
+    out = io.StringIO()
+    Rewriter(options).rewrite(
+        io.StringIO("{% kbd cmd b %} <kbd class='key'>cmd b</kbd>"), out
+    )
+    expected = "<kbd><kbd>&#8984;</kbd><kbd>B</kbd></kbd>"
+    assert out.getvalue() == f"{expected} {expected}"
+
+
+CODE_DOCUMENT = """\
+Press {% kbd cmd b %} or `{% kbd cmd b %}` or ``<kbd>cmd b</kbd>``
+
+    $ echo '{% kbd cmd b %}' | ksc rewrite
+an indented line continues the paragraph {% kbd cmd b %}
+    like this {% kbd cmd b %}
+
+```markdown
+{% kbd cmd b %}
+~~~
+````
+~~~
+<kbd>cmd b</kbd>
+~~~
+
+# an ` unclosed backtick doesn't make {% kbd cmd b %} code
+
+```{% kbd cmd b %}
+"""
+
+CODE_EXPECTED = """\
+Press Command-B or `{% kbd cmd b %}` or ``<kbd>cmd b</kbd>``
+
+    $ echo '{% kbd cmd b %}' | ksc rewrite
+an indented line continues the paragraph Command-B
+    like this Command-B
+
+```markdown
+{% kbd cmd b %}
+~~~
+````
+~~~
+<kbd>cmd b</kbd>
+~~~
+
+# an ` unclosed backtick doesn't make Command-B code
+
+```{% kbd cmd b %}
+"""
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 64, CHUNK_SIZE])
+def test_rewrite_skips_code(chunk_size):
+    out = io.StringIO()
+    result = Rewriter(chunk_size=chunk_size).rewrite(io.StringIO(CODE_DOCUMENT), out)
+    assert out.getvalue() == CODE_EXPECTED
+    assert result.replaced == 4
+
+
+@pytest.mark.parametrize(
+    "document, expected",
+    [
+        ("`a\n\n{% kbd cmd b %}`", "`a\n\nCommand-B`"),
+        ("`a\n{% kbd cmd b %}`", "`a\n{% kbd cmd b %}`"),
+        ("``a`{% kbd cmd b %}``", "``a`{% kbd cmd b %}``"),
+        ("``a\n```\n{% kbd cmd b %}``", "``a\n```\n{% kbd cmd b %}``"),
+        ("\t{% kbd cmd b %}", "\t{% kbd cmd b %}"),
+        (
+            "# h\n    {% kbd cmd b %}\ntext {% kbd cmd b %}",
+            "# h\n    {% kbd cmd b %}\ntext Command-B",
+        ),
+    ],
+)
+def test_rewrite_code_spans(document, expected):
+    out = io.StringIO()
+    Rewriter().rewrite(io.StringIO(document), out)
+    assert out.getvalue() == expected
+
+
+def test_rewrite_html_has_no_code():
+    out = io.StringIO()
+    Rewriter().rewrite(io.StringIO(CODE_DOCUMENT), out, markdown=False)
+    assert "{% kbd" not in out.getvalue()
+
+
+def test_rewrite_file_html(tmp_path):
+    fname = tmp_path / "doc.html"
+    fname.write_text("<pre>\n\n    <kbd>cmd b</kbd>\n</pre>\n", encoding="utf-8")
+    Rewriter().rewrite_file(fname)
+    expected = "<pre>\n\n    <kbd>Command-B</kbd>\n</pre>\n"
+    assert fname.read_text(encoding="utf-8") == expected
+
+
+def test_rewrite_file(tmp_path):
+    fname = tmp_path / "doc.md"
+    fname.write_bytes(DOCUMENT.replace("\n", "\r\n").encode("utf-8"))
+    dest = tmp_path / "out.md"
+    Rewriter().rewrite_file(fname, dest)
+    # line endings are preserved
+    assert dest.read_bytes() == EXPECTED.replace("\n", "\r\n").encode("utf-8")
+    Rewriter().rewrite_file(fname)
+    assert fname.read_bytes() == dest.read_bytes()
+    # only the two files, no temporary files left behind
+    assert len(list(tmp_path.iterdir())) == 2
+
+
+def test_rewrite_file_hashes(tmp_path):
+    fname = tmp_path / "doc.md"
+    fname.write_text(DOCUMENT, encoding="utf-8")
+    dest = tmp_path / "out.md"
+    hashes = {}
+    # one byte at a time splits the multibyte characters
+    Rewriter(chunk_size=1).rewrite_file(fname, dest, hashes=hashes)
+    assert dest.read_text(encoding="utf-8") == EXPECTED
+    assert hashes == {
+        "source": hashlib.sha256(DOCUMENT.encode("utf-8")).hexdigest(),
+        "output": hashlib.sha256(EXPECTED.encode("utf-8")).hexdigest(),
+    }
+
+
+def test_rewrite_file_unchanged(tmp_path):
+    fname = tmp_path / "doc.md"
+    fname.write_text("Press <kbd>Command-B</kbd>\n", encoding="utf-8")
+    os.utime(fname, (0, 0))
+    result = Rewriter().rewrite_file(fname)
+    assert result.replaced == 1
+    # the document is the same, so it isn't touched
+    assert fname.stat().st_mtime == 0
+    assert len(list(tmp_path.iterdir())) == 1
+
+
+def test_rewrite_cli_stdout(tmp_path, capsys):
+    fname = tmp_path / "doc.md"
+    fname.write_text(DOCUMENT, encoding="utf-8")
+    exit_code = main(["rewrite", str(fname)])
+    out, err = capsys.readouterr()
+    assert out == EXPECTED
+    assert f"{fname}:7: error parsing 'fred'" in err
+    assert exit_code == EXIT_ERROR
+
+
+def test_rewrite_cli_in_place(tmp_path, capsys):
+    fname = tmp_path / "doc.md"
+    fname.write_text("Press {% kbd cmd b %}\n", encoding="utf-8")
+    exit_code = main(["rewrite", "-i", "-ms", str(fname)])
+    out, err = capsys.readouterr()
+    assert not out
+    assert not err
+    assert fname.read_text(encoding="utf-8") == "Press ⌘B\n"
+    assert exit_code == EXIT_SUCCESS
+
+
+def test_rewrite_cli_missing(tmp_path, capsys):
+    exit_code = main(["rewrite", "-i", str(tmp_path / "nope.md")])
+    _, err = capsys.readouterr()
+    assert err
+    assert exit_code == EXIT_ERROR
+
+
+def _make_tree(root):
+    (root / "guide").mkdir(parents=True)
+    (root / ".git").mkdir()
+    (root / "index.md").write_text("Press {% kbd cmd b %}\n", encoding="utf-8")
+    (root / "guide" / "doc.html").write_text(DOCUMENT, encoding="utf-8")
+    (root / "guide" / "image.png").write_bytes(b"{% kbd cmd b %}")
+    (root / ".git" / "config.md").write_text("{% kbd cmd b %}", encoding="utf-8")
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_rewrite_tree(tmp_path, jobs):
+    source = tmp_path / "docs"
+    dest = tmp_path / "site"
+    _make_tree(source)
+    result = rewrite_tree(source, dest, jobs=jobs)
+    assert result.rewritten == 2
+    assert result.skipped == 0
+    assert result.replaced == 5
+    assert [(path, error.lineno) for path, error in result.errors] == [
+        ("guide/doc.html", 7)
+    ]
+    # same output as rewriting a single document
+    assert (dest / "guide" / "doc.html").read_text(encoding="utf-8") == EXPECTED
+    assert (dest / "index.md").read_text(encoding="utf-8") == "Press Command-B\n"
+    assert not (dest / "guide" / "image.png").exists()
+    assert not (dest / ".git").exists()
+    assert (dest / MANIFEST).exists()
+
+
+def test_rewrite_tree_incremental(tmp_path):
+    source = tmp_path / "docs"
+    _make_tree(source)
+    (source / "guide" / "doc.html").write_text("{% kbd cmd c %}", encoding="utf-8")
+    result = rewrite_tree(source, jobs=1)
+    assert (result.rewritten, result.skipped) == (2, 0)
+    assert (source / "index.md").read_text(encoding="utf-8") == "Press Command-B\n"
+    # nothing changed
+    result = rewrite_tree(source, jobs=1)
+    assert (result.rewritten, result.skipped) == (0, 2)
+    # one document changed
+    (source / "index.md").write_text("{% kbd cmd x %}", encoding="utf-8")
+    result = rewrite_tree(source, jobs=1)
+    assert (result.rewritten, result.skipped) == (1, 1)
+    assert (source / "index.md").read_text(encoding="utf-8") == "Command-X"
+    # different options rewrite everything
+    options = ksc.RenderOptions.compile(modifier_symbols=True)
+    result = rewrite_tree(source, options=options, jobs=1)
+    assert (result.rewritten, result.skipped) == (2, 0)
+    # so does force
+    result = rewrite_tree(source, options=options, jobs=1, force=True)
+    assert (result.rewritten, result.skipped) == (2, 0)
+
+
+def test_rewrite_tree_errors_not_skipped(tmp_path):
+    (tmp_path / "bad.md").write_text("{% kbd fred %}", encoding="utf-8")
+    (tmp_path / "binary.md").write_bytes(b"\xff\xfe")
+    for _ in range(2):
+        result = rewrite_tree(tmp_path, jobs=1)
+        assert result.rewritten == 2
+        assert [(path, error.lineno) for path, error in result.errors] == [
+            ("bad.md", 1),
+            ("binary.md", None),
+        ]
+
+
+def test_rewrite_tree_bad_manifest(tmp_path):
+    (tmp_path / "doc.md").write_text("{% kbd cmd c %}", encoding="utf-8")
+    (tmp_path / MANIFEST).write_text("not json", encoding="utf-8")
+    result = rewrite_tree(tmp_path, jobs=1)
+    assert result.rewritten == 1
+
+
+def test_rewrite_cli_tree(tmp_path, capsys):
+    source = tmp_path / "docs"
+    _make_tree(source)
+    exit_code = main(["rewrite", "-j", "1", "-d", str(tmp_path / "site"), str(source)])
+    _, err = capsys.readouterr()
+    assert f"{source / 'guide' / 'doc.html'}:7: error parsing 'fred'" in err
+    assert exit_code == EXIT_ERROR
+    exit_code = main(["rewrite", "-i", "-j", "1", str(source / "guide")])
+    assert (source / "guide" / "doc.html").read_text(encoding="utf-8") == EXPECTED
+    assert exit_code == EXIT_ERROR
+
+
+@pytest.mark.parametrize(
+    "args",
+    [
+        ["{dir}"],
+        ["-d", "out", "{dir}", "{dir}"],
+        ["-d", "out", "file.md"],
+        ["-i", "-j", "0", "{dir}"],
+    ],
+)
+def test_rewrite_cli_tree_usage(tmp_path, capsys, args):
+    args = [arg.format(dir=tmp_path) for arg in args]
+    with pytest.raises(SystemExit) as excinfo:
+        main(["rewrite", *args])
+    assert excinfo.value.code == 2
@@ -0,0 +1,185 @@
+#
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2021 Jared Crapo
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+# pylint: disable=protected-access, missing-function-docstring
+# pylint: disable=missing-module-docstring, unused-variable
+
+import asyncio
+import http.client
+import json
+import threading
+
+import pytest
+
+from ksc import service
+
+
+@pytest.fixture
+def address():
+    """run the service on a random port in a background thread"""
+    loop = asyncio.new_event_loop()
+    server = loop.run_until_complete(service.start_server("127.0.0.1", 0))
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    yield server.sockets[0].getsockname()[:2]
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+    server.close()
+    loop.run_until_complete(server.wait_closed())
+    loop.close()
+
+
+def _request(address, method, url, body=None, **kwargs):
+    """return (status, content type, body) of a request"""
+    connection = http.client.HTTPConnection(*address, timeout=10)
+    try:
+        connection.request(method, url, body=body, **kwargs)
+        response = connection.getresponse()
+        return (
+            response.status,
+            response.getheader("Content-Type"),
+            response.read().decode("utf-8"),
+        )
+    finally:
+        connection.close()
+
+
+@pytest.mark.parametrize(
+    "url, output",
+    [
+        ("/render?text=cmd+shift+p", "Shift-Command-P"),
+        ("/render?text=cmd+shift+p&modifier_symbols=1", "⇧⌘P"),
+        ("/render?text=cmd+shift+p&modifier_symbols=true&plus_sign=on", "⇧+⌘+P"),
+        ("/render?text=cmd+shift+p&modifier_symbols=0", "Shift-Command-P"),
+        ("/render?text=hyper+t&hyper=yes", "Hyper-T"),
+        ("/render?text=ctrl+b&style=win", "Ctrl+B"),
+        ("/render?text=control+x+%2F+control+c", "Control-X Control-C"),
+        ("/render?text=cmd+b&html=1", "<kbd><kbd>Command</kbd>-<kbd>B</kbd></kbd>"),
+    ],
+)
+def test_get(address, url, output):
+    status, content_type, body = _request(address, "GET", url)
+    assert status == 200
+    assert content_type == "application/json; charset=utf-8"
+    assert json.loads(body)["output"] == output
+
+
+@pytest.mark.parametrize(
+    "method, url, status, error",
+    [
+        ("GET", "/render?text=fred", 400, "error parsing 'fred'"),
+        ("GET", "/render", 400, "the text parameter is required"),
+        ("GET", "/render?text=x&bogus=1", 400, "unknown option 'bogus'"),
+        ("GET", "/render?text=x&hyper=maybe", 400, "'maybe' isn't true or false"),
+        ("GET", "/render?text=x&style=amiga", 400, "unknown style 'amiga'"),
+        ("GET", "/", 404, "no such path '/'"),
+        ("DELETE", "/render", 405, "method DELETE isn't allowed"),
+    ],
+)
+def test_errors(address, method, url, status, error):
+    actual, _, body = _request(address, method, url)
+    assert actual == status
+    assert json.loads(body)["error"].startswith(error)
+
+
+def test_post(address):
+    body = "ctrl b\n\nfred\n  control x / control c  \noption left"
+    status, content_type, out = _request(address, "POST", "/render?style=win", body)
+    assert status == 200
+    assert content_type == "application/x-ndjson; charset=utf-8"
+    assert [json.loads(line) for line in out.splitlines()] == [
+        {"line": 1, "input": "ctrl b", "output": "Ctrl+B"},
+        {"line": 3, "input": "fred", "error": "error parsing 'fred'"},
+        {"line": 4, "input": "control x / control c", "output": "Ctrl+X Ctrl+C"},
+        {"line": 5, "input": "option left", "output": "Alt+Left Arrow"},
+    ]
+
+
+def test_post_chunked_many(address):
+    count = service.BATCH_SIZE * 3 + 7
+    # chunks which split lines in the middle
+    chunks = (f"command {'abcdefghij'[i % 10]}\n".encode() for i in range(count))
+    body = (b"".join(chunk) for chunk in zip(*[chunks] * 3, strict=False))
+    status, _, out = _request(
+        address, "POST", "/render?modifier_symbols=1", body, encode_chunked=True
+    )
+    assert status == 200
+    records = [json.loads(line) for line in out.splitlines()]
+    assert len(records) == count - count % 3
+    assert records[-1]["line"] == len(records)
+    assert records[11] == {"line": 12, "input": "command b", "output": "⌘B"}
+
+
+def test_post_empty(address):
+    status, _, out = _request(address, "POST", "/render", b"")
+    assert status == 200
+    assert out == ""
+
+
+def test_post_requires_length(address):
+    status, _, _ = _request(
+        address, "POST", "/render", None, headers={"Transfer-Encoding": "gzip"}
+    )
+    assert status == 411
+
+
+def test_post_line_too_long(address):
+    body = b"command b\n" + b"x" * (service.MAX_BODY_LINE * 2)
+    status, _, out = _request(address, "POST", "/render", body)
+    assert status == 200
+    lines = [json.loads(line) for line in out.splitlines()]
+    assert lines[0]["output"] == "Command-B"
+    assert lines[-1] == {"error": "line too long"}
+
+
+def test_concurrent_connections(address):
+    async def get(index):
+        reader, writer = await asyncio.open_connection(*address)
+        writer.write(f"GET /render?text=cmd+{index % 10} HTTP/1.1\r\n\r\n".encode())
+        await writer.drain()
+        response = await reader.read()
+        writer.close()
+        await writer.wait_closed()
+        return response
+
+    async def get_all():
+        return await asyncio.gather(*(get(index) for index in range(100)))
+
+    responses = asyncio.run(get_all())
+    for index, response in enumerate(responses):
+        head, _, body = response.partition(b"\r\n\r\n")
+        assert head.startswith(b"HTTP/1.1 200 OK")
+        assert json.loads(body)["output"] == f"Command-{index % 10}"
+
+
+def test_bad_request_line(address):
+    async def send():
+        reader, writer = await asyncio.open_connection(*address)
+        writer.write(b"NONSENSE\r\n\r\n")
+        await writer.drain()
+        response = await reader.read()
+        writer.close()
+        await writer.wait_closed()
+        return response
+
+    assert asyncio.run(send()).startswith(b"HTTP/1.1 400 Bad Request")